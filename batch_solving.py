@@ -0,0 +1,132 @@
+import contextlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from reading_data import load_data
+from genetic_algorithm.generation import life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+from genetic_algorithm.instrumentation import Instrumentation
+from genetic_algorithm.conflicts import conflict_index_for
+from exporting.exporters import ExportItem, write_json
+from const import MAX_GENERATIONS, MUTATION_CHANCE, POPULATION_SIZE, KEEP_PERCENT, OPTIMAL_FITNESS
+
+
+def find_instances(source: str):
+    """Returns the list of instance files to solve.
+    The source is either a directory (all .txt, .csv and .jsonl files in it are instances) or a manifest file with one instance path per line
+    (empty lines and lines starting with # are skipped, relative paths are relative to the manifest).
+
+    :param source: A directory or a manifest file."""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source) if name.endswith((".txt", ".csv", ".jsonl")))
+    base = os.path.dirname(source)
+    with open(source, 'r') as file:
+        lines = [line.strip() for line in file]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+def instance_names(instances: list[str]) -> list[str]:
+    """Returns the name of every instance, used for its results: the file name without the extension,
+    or with the extension if two instances have the same stem (a.txt and a.csv become "a.txt" and "a.csv").
+
+    :param instances: The paths of the instance files (find_instances).
+    :raises ValueError: If two instances still have the same name (the same file name in two directories of a manifest)."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in instances]
+    names = [stem if stems.count(stem) == 1 else os.path.basename(path) for stem, path in zip(stems, instances)]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"More than one instance is called {', '.join(duplicates)}, rename the files so the results do not overwrite each other")
+    return names
+
+
+def solve_instance(name: str, rooms: dict, events: list, output_file: str, time_limit: float, settings: dict):
+    """Runs in a worker process: solves one instance with life_cycle and writes its best schedule to output_file.
+    The console output of life_cycle is thrown away, since many instances are solved at the same time.
+
+    :return: A dictionary with the summary of the run."""
+    end_records = []
+    instrumentation = Instrumentation([lambda record: end_records.append(record) if record["event"] == "end" else None],
+                                      every=settings["max_generations"] + 1)  # only the end record is needed
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = life_cycle(max_generations=settings["max_generations"], optimal_fitness=settings["optimal_fitness"], stopping_criteria=0.1,
+                          classes=events, population_size=settings["population_size"], selection_parameter=settings["keep_percent"],
+                          mutation_chance=settings["mutation_chance"], rooms=rooms, output_file=output_file,
+                          config=EngineConfig(instrumentation=instrumentation, verbose=False, time_limit=time_limit,
+                                              conflict_index=conflict_index_for(events)))
+    end = end_records[-1]
+    return {
+        "instance": name,
+        "events": len(events),
+        "rooms": len(rooms),
+        "output": os.path.basename(output_file),
+        "fitness": best.get_fitness_score(),
+        "valid": best.count_overlaps() == 0 and not end["best_conflicts"],
+        "conflicts": end["best_conflicts"],
+        "generations": end["generation"],
+        "seconds": round(end["elapsed"], 3),
+        "stop_reason": end["stop_reason"],
+        "starts": [best.get_start(i) for i in range(len(events))],  # taken out of the summary for schedules.json
+    }
+
+
+def solve_batch(source: str, output_dir: str, workers: int = None, time_limit: float = None, settings: dict = None, groups: bool = False):
+    """Solves many timetable instances at the same time on a pool of worker processes.
+    Every instance is read once here and sent to a worker, the workers stay alive for all instances.
+    The best schedule of every instance is written to {output_dir}/<instance name>.html (instance_names), all of them together to {output_dir}/schedules.json
+    and a summary of all runs to {output_dir}/index.json.
+
+    :param source: A directory of instance files or a manifest file (see find_instances).
+    :param output_dir: The directory for the results, it is created if it does not exist.
+    :param workers: The number of worker processes (default: number of CPUs).
+    :param time_limit: The time budget of one instance in seconds, None means no limit.
+    :param settings: Parameters of the algorithm, the defaults are taken from const.py.
+    :param groups: If True the student group and lecturer conflicts are checked too (reading_data.load_data).
+
+    :return: The list of summaries, in the order of the instances."""
+    settings = {
+        "max_generations": MAX_GENERATIONS,
+        "optimal_fitness": OPTIMAL_FITNESS,
+        "population_size": POPULATION_SIZE,
+        "keep_percent": KEEP_PERCENT,
+        "mutation_chance": MUTATION_CHANCE,
+        **(settings or {}),
+    }
+    instances = find_instances(source)
+    names = instance_names(instances)
+    os.makedirs(output_dir, exist_ok=True)
+
+    summaries = {}
+    loaded = {}  # name -> (rooms, events), for schedules.json
+    starts = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for path, name in zip(instances, names):
+            try:
+                rooms, events = load_data(path, groups=groups)
+            except (OSError, ValueError) as error:
+                summaries[name] = {"instance": name, "error": f"could not read {path}: {error!r}"}
+                print(f"Skipped {name}: {summaries[name]['error']}")
+                continue
+            loaded[name] = rooms, events
+            output_file = os.path.join(output_dir, name + ".html")
+            futures[executor.submit(solve_instance, name, rooms, events, output_file, time_limit, settings)] = name
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                summaries[name] = future.result()
+                starts[name] = summaries[name].pop("starts")
+            except Exception as error:  # one broken instance should not stop the others
+                summaries[name] = {"instance": name, "error": repr(error)}
+            print(f"Finished {name}: {summaries[name]}")
+
+    ordered = [summaries[name] for name in names]
+    items = [ExportItem(summary["instance"], loaded[summary["instance"]][1], starts[summary["instance"]], summary["fitness"],
+                        len(loaded[summary["instance"]][0]), loaded[summary["instance"]][0])
+             for summary in ordered if summary["instance"] in starts]
+    write_json(items, os.path.join(output_dir, "schedules.json"))
+    with open(os.path.join(output_dir, "index.json"), 'w', encoding='utf-8') as file:
+        json.dump({"source": source, "time_limit": time_limit, "settings": settings, "instances": ordered}, file, indent=2)
+    print(f"\nSummary written to {os.path.join(output_dir, 'index.json')}")
+    return ordered
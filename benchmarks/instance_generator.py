@@ -0,0 +1,56 @@
+import random
+
+from structures.subject import Subject
+from const import SLOT_MINUTES
+
+
+# Durations in minutes and how often they appear, the same kind of mix as in data_timetable.txt
+DEFAULT_DURATION_MIX = {30: 2, 60: 2, 90: 2, 120: 3, 180: 5}
+
+# (event count, room count) of the instance sizes used by the benchmarks, from the size of data_timetable.txt to a whole campus
+INSTANCE_SIZES = {
+    "small": (60, 5),
+    "medium": (500, 20),
+    "large": (2000, 80),
+    "campus": (5000, 200),
+}
+
+
+def generate_instance(event_count: int, room_count: int, duration_mix: dict = None, seed: int = 0, slot_minutes: int = SLOT_MINUTES):
+    """Generates a random timetable instance with the same structure as the one from reading_data:
+    rooms as a dictionary {index: name} and a list of Subject objects (lectures and exercises of made up subjects).
+    The same seed always gives the same instance.
+
+    :param event_count: The number of events (classes) to schedule.
+    :param room_count: The number of rooms.
+    :param duration_mix: A dictionary {duration in minutes: weight}, the durations are chosen randomly with these weights.
+    :param seed: The seed of the random generator.
+    :param slot_minutes: The slot length of the time grid the durations are counted in.
+
+    :return: rooms, events"""
+    duration_mix = duration_mix or DEFAULT_DURATION_MIX
+    rng = random.Random(seed)
+    durations = list(duration_mix)
+    weights = [duration_mix[duration] for duration in durations]
+
+    rooms = {i: f"R{i + 1}" for i in range(room_count)}
+    events = []
+    kinds = ["Predavanje", "Vezbe 1", "Vezbe 2", "Vezbe 3"]
+    for i in range(event_count):
+        name = f"Predmet {i // len(kinds) + 1} - {kinds[i % len(kinds)]}"
+        events.append(Subject(name, rng.choices(durations, weights)[0], slot_minutes))
+    return rooms, events
+
+
+def write_instance(file_path: str, rooms: dict, events: list[Subject], slot_minutes: int = SLOT_MINUTES):
+    """Writes an instance in the format of data_timetable.txt, so it can be loaded with reading_data.load_data.
+
+    :param file_path: The path of the file.
+    :param rooms: Dictionary {index: room name}.
+    :param events: List of Subject objects.
+    :param slot_minutes: The slot length the durations of the events are counted in.
+    """
+    with open(file_path, 'w') as file:
+        file.write("rooms: " + ", ".join(rooms.values()) + "\n")
+        file.write("events(name, duration):\n")
+        file.write("\n".join(f"{event.name}, {event.duration * slot_minutes}" for event in events))
@@ -0,0 +1,173 @@
+"""Benchmarks of the main parts of the genetic algorithm on generated instances.
+
+Run it as a module from the root of the project (benchmarks has no __init__.py, like genetic_algorithm, so it is found as a namespace
+package only when the root is the working directory, and running the file directly would not find the other packages), for example:
+    python -m benchmarks.run_benchmarks --sizes small medium --output benchmarks/results/my_run.json
+
+For every instance size it measures fitness evaluations per second (calculate_fitness), mutations and crossovers per second,
+the time of the first generation and generations per second of life_cycle without it, the time until the first schedule
+without overlaps appears, and the peak memory of each of these.
+The results are written as JSON so runs on different commits can be compared."""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.instance_generator import INSTANCE_SIZES, generate_instance
+from genetic_algorithm.generation import generate_first_gen, crossover_all, selection, life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+from genetic_algorithm.individual import Schedule, cross_over
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.sparse_individual import SparseSchedule
+from genetic_algorithm.instrumentation import Instrumentation
+
+REPRESENTATIONS = {"compact": CompactSchedule, "list": Schedule, "sparse": SparseSchedule}
+
+
+def _rate(function, min_time: float = 0.5):
+    """Calls the function until at least {min_time} seconds pass and returns the number of calls per second."""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def _peak_memory(function, calls: int = 20):
+    """Calls the function {calls} times with tracemalloc on and returns the peak of the traced memory in MB.
+    It is measured apart from the rates, since tracing every allocation makes the calls much slower."""
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def benchmark_instance(name: str, event_count: int, room_count: int, population_size: int, generations: int, seed: int,
+                       schedule_class=CompactSchedule):
+    """Runs all benchmarks on one generated instance and returns the results as a dictionary."""
+    rooms, events = generate_instance(event_count, room_count, seed=seed)
+    random.seed(seed)
+    result = {"instance": name, "events": event_count, "rooms": room_count, "population_size": population_size, "generations": generations,
+              "representation": schedule_class.__name__}
+
+    population = generate_first_gen(events, population_size, room_count, schedule_class)
+
+    def full_fitness():
+        schedule = population[random.randint(0, population_size - 1)]
+        if hasattr(schedule, 'penalty_terms'):
+            schedule.penalty_terms = None  # forces a calculation from scratch instead of a delta update
+        schedule.calculate_fitness(events)
+
+    def mutation():
+        population[random.randint(0, population_size - 1)].mutate(1.0, events)
+
+    def crossover():
+        cross_over(population[0], population[1], events, 0.0)
+
+    for key, function in (("fitness_evals", full_fitness), ("mutations", mutation), ("crossovers", crossover)):
+        result[key + "_per_sec"] = _rate(function)
+        result[key + "_peak_memory_mb"] = _peak_memory(function)
+
+    # The steps of life_cycle, to see when the first schedule without overlaps appears
+    random.seed(seed)
+    start = time.perf_counter()
+    generation = generate_first_gen(events, population_size, room_count, schedule_class)
+    first_valid = None
+    for generation_index in range(1, generations + 1):
+        if first_valid is None and any(schedule.count_overlaps() == 0 for schedule in generation):
+            first_valid = {"seconds": time.perf_counter() - start, "generation": generation_index}
+            break
+        generation = crossover_all(generation, population_size, 0.4, events)
+        generation = selection(generation, 0.2, population_size)
+    result["first_overlap_free"] = first_valid
+
+    # The first generation alone, then the whole life_cycle with its output thrown away. The end of every generation is timed
+    # with a generation hook, so the generations per second do not include making the first generation
+    def first_generation():
+        random.seed(seed)
+        generate_first_gen(events, population_size, room_count, schedule_class)
+    start = time.perf_counter()
+    first_generation()
+    result["first_generation_seconds"] = time.perf_counter() - start
+    result["first_generation_peak_memory_mb"] = _peak_memory(first_generation, 1)
+
+    def run_life_cycle(max_generations, generation_ends=None):
+        random.seed(seed)
+        instrumentation = None
+        if generation_ends is not None:
+            instrumentation = Instrumentation(every=max_generations + 1, generation_hooks=[lambda index: generation_ends.append(time.perf_counter())])
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            return life_cycle(max_generations=max_generations + 1, optimal_fitness=float("inf"), stopping_criteria=0, classes=events,
+                              population_size=population_size, selection_parameter=0.2, mutation_chance=[0.4, 0.3, 0.2], rooms=rooms,
+                              output_file=os.path.join(directory, "schedule.html"),
+                              config=EngineConfig(schedule_class=schedule_class, instrumentation=instrumentation))
+
+    generation_ends = []
+    best = run_life_cycle(generations, generation_ends)
+    # from the end of the first generation to the end of the last one
+    result["generations_per_sec"] = (len(generation_ends) - 1) / (generation_ends[-1] - generation_ends[0]) if len(generation_ends) > 1 else None
+    # the peak memory of a few generations (with the first one), tracing every allocation makes it much slower
+    result["life_cycle_peak_memory_mb"] = _peak_memory(lambda: run_life_cycle(min(generations, 3)), 1)
+    result["best_fitness"] = best.get_fitness_score()
+    return result
+
+
+def _git_commit():
+    """Returns the current commit of the repository, or None if git is not available."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the genetic algorithm on generated timetable instances.")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=sorted(INSTANCE_SIZES),
+                        help="instance sizes to run (default: small medium)")
+    parser.add_argument("--population", type=int, default=100, help="population size (default: 100)")
+    parser.add_argument("--generations", type=int, default=20, help="generations of life_cycle to time (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the instances and of the algorithm (default: 0)")
+    parser.add_argument("--representation", choices=REPRESENTATIONS, default="compact", help="the Schedule class that is measured (default: compact)")
+    parser.add_argument("--output", default=None, help="JSON file for the results (default: benchmarks/results/<time>.json)")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.sizes:
+        event_count, room_count = INSTANCE_SIZES[name]
+        print(f"Benchmarking {name} ({event_count} events, {room_count} rooms)...")
+        result = benchmark_instance(name, event_count, room_count, args.population, args.generations, args.seed,
+                                    REPRESENTATIONS[args.representation])
+        print(json.dumps(result, indent=2))
+        results.append(result)
+
+    output = args.output or os.path.join("benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
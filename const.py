@@ -1,5 +1,8 @@
 DAYS = ["Ponedeljak", "Utorak", "Sreda", "Četvrtak", "Petak", "Subota", "Nedelja"] # day names for display
-DAYS_NUM = 5
+DAYS_NUM = 5 # working days of the time grid (structures/time_grid.py)
+SLOT_MINUTES = 15 # length of one time slot in minutes
+DAY_START = "7:00" # first slot of the day
+DAY_END = "19:00" # end of the last slot of the day
 INPUT_FILE_PATH = "data_timetable.txt"
 OUTPUT_FILE_PATH = "schedules/output_schedule.html"
 POPULATION_SIZE = 100
@@ -7,6 +10,11 @@ MUTATION_CHANCE = [0.4,0.3,0.2]
 KEEP_PERCENT = 0.2
 MAX_GENERATIONS = 3000
 OPTIMAL_FITNESS = 1300000 
+CONFLICT_PENALTY = 1000 # penalty for every slot where two classes of the same student group or lecturer are at the same time
+DISRUPTION_PENALTY = 5 # penalty for every class that is not where it was in the previous schedule (warm start, main.py --warm-start)
+WARM_START_PATIENCE = 50 # a warm started run stops after this many generations without a better schedule (if --patience is not given)
+DEBUG_DELTA_FITNESS = False # checks every delta fitness update of Schedule and CompactSchedule against a full calculation (slow)
+CHECKPOINT_EVERY = 100 # generations between two checkpoints when a checkpoint file is given (main.py --checkpoint)
 
 
 
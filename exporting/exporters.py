@@ -0,0 +1,249 @@
+import csv
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from html import escape
+
+from const import DAYS
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+
+
+class ExportItem:
+    """
+    One schedule prepared for the exporters: only the start slot of every class is kept (not the slots themselves),
+    together with the classes, the room names and the time grid it was made for, so schedules of different instances can be exported together.
+    """
+    __slots__ = ('title', 'classes', 'rooms', 'starts', 'fitness', 'room_count', 'grid')
+    def __init__(self, title: str, classes: list, starts: list[int], fitness: float, room_count: int, rooms: dict = None,
+                 grid: TimeGrid = DEFAULT_GRID):
+        """
+        :param title: The heading of the schedule in the output.
+        :param classes: The Subject objects, in the order of the starts.
+        :param starts: The start slot of every class.
+        :param fitness: The fitness score of the schedule.
+        :param room_count: The number of rooms the schedule was made for.
+        :param rooms: The room names ({index: name}), if not given the rooms are called Room 1, Room 2, ...
+        :param grid: The time grid of the schedule, it says which day, room and time a start slot is.
+        """
+        self.title = title
+        self.classes = classes
+        self.starts = starts
+        self.fitness = fitness
+        self.room_count = room_count
+        self.rooms = rooms
+        self.grid = grid
+
+    @classmethod
+    def from_schedule(cls, schedule, classes: list, rooms: dict = None, title: str = "Schedule"):
+        """Makes an ExportItem from a Schedule or a CompactSchedule."""
+        starts = [schedule.get_start(i) for i in range(schedule.get_class_count())]
+        return cls(title, classes, starts, schedule.get_fitness_score(), schedule.get_room_count(), rooms, schedule.grid)
+
+    def room_name(self, room: int) -> str:
+        if self.rooms is not None:
+            return self.rooms[room]
+        return f"Room {room + 1}"
+
+    def placements(self):
+        """Yields (class index, day, room, first slot of the day) for every placed class."""
+        grid = self.grid
+        for class_idx, start in enumerate(self.starts):
+            if start < 0:
+                continue
+            day, room, offset = grid.locate(start, self.room_count)
+            yield class_idx, day, room, offset
+
+
+def top_schedules(generation: list, classes: list, rooms: dict = None, k: int = 1) -> list[ExportItem]:
+    """Returns ExportItems of the {k} best schedules of a generation."""
+    best = sorted(generation, key=lambda schedule: schedule.get_fitness_score(), reverse=True)[:k]
+    return [ExportItem.from_schedule(schedule, classes, rooms, f"Schedule {rank}") for rank, schedule in enumerate(best, start=1)]
+
+
+def schedule_entries(item: ExportItem) -> list[dict]:
+    """Returns every placed class of the schedule with its day, room and time, the rows of the JSON and CSV outputs."""
+    clock = item.grid.clock
+    return [{
+        "name": item.classes[class_idx].name,
+        "day": DAYS[day],
+        "room": item.room_name(room),
+        "start": clock(offset),
+        "end": clock(offset + item.classes[class_idx].duration),
+    } for class_idx, day, room, offset in item.placements()]
+
+
+def day_cells(item: ExportItem) -> list[dict]:
+    """For every day, returns a dictionary {(room, first slot): (rowspan, class indices)} of the cells of the HTML table.
+    A class is one cell spanning all its rows. Overlapping classes in the same room are joined into one cell, since rowspans can not overlap."""
+    intervals = [[[] for _ in range(item.room_count)] for _ in range(item.grid.days)]
+    for class_idx, day, room, offset in item.placements():
+        intervals[day][room].append((offset, offset + item.classes[class_idx].duration, class_idx))
+
+    days = []
+    for rooms in intervals:
+        cells = {}
+        for room, classes in enumerate(rooms):
+            classes.sort()
+            group_start, group_end, group = None, None, []
+            for start, end, class_idx in classes:
+                if group and start < group_end:
+                    group_end = max(group_end, end)
+                    group.append(class_idx)
+                    continue
+                if group:
+                    cells[(room, group_start)] = (group_end - group_start, group)
+                group_start, group_end, group = start, end, [class_idx]
+            if group:
+                cells[(room, group_start)] = (group_end - group_start, group)
+        days.append(cells)
+    return days
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>Schedule</title>
+<style>
+table { border-collapse: collapse; margin: 20px; }
+th, td { border: 1px solid black; padding: 5px; text-align: center; }
+th { background-color: #f2f2f2; }
+td.class { background-color: #e6f0ff; }
+td.overlap { background-color: #ffd6d6; }
+</style>
+</head>
+<body>
+"""
+
+
+def write_html(items: list[ExportItem], file_path: str, subtitle: str = "") -> None:
+    """Writes the schedules to one HTML file, a table for every day with a row for every slot of the grid and a column for every room.
+    A class is a single cell over all of its rows (rowspan) and the rows are written to the file one by one.
+
+    :param items: The schedules to write (for example the top K of a generation or the results of a batch).
+    :param file_path: The path of the HTML file.
+    :param subtitle: A line of text under every schedule title (for example the parameters of the run)."""
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write(HTML_HEAD)
+        for item in items:
+            file.write(f"<h1>{escape(item.title)} (Fitness Score: {item.fitness:.2f})</h1>\n")
+            if subtitle:
+                file.write(f"<p>{escape(subtitle)}</p>\n")
+            header = "<tr><th>Time</th>" + "".join(f"<th>{escape(item.room_name(room))}</th>" for room in range(item.room_count)) + "</tr>\n"
+            for day, cells in enumerate(day_cells(item)):
+                file.write(f"<h2>Day {day + 1}</h2>\n<table>\n")
+                file.write(header)
+                covered_until = [0] * item.room_count  # the first slot that is not covered by a cell above
+                for offset in range(item.grid.block_size):
+                    row = [f"<tr><td>{item.grid.clock(offset)}</td>"]
+                    for room in range(item.room_count):
+                        if covered_until[room] > offset:
+                            continue
+                        cell = cells.get((room, offset))
+                        if cell is None:
+                            row.append("<td>-</td>")
+                            continue
+                        span, class_indices = cell
+                        covered_until[room] = offset + span
+                        names = escape(", ".join(item.classes[i].name for i in class_indices))
+                        css = "overlap" if len(class_indices) > 1 else "class"
+                        row.append(f"<td class='{css}' rowspan='{span}'>{names}</td>" if span > 1 else f"<td class='{css}'>{names}</td>")
+                    row.append("</tr>\n")
+                    file.write("".join(row))
+                file.write("</table>\n")
+        file.write("</body>\n</html>\n")
+
+
+def write_json(items: list[ExportItem], file_path: str) -> None:
+    """Writes the schedules as JSON: {"schedules": [{"title", "fitness", "classes": [{"name", "day", "room", "start", "end"}, ...]}, ...]}.
+    Every schedule is written to the file as soon as it is converted."""
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('{"schedules": [\n')
+        for index, item in enumerate(items):
+            if index:
+                file.write(",\n")
+            json.dump({"title": item.title, "fitness": item.fitness, "classes": schedule_entries(item)}, file, ensure_ascii=False)
+        file.write("\n]}\n")
+
+
+def write_csv(items: list[ExportItem], file_path: str) -> None:
+    """Writes the schedules as CSV, one row per class with the columns schedule, name, day, room, start, end."""
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["schedule", "name", "day", "room", "start", "end"])
+        for item in items:
+            for entry in schedule_entries(item):
+                writer.writerow([item.title, entry["name"], entry["day"], entry["room"], entry["start"], entry["end"]])
+
+
+def ical_text(text: str) -> str:
+    """Escapes a text value of iCalendar (RFC 5545)."""
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def ical_line(line: str) -> str:
+    """Folds an iCalendar content line so no line is longer than 75 octets in UTF-8 (RFC 5545), the next lines start with a space.
+    A line is only broken between characters, so a letter like "ž" (2 octets) is never split in two."""
+    parts = []
+    current = []
+    size = 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > 75:
+            parts.append("".join(current))
+            current = [" "]  # the space at the start of a folded line counts too
+            size = 1
+        current.append(char)
+        size += char_size
+    parts.append("".join(current))
+    return "\r\n".join(parts) + "\r\n"
+
+
+def write_ical(items: list[ExportItem], file_path: str, week_start: date = None, weeks: int = 1) -> None:
+    """Writes the schedules as an iCalendar file, one event per class, repeated every week if {weeks} is bigger than 1.
+    The times are local (floating) times.
+
+    :param week_start: The Monday of the first week, the Monday of the current week if not given.
+    :param weeks: How many weeks the classes repeat for."""
+    if week_start is None:
+        today = date.today()
+        week_start = today - timedelta(days=today.weekday())
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        file.write(ical_line("BEGIN:VCALENDAR") + ical_line("VERSION:2.0") + ical_line("PRODID:-//GA Class Schedule//EN"))
+        for schedule_idx, item in enumerate(items):
+            for class_idx, day, room, offset in item.placements():
+                begin = datetime.combine(week_start + timedelta(days=day), datetime.min.time()) + timedelta(minutes=item.grid.minutes_of(offset))
+                end = begin + timedelta(minutes=item.classes[class_idx].duration * item.grid.slot_minutes)
+                lines = [
+                    "BEGIN:VEVENT",
+                    f"UID:{schedule_idx}-{class_idx}-{week_start:%Y%m%d}@ga-class-schedule",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART:{begin:%Y%m%dT%H%M%S}",
+                    f"DTEND:{end:%Y%m%dT%H%M%S}",
+                    f"SUMMARY:{ical_text(item.classes[class_idx].name)}",
+                    f"LOCATION:{ical_text(item.room_name(room))}",
+                    f"CATEGORIES:{ical_text(item.title)}",
+                ]
+                if weeks > 1:
+                    lines.append(f"RRULE:FREQ=WEEKLY;COUNT={weeks}")
+                lines.append("END:VEVENT")
+                file.write("".join(ical_line(line) for line in lines))
+        file.write(ical_line("END:VCALENDAR"))
+
+
+WRITERS = {
+    ".html": write_html,
+    ".json": write_json,
+    ".csv": write_csv,
+    ".ics": write_ical,
+}
+
+
+def export_schedules(items: list[ExportItem], file_path: str, file_format: str = None) -> None:
+    """Writes the schedules to a file, the format is taken from the extension (.html, .json, .csv or .ics) unless it is given."""
+    extension = "." + file_format.lstrip(".") if file_format else os.path.splitext(file_path)[1].lower()
+    writer = WRITERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Unknown export format {extension!r}, expected one of {', '.join(WRITERS)}")
+    writer(items, file_path)
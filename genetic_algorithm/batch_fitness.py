@@ -0,0 +1,100 @@
+import numpy as np
+
+from structures.subject import Subject
+
+
+def occupancy_matrix(generation: list):
+    """Builds a 2-D matrix (population x slots) where every row holds how many classes are in each slot of one Schedule.
+    CompactSchedule already keeps these counts so its array is copied directly, for Schedule the lengths of the slot lists are used.
+
+    :param generation: A list of Schedule or CompactSchedule objects with the same number of rooms.
+
+    :return: numpy array of shape (len(generation), slot_count)."""
+    if all(hasattr(individual, 'occupancy') for individual in generation):
+        # All arrays are joined into one buffer, which is much faster than stacking a row at a time
+        return np.frombuffer(b''.join(individual.occupancy for individual in generation), dtype=np.uint16).reshape(len(generation), -1)
+    rows = [np.fromiter((len(slot) for slot in individual.class_list), dtype=np.uint16) for individual in generation]
+    return np.vstack(rows)
+
+
+def starts_matrix(generation: list):
+    """Builds a 2-D matrix (population x classes) with the start slot of every class, -1 if the class is not placed.
+
+    :param generation: A list of Schedule or CompactSchedule objects with the same number of classes.
+
+    :return: numpy array of shape (len(generation), class_count)."""
+    if all(hasattr(individual, 'starts') for individual in generation):
+        return np.frombuffer(b''.join(individual.starts for individual in generation), dtype=np.int32).reshape(len(generation), -1)
+    rows = [np.fromiter((individual.mapping[i] for i in range(len(individual.mapping))), dtype=np.int32) for individual in generation]
+    return np.vstack(rows)
+
+
+def batch_fitness(occupancy, starts, durations, block_size: int = 48, slot_minutes: int = 15):
+    """Calculates the fitness of the whole population at once, with the same rules as Schedule.calculate_fitness:
+    - penalty: +5 if the slot before a class is taken, +5 more if the slot after it is taken too,
+      and then +1000 for every overlapping slot of that class
+    - spread: for every block (day and room) free minutes before the first class times free minutes after the last one
+
+    :param occupancy: Matrix (population x slots) of the number of classes in every slot.
+    :param starts: Matrix (population x classes) of the start slots of the classes.
+    :param durations: The duration of every class in slots.
+    :param block_size: The number of slots in one block.
+    :param slot_minutes: The length of one slot in minutes, the spread is counted in minutes.
+
+    :return: Three arrays (penalty, spread, fitness) with one value for every individual."""
+    population, slot_count = occupancy.shape
+    durations = np.asarray(durations, dtype=np.int32)
+    taken = occupancy > 0
+    flat_taken = taken.ravel()
+
+    # First Part: Schedule Validity
+    # Every start is turned into an index of the flattened matrix, so one take() reads the slot for the whole population
+    starts = starts.astype(np.int32, copy=False)
+    ends = starts + durations  # the first slot after the class
+    row_offsets = (np.arange(population, dtype=np.int32) * slot_count)[:, None]
+    before_taken = (starts > 0) & np.take(flat_taken, row_offsets + np.clip(starts - 1, 0, slot_count - 1))
+    after_taken = before_taken & (ends < slot_count) & np.take(flat_taken, row_offsets + np.clip(ends, 0, slot_count - 1))
+
+    penalty = 1 + 5 * before_taken.sum(axis=1) + 5 * after_taken.sum(axis=1)
+
+    # Number of overlapping slots of every class, from the prefix sums of (occupancy > 1),
+    # only needed for individuals that have an overlap at all
+    overlapping = occupancy > 1
+    rows = np.flatnonzero(overlapping.any(axis=1))
+    if rows.size:
+        overlap_prefix = np.zeros((rows.size, slot_count + 1), dtype=np.int32)
+        np.cumsum(overlapping[rows], axis=1, dtype=np.int32, out=overlap_prefix[:, 1:])
+        overlaps = (np.take_along_axis(overlap_prefix, np.clip(ends[rows], 0, slot_count), axis=1)
+                    - np.take_along_axis(overlap_prefix, np.clip(starts[rows], 0, slot_count), axis=1))
+        penalty[rows] += 1000 * np.where(after_taken[rows], overlaps, 0).sum(axis=1)
+
+    # Second Part: Schedule Spread (Late Starts + Early Finishes)
+    taken = taken.reshape(population, slot_count // block_size, block_size)
+    prefix = taken.argmax(axis=2)  # index of the first taken slot in every block
+    has_classes = np.take_along_axis(taken, prefix[:, :, None], axis=2)[:, :, 0]  # argmax is 0 for an empty block, so check that slot
+    suffix = taken[:, :, ::-1].argmax(axis=2)  # number of free slots after the last class
+    spread = np.where(has_classes, (prefix * slot_minutes) * (suffix * slot_minutes), 0).sum(axis=1)
+
+    return penalty, spread, spread / penalty
+
+
+def evaluate_population(generation: list, classes: list[Subject]):
+    """Calculates and sets the fitness score of every Schedule in the generation with one batch_fitness call.
+
+    :param generation: A list of Schedule or CompactSchedule objects (with the same conflict index, if any).
+    :param classes: List of Subject objects representing the classes to be scheduled.
+
+    :return: numpy array of the fitness scores, in the order of the generation."""
+    if not generation:
+        return np.zeros(0)
+    durations = [subject.duration for subject in classes]
+    grid = generation[0].grid
+    penalty, spread, fitness = batch_fitness(occupancy_matrix(generation), starts_matrix(generation), durations,
+                                             grid.block_size, grid.slot_minutes)
+    if generation[0].conflicts is not None:
+        # The group and lecturer conflicts are kept by every Schedule, they are only added to the batch penalty
+        penalty = penalty + np.fromiter((individual.conflicts.penalty() for individual in generation), dtype=penalty.dtype)
+        fitness = spread / penalty
+    for individual, score in zip(generation, fitness.tolist()):
+        individual.set_fitness_score(score)
+    return fitness
@@ -0,0 +1,97 @@
+import os
+import random
+import struct
+from array import array
+
+from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+
+
+# File layout (all numbers little endian):
+#   magic "GACP", format version (uint16)
+#   generation index, population size, class count, room count (4 x uint32)
+#   time grid: days, slot minutes, start and end of the day in minutes (4 x uint16)
+#   fitness scores (population x float64)
+#   start slots (population x class count x int32), one row of starts per Schedule
+#   random generator state: 625 x uint32 of the Mersenne Twister, then the cached gauss value (float64, NaN if there is none)
+MAGIC = b"GACP"
+VERSION = 2
+_HEADER = struct.Struct("<4sH4I4H")
+_RNG_WORDS = 625
+
+
+def save_checkpoint(file_path: str, generation: list, generation_index: int) -> None:
+    """Saves the whole population, the generation index and the state of the random generator to a compact binary file,
+    so the run can be continued later with load_checkpoint (life_cycle(config=EngineConfig(resume_from=...))).
+    Only that is saved. The state of the run around the population starts again when it is resumed: the history, stale counter
+    and mutation boost of a ConvergenceController, the contents of the FitnessCache and the elapsed time (time_limit counts again from 0).
+    The file is written next to the old one first and then renamed, so a run that is stopped while writing
+    never leaves a broken checkpoint.
+
+    :param file_path: The path of the checkpoint file.
+    :param generation: The current generation of Schedules (or CompactSchedules).
+    :param generation_index: The index of the generation the run continues with.
+    """
+    class_count = generation[0].get_class_count()
+    room_count = generation[0].get_room_count()
+    grid = generation[0].grid
+
+    fitness = array('d', [schedule.get_fitness_score() for schedule in generation])
+    if all(hasattr(schedule, 'starts') for schedule in generation):
+        starts = b''.join(schedule.starts for schedule in generation)  # CompactSchedule already keeps an int32 array
+    else:
+        starts = array('i', [schedule.get_start(i) for schedule in generation for i in range(class_count)])
+
+    version, internal_state, gauss_next = random.getstate()
+    rng_words = array('I', internal_state)
+    gauss = array('d', [float("nan") if gauss_next is None else gauss_next])
+
+    temporary_path = file_path + ".tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, generation_index, len(generation), class_count, room_count, *grid.as_tuple()))
+        fitness.tofile(file)
+        file.write(starts)
+        rng_words.tofile(file)
+        gauss.tofile(file)
+    os.replace(temporary_path, file_path)
+
+
+def load_checkpoint(file_path: str, classes: list[Subject], room_count: int, schedule_class, grid: TimeGrid = DEFAULT_GRID,
+                    conflict_index=None):
+    """Loads a checkpoint made by save_checkpoint: rebuilds the population and restores the random generator.
+
+    :param file_path: The path of the checkpoint file.
+    :param classes: The list of classes, it has to be the same instance that the checkpoint was made for.
+    :param room_count: The number of rooms, it has to be the same as in the checkpoint.
+    :param schedule_class: Schedule or CompactSchedule, the type of the rebuilt individuals.
+    :param grid: The time grid of the run, it has to be the same as in the checkpoint.
+    :param conflict_index: The group and lecturer conflicts the rebuilt Schedules check, None if they are not checked.
+
+    :return: generation (list of Schedules), generation_index"""
+    with open(file_path, 'rb') as file:
+        magic, version, generation_index, population_size, class_count, saved_room_count, *saved_grid = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file_path} is not a checkpoint of this program (version {VERSION})")
+        if class_count != len(classes) or saved_room_count != room_count:
+            raise ValueError(f"The checkpoint is for {class_count} classes and {saved_room_count} rooms, "
+                             f"but the instance has {len(classes)} classes and {room_count} rooms")
+        if tuple(saved_grid) != grid.as_tuple():
+            raise ValueError(f"The checkpoint is for {TimeGrid(*saved_grid)}, but the run uses {grid}")
+        fitness = array('d')
+        fitness.fromfile(file, population_size)
+        starts = array('i')
+        starts.fromfile(file, population_size * class_count)
+        rng_words = array('I')
+        rng_words.fromfile(file, _RNG_WORDS)
+        gauss = array('d')
+        gauss.fromfile(file, 1)
+
+    random.setstate((3, tuple(rng_words), None if gauss[0] != gauss[0] else gauss[0]))  # NaN is the only value not equal to itself
+
+    row_bytes = class_count * starts.itemsize
+    data = starts.tobytes()
+    generation = [
+        schedule_class.from_genome((room_count, data[i * row_bytes:(i + 1) * row_bytes], fitness[i], grid), classes, conflict_index)
+        for i in range(population_size)
+    ]
+    return generation, generation_index
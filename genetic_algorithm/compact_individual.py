@@ -0,0 +1,529 @@
+from array import array
+from functools import lru_cache
+from random import random, randint
+
+from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+from genetic_algorithm.fitness_cache import FitnessCache, evaluate_with_cache
+from genetic_algorithm.conflicts import ConflictIndex, ConflictState, index_of
+from exporting.exporters import ExportItem, write_html
+from const import DEBUG_DELTA_FITNESS
+
+
+@lru_cache(maxsize=8)
+def blank_buffers(slot_count: int, class_count: int, num_blocks: int, block_size: int):
+    """The contents of an empty CompactSchedule of this size (occupancy, starts, free masks), made once and copied by reset."""
+    return array('H', bytes(2 * slot_count)), array('i', [-1]) * class_count, ((1 << block_size) - 1,) * num_blocks
+
+
+class CompactSchedule:
+    """
+    A memory friendly version of Schedule. Instead of a list of lists with class indices in every time slot,
+    it only keeps two flat arrays with a fixed type:
+    - occupancy: for every slot of the time grid (12 hours * 4 quarters * 5 days * room_count by default) it stores how many classes are in it,
+      so 0 is a free slot and anything bigger than 1 is an overlap.
+    - starts: for every class it stores the slot where the class starts (-1 if it is not placed), this is the same as the mapping in Schedule.
+    Slots are ordered the same way as in Schedule, so blocks (a combination of a day and a room) and the fitness are the same.
+    Which classes are in a slot is not stored, it is calculated from the starts when it is needed (printing and HTML output).
+    For placing classes there is also a free slot index, free_masks: one bitmask per block where bit k is set if slot k of the block is free.
+    With it the free starting positions for a class in a block are found with a few bit operations instead of random tries.
+    For the delta fitness block_classes keeps a set of the classes that start in every block (and unplaced the classes that are not placed),
+    so after a move only the classes of the changed blocks are looked at.
+    It has the same methods as Schedule that the algorithm uses, so generation.py and cross_over can work with both of them.
+    The group and lecturer conflicts (conflicts, a ConflictState or None) are kept up to date with every move, like in Schedule,
+    and added to the kept penalty when the fitness is calculated.
+    """
+    __slots__ = ('occupancy', 'starts', 'fitness_score', 'num_blocks', 'block_size', 'grid', 'conflicts',
+                 'penalty_terms', 'penalty_total', 'block_scores', 'spread_total', 'dirty_blocks', 'free_masks', 'block_classes', 'unplaced')
+    debug_fitness = DEBUG_DELTA_FITNESS  # if True every delta fitness update is checked against a full calculation
+    def __init__(self, class_count: int, room_count: int, grid: TimeGrid = DEFAULT_GRID, conflict_index: ConflictIndex = None):
+        """
+        Initializes an empty CompactSchedule with the given number of classes and rooms.
+
+        :param class_count: The number of classes in the schedule.
+        :param room_count: The number of rooms in the schedule.
+        :param grid: The time grid (days, slot length, start and end of the day).
+        :param conflict_index: The group and lecturer conflicts of the classes, None means they are not checked."""
+
+        self.occupancy = array('H', bytes(2 * grid.slot_count(room_count)))  # unsigned 16 bit counters, all zeros
+        self.starts = array('i', [-1]) * class_count
+        self.fitness_score = -1
+        self.grid = grid
+        self.num_blocks = grid.num_blocks(room_count)  # We have grid.days work days and n rooms, so each combination of these is one block
+        self.block_size = grid.block_size # With the default grid we work with quarters of an hour, so 4 quarters per 12 hours (from 7 am to 7 pm)
+        self.free_masks = [(1 << self.block_size) - 1] * self.num_blocks  # every slot of every block is free
+        self.block_classes = [set() for _ in range(self.num_blocks)]
+        self.unplaced = set(range(class_count))
+        self.conflicts = ConflictState(conflict_index, room_count, self.block_size) if conflict_index is not None else None
+        # Kept parts of the fitness for delta updates, None until the fitness is calculated for the first time
+        self.penalty_terms = None
+        self.penalty_total = 1
+        self.block_scores = None
+        self.spread_total = 0
+        self.dirty_blocks = None
+
+    @property
+    def mapping(self):
+        """The mapping of class indices to their first slots, built as a dictionary like in Schedule."""
+        return dict(enumerate(self.starts))
+
+    def get_mapping(self):
+        """Returns the mapping of classes to their indices."""
+        return self.mapping
+
+    def get_fitness_score(self):
+        """Returns the fitness score of the schedule."""
+        return self.fitness_score
+
+    def set_fitness_score(self, score: int) -> None:
+        """Sets the fitness score of the schedule."""
+        self.fitness_score = score
+
+    def genome_key(self):
+        """Returns the start slots of all classes as bytes, a cheap key for the FitnessCache."""
+        return self.starts.tobytes()
+
+    def get_start(self, class_idx: int) -> int:
+        """Returns the first slot of the class, or -1 if the class is not placed."""
+        return self.starts[class_idx]
+
+    def get_class_count(self):
+        """Returns the number of classes the schedule was made for."""
+        return len(self.starts)
+
+    def get_room_count(self):
+        """Returns the number of rooms the schedule was made for."""
+        return self.grid.room_count(self.num_blocks)
+
+    def new_empty(self):
+        """Returns a new empty CompactSchedule with the same number of classes and rooms (and the same grid), used for creating children."""
+        return CompactSchedule(len(self.starts), self.get_room_count(), self.grid, index_of(self))
+
+    def reset(self) -> None:
+        """Empties the schedule in place (all classes unplaced, no fitness), so its arrays can be used again for a new child (SchedulePool).
+        The arrays are overwritten with a copy of an empty schedule of the same size instead of being made again."""
+        occupancy, starts, free_masks = blank_buffers(len(self.occupancy), len(self.starts), self.num_blocks, self.block_size)
+        self.occupancy[:] = occupancy
+        self.starts[:] = starts
+        self.free_masks[:] = free_masks
+        for classes in self.block_classes:
+            classes.clear()
+        self.unplaced.update(range(len(self.starts)))
+        self.fitness_score = -1
+        if self.conflicts is not None:
+            self.conflicts.clear()
+        self.penalty_terms = None
+        self.penalty_total = 1
+        self.block_scores = None
+        self.spread_total = 0
+        self.dirty_blocks = None
+
+    def copy_from(self, other) -> None:
+        """Makes this schedule the same as {other} (with the same number of classes and rooms), the arrays are copied in place.
+        The kept fitness terms are copied too, into the arrays this schedule already has if it has them."""
+        self.occupancy[:] = other.occupancy
+        self.starts[:] = other.starts
+        self.free_masks[:] = other.free_masks
+        self.block_classes = [set(classes) for classes in other.block_classes]
+        self.unplaced = set(other.unplaced)
+        self.fitness_score = other.fitness_score
+        if self.conflicts is not None:
+            self.conflicts.copy_from(other.conflicts)
+        if other.penalty_terms is None:
+            self.penalty_terms = None
+            self.block_scores = None
+            self.dirty_blocks = None
+        else:
+            if self.penalty_terms is None:
+                self.penalty_terms = array('l', other.penalty_terms)
+                self.block_scores = array('l', other.block_scores)
+            else:
+                self.penalty_terms[:] = other.penalty_terms
+                self.block_scores[:] = other.block_scores
+            self.dirty_blocks = set(other.dirty_blocks)
+        self.penalty_total = other.penalty_total
+        self.spread_total = other.spread_total
+
+    def to_genome(self):
+        """Returns the schedule as a small tuple (room count, starts as bytes, fitness score, time grid) that is cheap to send to another process.
+        The occupancy is not sent since it can be built again from the starts."""
+        return self.get_room_count(), self.starts.tobytes(), self.fitness_score, self.grid
+
+    @classmethod
+    def from_genome(cls, genome, classes: list[Subject], conflict_index: ConflictIndex = None):
+        """Builds a CompactSchedule from a genome made by to_genome.
+
+        :param genome: A tuple (room count, starts as bytes, fitness score, time grid).
+        :param classes: The list of classes, needed for their durations.
+        :param conflict_index: The group and lecturer conflicts to check, if any.
+        """
+        room_count, starts, fitness_score, grid = genome
+        schedule = cls(len(classes), room_count, grid, conflict_index)
+        schedule.starts = array('i')
+        schedule.starts.frombytes(starts)
+        for class_idx, start in enumerate(schedule.starts):
+            if start != -1:
+                schedule.place_class(class_idx, start, classes[class_idx].duration)
+        schedule.fitness_score = fitness_score
+        return schedule
+
+    def is_free(self, start: int, duration: int) -> bool:
+        """Checks if {duration} consecutive slots starting from {start} are all empty (a class never goes over the end of its block)."""
+        block, offset = divmod(start, self.block_size)
+        needed = ((1 << duration) - 1) << offset
+        return self.free_masks[block] & needed == needed
+
+    def has_overlap(self, start: int, duration: int) -> bool:
+        """Checks if any of the {duration} slots starting from {start} has more than one class."""
+        occupancy = self.occupancy
+        return any(occupancy[j] > 1 for j in range(start, start + duration))
+
+    def free_starts(self, block: int, duration: int) -> int:
+        """Returns a bitmask of all positions in the block where a class of {duration} slots can start without an overlap,
+        bit k is set if slots k to k + duration - 1 are all free. 0 means that the class does not fit anywhere in the block.
+
+        :param block: The index of the block.
+        :param duration: The duration of the class in slots.
+        """
+        starts = self.free_masks[block]
+        length = 1
+        # After each step bit k says that {length} slots from k are free, the length doubles until it reaches the duration
+        while length < duration and starts:
+            step = min(length, duration - length)
+            starts &= starts >> step
+            length += step
+        return starts
+
+    def random_free_start(self, block: int, duration: int) -> int:
+        """Returns a random slot (global index) where a class of {duration} slots fits in the block without an overlap, or -1 if there is none.
+
+        :param block: The index of the block.
+        :param duration: The duration of the class in slots.
+        """
+        starts = self.free_starts(block, duration)
+        if not starts:
+            return -1
+        for _ in range(randint(0, starts.bit_count() - 1)):
+            starts &= starts - 1  # remove the lowest set bit
+        return block * self.block_size + (starts & -starts).bit_length() - 1
+
+    def random_free_block(self, duration: int) -> int:
+        """Returns a random block that has room for a class of {duration} slots, or -1 if no block has it."""
+        blocks = [block for block in range(self.num_blocks) if self.free_starts(block, duration)]
+        if not blocks:
+            return -1
+        return blocks[randint(0, len(blocks) - 1)]
+
+    def place_class(self, class_idx: int, start: int, duration: int) -> None:
+        """Puts the class in {duration} slots starting from {start} and remembers its start."""
+        occupancy = self.occupancy
+        for j in range(start, start + duration):
+            occupancy[j] += 1
+        self.starts[class_idx] = start
+        block, offset = divmod(start, self.block_size)
+        self.free_masks[block] &= ~(((1 << duration) - 1) << offset)
+        self.block_classes[block].add(class_idx)
+        self.unplaced.discard(class_idx)
+        if self.dirty_blocks is not None:
+            self.dirty_blocks.add(block)
+        if self.conflicts is not None:
+            self.conflicts.place(class_idx, start, duration)
+
+    def remove_class(self, class_idx: int, duration: int) -> None:
+        """Takes the class out of its slots, the class stays unplaced (-1) until it is placed again."""
+        start = self.starts[class_idx]
+        if start == -1:
+            return
+        occupancy = self.occupancy
+        block = start // self.block_size
+        block_start = block * self.block_size
+        freed = 0
+        for j in range(start, start + duration):
+            occupancy[j] -= 1
+            if not occupancy[j]:
+                freed |= 1 << (j - block_start)
+        self.free_masks[block] |= freed
+        self.starts[class_idx] = -1
+        self.block_classes[block].discard(class_idx)
+        self.unplaced.add(class_idx)
+        if self.dirty_blocks is not None:
+            self.dirty_blocks.add(block)
+        if self.conflicts is not None:
+            self.conflicts.remove(class_idx, start, duration)
+
+    def classes_at(self, classes: list[Subject]):
+        """Builds the real list of lists of class indices for every slot, the same as class_list in Schedule.
+
+        :param classes: The list of classes, needed for their durations.
+        """
+        class_list = [[] for _ in range(len(self.occupancy))]
+        for class_idx, start in enumerate(self.starts):
+            if start == -1:
+                continue
+            for j in range(start, start + classes[class_idx].duration):
+                class_list[j].append(class_idx)
+        return class_list
+
+    def set_random_classes(self, class_number: int, classes: list[Subject]):
+        """
+        Used for randomizing an individual, used in creating the first generation.
+        Every class is put in a random free position of a random block. The free positions come from the free slot index,
+        so if the random block is full another block with enough room is chosen, and only if no block has room
+        the class is placed in a random position anyway (with an overlap).
+
+        :param class_number: The number of classes to be scheduled.
+        :param classes: The list of classes to be scheduled.
+        """
+        for i in range(class_number):
+            duration = classes[i].duration
+            # Pick a random block (day and room) and a random free position in it
+            position = self.random_free_start(randint(0, self.num_blocks - 1), duration)
+            if position == -1:
+                position = self.place_anywhere(duration)
+            self.place_class(i, position, duration)
+
+        self.calculate_fitness(classes)
+
+    def place_anywhere(self, duration: int) -> int:
+        """Returns a free position in a random block that has room for the class,
+        or a random position in a random block if there is no room anywhere (an overlap that the fitness will punish)."""
+        block = self.random_free_block(duration)
+        if block != -1:
+            return self.random_free_start(block, duration)
+        block = randint(0, self.num_blocks - 1)
+        block_start = block * self.block_size
+        return randint(block_start, block_start + self.block_size - duration)
+
+    def calculate_fitness(self, all_class: list[Subject]) -> None:
+        """
+        Calculates the fitness score of a schedule, the same way it is done in Schedule.calculate_fitness
+        (validity penalty and the spread of classes), but it only needs the occupancy counts.
+        The first time everything is calculated and the penalty of every class and the spread of every block are kept.
+        After that only the blocks that were changed since the last call (dirty_blocks) and the classes in and next to them
+        are calculated again, which is much faster after a mutation that moves only a few classes.
+        The penalty of the group and lecturer conflicts is already up to date (ConflictState), it is only added.
+
+        :param all_class: The list of classes to calculate the fitness score for.
+        """
+        if self.penalty_terms is None:
+            self.full_fitness_terms(all_class)
+        elif self.dirty_blocks:
+            self.update_fitness_terms(all_class)
+
+        self.set_fitness_score(self.spread_total / (self.penalty_total + self.conflict_penalty()))
+
+        if CompactSchedule.debug_fitness:
+            # Debug mode: the delta result has to be the same as calculating everything again
+            penalty_total, spread_total = self.penalty_total, self.spread_total
+            penalty_terms, block_scores = self.penalty_terms, self.block_scores
+            self.full_fitness_terms(all_class)
+            if (penalty_total, spread_total) != (self.penalty_total, self.spread_total) or penalty_terms != self.penalty_terms or block_scores != self.block_scores:
+                raise AssertionError(f"Delta fitness (penalty {penalty_total}, spread {spread_total}) does not match "
+                                     f"the full calculation (penalty {self.penalty_total}, spread {self.spread_total})")
+            if self.conflicts is not None and self.conflicts.total != self.conflicts.full_total():
+                raise AssertionError(f"Kept conflicts ({self.conflicts.total} slots) do not match the interval lists ({self.conflicts.full_total()})")
+            if self.conflicts is not None:
+                moved = sum(1 for class_idx, start in enumerate(self.starts) if start != -1 and self.conflicts.index.moved(class_idx, start))
+                if moved != self.conflicts.moved:
+                    raise AssertionError(f"Kept moved classes ({self.conflicts.moved}) do not match the starts ({moved})")
+
+    def conflict_penalty(self) -> int:
+        """The penalty of the group and lecturer conflicts, 0 if they are not checked."""
+        return self.conflicts.penalty() if self.conflicts is not None else 0
+
+    def full_fitness_terms(self, all_class: list[Subject]) -> None:
+        """Calculates the penalty of every class and the spread score of every block from scratch and keeps them for later updates.
+
+        :param all_class: The list of classes, needed for their durations.
+        """
+        # First Part: Schedule Validity
+        self.penalty_terms = array('l', [self.class_penalty(start, all_class[i].duration) for i, start in enumerate(self.starts)])
+        self.penalty_total = 1 + sum(self.penalty_terms)
+
+        # Second Part: Schedule Spread (Late Starts + Early Finishes)
+        self.block_scores = array('l', [self.block_spread(block_start) for block_start in range(0, len(self.occupancy), self.block_size)])
+        self.spread_total = sum(self.block_scores)
+        self.dirty_blocks = set()
+
+    def update_fitness_terms(self, all_class: list[Subject]) -> None:
+        """Updates the kept penalties and spread scores only for the blocks in dirty_blocks.
+        A class penalty depends on its own slots and the slot right before and after it, so the classes that start in a dirty block
+        (block_classes) are updated, and also the classes of the neighbouring blocks that touch the edge of a dirty block.
+
+        :param all_class: The list of classes, needed for their durations.
+        """
+        block_size = self.block_size
+        dirty = self.dirty_blocks
+        block_scores = self.block_scores
+        for block in dirty:
+            score = self.block_spread(block * block_size)
+            self.spread_total += score - block_scores[block]
+            block_scores[block] = score
+
+        penalty_terms = self.penalty_terms
+        starts = self.starts
+        for class_index in self.unplaced:
+            if penalty_terms[class_index]:
+                self.penalty_total -= penalty_terms[class_index]
+                penalty_terms[class_index] = 0
+
+        def update(class_index):
+            term = self.class_penalty(starts[class_index], all_class[class_index].duration)
+            self.penalty_total += term - penalty_terms[class_index]
+            penalty_terms[class_index] = term
+
+        for block in dirty:
+            block_start = block * block_size
+            for class_index in self.block_classes[block]:
+                update(class_index)
+            # A class that ends at the end of the block before, or starts at the start of the block after, sees a slot of this block
+            if block > 0 and block - 1 not in dirty:
+                for class_index in self.block_classes[block - 1]:
+                    if starts[class_index] + all_class[class_index].duration == block_start:
+                        update(class_index)
+            if block < self.num_blocks - 1 and block + 1 not in dirty:
+                for class_index in self.block_classes[block + 1]:
+                    if starts[class_index] == block_start + block_size:
+                        update(class_index)
+        dirty.clear()
+
+    def reuse_fitness_terms(self, parent1, parent2) -> None:
+        """Used for children made in cross_over. Takes the kept fitness terms from the parent that is more similar to this child,
+        and marks only the blocks where the child is different as dirty, so the next calculate_fitness is a small update.
+
+        :param parent1: The first parent CompactSchedule.
+        :param parent2: The second parent CompactSchedule.
+        """
+        best_parent = None
+        best_changes = None
+        for parent in (parent1, parent2):
+            if parent.penalty_terms is None:
+                continue
+            changes = [(own, other) for own, other in zip(self.starts, parent.starts) if own != other]
+            if best_changes is None or len(changes) < len(best_changes):
+                best_parent, best_changes = parent, changes
+        if best_parent is None:
+            return
+
+        block_size = self.block_size
+        dirty = set(best_parent.dirty_blocks)
+        for own, other in best_changes:
+            if own != -1:
+                dirty.add(own // block_size)
+            if other != -1:
+                dirty.add(other // block_size)
+        self.penalty_terms = array('l', best_parent.penalty_terms)
+        self.penalty_total = best_parent.penalty_total
+        self.block_scores = array('l', best_parent.block_scores)
+        self.spread_total = best_parent.spread_total
+        self.dirty_blocks = dirty
+
+    def class_penalty(self, start: int, duration: int) -> int:
+        """Returns the validity penalty of one class, with the rules of Schedule.calculate_fitness:
+        +5 if the slot before the class is taken, another +5 if the slot after it is taken as well,
+        and only then +1000 for every slot of the class that has an overlap.
+
+        :param start: The first slot of the class (-1 if the class is not placed).
+        :param duration: The duration of the class in slots.
+        """
+        occupancy = self.occupancy
+        # Check before
+        if start <= 0 or not occupancy[start - 1]:
+            return 0
+        # Check after
+        end = start + duration
+        if end >= len(occupancy) or not occupancy[end]:
+            return 5
+        penalty = 10
+        # Check slot overlap
+        for i in range(start, end):
+            if occupancy[i] > 1:
+                penalty += 1000
+        return penalty
+
+    def block_spread(self, block_start: int) -> int:
+        """Returns the spread score of one block (day and room), free minutes before the first class times free minutes after the last one.
+
+        :param block_start: The first slot of the block.
+        """
+        occupancy = self.occupancy
+        block_end = block_start + self.block_size
+        prefix = 0
+        for i in range(block_start, block_end):
+            if occupancy[i]:
+                break
+            prefix += 1
+        # If the prefix is equal to the block size, it means that there are no classes scheduled in that block
+        if prefix == self.block_size:
+            return 0
+        suffix = 0
+        for i in range(block_end - 1, block_start - 1, -1):
+            if occupancy[i]:
+                break
+            suffix += 1
+        slot_minutes = self.grid.slot_minutes
+        return (prefix * slot_minutes) * (suffix * slot_minutes)  # Convert slots to minutes
+
+    def mutate(self, mutation_chance: float, all_classes: list[Subject], evaluate: bool = True, cache: FitnessCache = None):
+        """Funtion that handles the mutation of an individual, like Schedule.mutate.
+        It randomly selects classes and moves them to a random free position in the same block (taken from the free slot index).
+
+        :param mutation_chance: The chance of mutation happening, a number between 0 and 1.
+        :param all_classes: The list of classes to be scheduled.
+        :param evaluate: If False the fitness score is not recalculated, used when the whole generation is evaluated at once.
+        :param cache: An optional FitnessCache, checked before the fitness is calculated.
+        """
+        mutation_happens = random()
+        if mutation_happens > mutation_chance:
+            if evaluate:
+                evaluate_with_cache(self, all_classes, cache)  # If we do not mutate, we still need to calculate the fitness score
+            return
+
+        class_count = len(self.starts)
+        class_num = randint(len(all_classes)//16, len(all_classes)//4)
+        # Will mutate {class_num} classes randomly, from 1/16 to 1/4 of all classes so it also randomizes the mutation weight
+        for _ in range(class_num):
+            class_index = randint(0, class_count - 1)
+            block = self.starts[class_index] // self.block_size
+            duration = all_classes[class_index].duration
+
+            # Remove the class from the old position
+            self.remove_class(class_index, duration)
+
+            # A new free position in the same block, if the block is full the class goes to another block
+            new_position = self.random_free_start(block, duration)
+            if new_position == -1:
+                new_position = self.place_anywhere(duration)
+
+            self.place_class(class_index, new_position, duration)
+
+        if evaluate:
+            evaluate_with_cache(self, all_classes, cache)
+
+    def __repr__(self):
+        return f"CompactSchedule(starts={self.starts.tolist()}, fitness_score={self.fitness_score})"
+
+    def __str__(self):
+        return f"CompactSchedule: {self.starts.tolist()}, {self.fitness_score}"
+
+    def count_overlaps(self) -> int:
+        """Returns the number of slots that have more than one class."""
+        return sum(1 for count in self.occupancy if count > 1)
+
+    def no_overlap(self):
+        """Check if the schedule has no overlaps and print a message accordingly."""
+        if max(self.occupancy, default=0) > 1:
+            print("OVERLAP!!!!!!!! NOT GOOD!!!!")
+            return False
+
+        print("\n YAYYYYYY NO OVERLAP, VALID SCHEDULE!!!! \n   >>>>>>>>>>>>>>>")
+        return True
+
+    def write_schedule_to_html(self, classes: list[Subject], filename: str, generation: int = 0, mutation: list[float] = [0.5, 0.3, 0.2], keepPercent: float = 0.2):
+        """
+        Write the schedule to an HTML file, in the same format as Schedule.write_schedule_to_html (see exporting/exporters.py).
+        """
+        write_html([ExportItem.from_schedule(self, classes)], filename,
+                   subtitle=f"Generation: {generation}, Mutation: {mutation}, Keep Percent: {keepPercent}")
+        print(f"\n Schedule written to {filename}")
+
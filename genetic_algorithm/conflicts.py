@@ -0,0 +1,199 @@
+from bisect import bisect_left, insort
+
+from structures.subject import Subject
+from const import CONFLICT_PENALTY, DISRUPTION_PENALTY
+
+
+class ConflictIndex:
+    """
+    The conflict graph of an instance, made once from the groups and lecturers of the classes and shared by all Schedules.
+    Every student group and every lecturer is a resource with a number, two classes are in conflict if they have a resource in common
+    (the same group or the same lecturer) and then they must not be at the same time on the same day in different rooms
+    (two classes at the same time in the same room are already an overlap that the fitness penalizes, so they are not counted again).
+    - class_resources: for every class the sorted tuple of its resource numbers,
+    - neighbours: for every class the classes it is in conflict with (the edges of the graph).
+    The time overlaps are not found by comparing all pairs, every Schedule keeps a ConflictState with interval lists per resource and day.
+    For re-scheduling (warm_start.py) it can also have the start slots of a previous schedule (reference), then every class that is
+    placed somewhere else than in the reference adds {disruption_penalty}, so the classes that do not have to move stay where they were.
+    """
+    __slots__ = ('resources', 'class_resources', 'neighbours', 'penalty', 'reference', 'disruption_penalty')
+    def __init__(self, classes: list[Subject], penalty: int = CONFLICT_PENALTY, reference: list[int] = None,
+                 disruption_penalty: int = DISRUPTION_PENALTY, check_groups: bool = True):
+        """
+        :param classes: The list of classes, their groups and lecturers are read.
+        :param penalty: The penalty for every slot in which two classes in conflict overlap.
+        :param reference: The start slot of every class in the previous schedule (-1 for the classes that were not in it), or None.
+        :param disruption_penalty: The penalty for every class that is not at its reference start.
+        :param check_groups: If False the groups and lecturers are not read, only the reference is checked.
+        """
+        resource_ids = {}
+        self.class_resources = []
+        for subject in classes:
+            keys = [("group", group) for group in subject.groups] if check_groups else []
+            if subject.lecturer and check_groups:
+                keys.append(("lecturer", subject.lecturer))
+            self.class_resources.append(tuple(sorted({resource_ids.setdefault(key, len(resource_ids)) for key in keys})))
+        self.resources = list(resource_ids)  # ("group" or "lecturer", name) of every resource number
+        self.penalty = penalty
+        self.reference = list(reference) if reference is not None else None
+        self.disruption_penalty = disruption_penalty
+
+        members = [[] for _ in self.resources]
+        for class_idx, resources in enumerate(self.class_resources):
+            for resource in resources:
+                members[resource].append(class_idx)
+        self.neighbours = []
+        for class_idx, resources in enumerate(self.class_resources):
+            linked = {other for resource in resources for other in members[resource]}
+            linked.discard(class_idx)
+            self.neighbours.append(tuple(sorted(linked)))
+
+    def edge_count(self) -> int:
+        """The number of pairs of classes that are in conflict."""
+        return sum(len(linked) for linked in self.neighbours) // 2
+
+    def moved(self, class_idx: int, start: int) -> bool:
+        """True if the class at {start} is not where the reference schedule has it (classes without a reference start never count)."""
+        return self.reference is not None and self.reference[class_idx] != -1 and start != self.reference[class_idx]
+
+    def __repr__(self):
+        return f"ConflictIndex(resources={len(self.resources)}, edges={self.edge_count()}, reference={self.reference is not None})"
+
+
+def conflict_index_for(classes: list[Subject], reference: list[int] = None, disruption_penalty: int = DISRUPTION_PENALTY,
+                       check_groups: bool = True):
+    """Returns a ConflictIndex of the classes, or None if there is nothing to check
+    (no class has a group or a lecturer, or they are not checked, and there is no reference schedule).
+
+    :param classes: The list of classes.
+    :param reference: The start slots of a previous schedule for the disruption penalty (warm_start.reference_starts), or None.
+    :param disruption_penalty: The penalty for every class that moved from its reference start.
+    :param check_groups: If False the groups and lecturers are ignored."""
+    has_groups = check_groups and any(subject.groups or subject.lecturer for subject in classes)
+    if has_groups or reference is not None:
+        return ConflictIndex(classes, reference=reference, disruption_penalty=disruption_penalty, check_groups=check_groups)
+    return None
+
+
+def index_of(schedule):
+    """The ConflictIndex a Schedule checks, or None, used to make new Schedules with the same constraints."""
+    return schedule.conflicts.index if schedule.conflicts is not None else None
+
+
+class ConflictState:
+    """
+    The group and lecturer conflicts of one Schedule, kept up to date by place_class and remove_class of the Schedule.
+    For every resource and day there is a list of the intervals (first slot of the day, slot after the end, class index, block)
+    of its classes on that day, sorted by the start. Pairs in the same block (the same room) are skipped. A class is compared only with the classes of its own groups and lecturer
+    on the same day, and only the ones that start before it ends (found with bisect), so placing or removing a class costs
+    about the number of classes a group has in one day, and a mutation updates the total without looking at the other classes.
+    total is the number of overlapping slots of all pairs of classes in conflict in different rooms (a pair with two common resources
+    is counted once),
+    moved is the number of placed classes that are not at their start in the reference schedule of the index.
+    """
+    __slots__ = ('index', 'room_count', 'block_size', 'day_lists', 'total', 'moved')
+    def __init__(self, index: ConflictIndex, room_count: int, block_size: int):
+        """
+        :param index: The conflict graph of the instance.
+        :param room_count: The number of rooms of the Schedule, to find the day of a slot.
+        :param block_size: The number of slots in one day of one room.
+        """
+        self.index = index
+        self.room_count = room_count
+        self.block_size = block_size
+        self.day_lists = {}  # (resource, day) -> sorted list of (start, end, class index, block), only lists with classes
+        self.total = 0
+        self.moved = 0
+
+    def penalty(self) -> int:
+        """The part of the fitness penalty that comes from the conflicts (and from the classes moved away from the reference)."""
+        return self.total * self.index.penalty + self.moved * self.index.disruption_penalty
+
+    def penalty_at(self, class_idx: int, start: int, duration: int) -> int:
+        """How much the penalty would grow if the class (now not placed) was put at {start}, used by the local search."""
+        penalty = self.overlap_with(class_idx, start, duration) * self.index.penalty
+        if self.index.moved(class_idx, start):
+            penalty += self.index.disruption_penalty
+        return penalty
+
+    def overlap_with(self, class_idx: int, start: int, duration: int) -> int:
+        """Returns how many slots the class, if it was at {start}, would overlap with the classes it is in conflict with in other rooms.
+        The class itself is skipped, so it can be called while the class is placed too."""
+        block, offset = divmod(start, self.block_size)
+        day = block // self.room_count
+        end = offset + duration
+        overlaps = {}
+        for resource in self.index.class_resources[class_idx]:
+            entries = self.day_lists.get((resource, day))
+            if not entries:
+                continue
+            for k in range(bisect_left(entries, (end,))):  # the classes that start before this one ends
+                other_start, other_end, other, other_block = entries[k]
+                if other_end > offset and other != class_idx and other_block != block:
+                    overlaps[other] = min(end, other_end) - max(offset, other_start)
+        return sum(overlaps.values())
+
+    def place(self, class_idx: int, start: int, duration: int) -> None:
+        """Adds a class that was just put at {start}."""
+        if self.index.moved(class_idx, start):
+            self.moved += 1
+        if not self.index.neighbours[class_idx]:
+            return  # a class that is in conflict with no other class is not kept in the lists
+        resources = self.index.class_resources[class_idx]
+        self.total += self.overlap_with(class_idx, start, duration)
+        block, offset = divmod(start, self.block_size)
+        day = block // self.room_count
+        entry = (offset, offset + duration, class_idx, block)
+        for resource in resources:
+            entries = self.day_lists.get((resource, day))
+            if entries is None:
+                self.day_lists[(resource, day)] = [entry]
+            else:
+                insort(entries, entry)
+
+    def remove(self, class_idx: int, start: int, duration: int) -> None:
+        """Takes out a class that was at {start}."""
+        if self.index.moved(class_idx, start):
+            self.moved -= 1
+        if not self.index.neighbours[class_idx]:
+            return  # a class that is in conflict with no other class is not kept in the lists
+        resources = self.index.class_resources[class_idx]
+        block, offset = divmod(start, self.block_size)
+        day = block // self.room_count
+        entry = (offset, offset + duration, class_idx, block)
+        for resource in resources:
+            entries = self.day_lists[(resource, day)]
+            entries.remove(entry)
+            if not entries:
+                del self.day_lists[(resource, day)]
+        self.total -= self.overlap_with(class_idx, start, duration)
+
+    def clear(self) -> None:
+        """Forgets all classes (when the Schedule is emptied with reset)."""
+        self.day_lists.clear()
+        self.total = 0
+        self.moved = 0
+
+    def copy_from(self, other) -> None:
+        """Makes this state the same as {other}, the state of a Schedule with the same classes and rooms."""
+        self.day_lists = {key: list(entries) for key, entries in other.day_lists.items()}
+        self.total = other.total
+        self.moved = other.moved
+
+    def overlapping_pairs(self) -> dict:
+        """Goes through the sorted interval lists and returns {(class, other class): overlapping slots} of every pair in conflict
+        that overlaps in different rooms."""
+        pairs = {}
+        for entries in self.day_lists.values():
+            for i, (start, end, class_idx, block) in enumerate(entries):
+                for other_start, other_end, other, other_block in entries[i + 1:]:
+                    if other_start >= end:
+                        break  # the list is sorted by the start, so no later class overlaps this one
+                    if other_block == block:
+                        continue  # an overlap in the same room, the fitness already penalizes it
+                    pairs[(min(class_idx, other), max(class_idx, other))] = min(end, other_end) - other_start
+        return pairs
+
+    def full_total(self) -> int:
+        """Counts the overlapping slots again from the interval lists, used to check the kept total in debug mode."""
+        return sum(self.overlapping_pairs().values())
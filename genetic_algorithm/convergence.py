@@ -0,0 +1,125 @@
+from collections import deque
+from time import perf_counter
+
+
+def start_list(schedule):
+    """The start slot of every class, for Schedule (mapping) and CompactSchedule (starts array)."""
+    if hasattr(schedule, 'starts'):
+        return schedule.starts
+    return list(schedule.mapping.values())
+
+
+def mapping_diversity(generation: list, sample_size: int = 20) -> float:
+    """The average pairwise mapping distance of the first {sample_size} Schedules of the generation:
+    for every pair, the part of the classes (0 to 1) that start in a different slot. 0 means all sampled Schedules are the same.
+
+    :param generation: The Schedules, sorted from the best (the best ones are sampled).
+    :param sample_size: How many Schedules are compared, the cost grows with its square."""
+    sample = [start_list(schedule) for schedule in generation[:sample_size]]
+    if len(sample) < 2 or not len(sample[0]):
+        return 0.0
+    different = 0
+    pairs = 0
+    for i in range(len(sample)):
+        for j in range(i + 1, len(sample)):
+            different += sum(1 for a, b in zip(sample[i], sample[j]) if a != b)
+            pairs += 1
+    return different / (pairs * len(sample[0]))
+
+
+class ConvergenceController:
+    """
+    Watches how the run converges and decides about the mutation chance and about stopping, given to life_cycle(config=EngineConfig(convergence=...)).
+    After every generation (update) it keeps the best and the mean fitness of the last {window} generations and the diversity of the population.
+    - Stagnation: the best fitness grew by less than {min_improvement} (relative) over the window, or the diversity is below {min_diversity}.
+      While the population stagnates the mutation chance of the current phase is multiplied by {boost} (up to {max_mutation}),
+      and it goes back to normal as soon as the best fitness improves.
+    - Stopping: after {patience} generations without a new best fitness ("stagnation"), or when {time_limit} seconds have passed ("time_limit").
+    stop_reason tells why should_stop returned True.
+    The engines call start when their main loop begins, so one controller can be made long before the run (or used for several runs)
+    and the time budget and the history always belong to the current run.
+    """
+    __slots__ = ('window', 'patience', 'min_improvement', 'min_diversity', 'boost', 'max_mutation', 'diversity_sample', 'time_limit',
+                 'best_history', 'mean_history', 'best_fitness', 'stale_generations', 'diversity', 'stop_reason', 'start_time')
+    def __init__(self, window: int = 50, patience: int = 300, min_improvement: float = 0.001, min_diversity: float = 0.05,
+                 boost: float = 2.0, max_mutation: float = 0.9, diversity_sample: int = 20, time_limit: float = None):
+        """
+        :param window: The number of generations in the sliding window.
+        :param patience: The run stops after this many generations without a better best fitness, 0 means never.
+        :param min_improvement: The smallest relative improvement of the best fitness over the window that is not stagnation.
+        :param min_diversity: Below this average pairwise mapping distance (0 to 1) the population is stagnating too.
+        :param boost: How much the mutation chance is multiplied by while the population stagnates.
+        :param max_mutation: The highest mutation chance the boost can give.
+        :param diversity_sample: How many of the best Schedules are used to measure the diversity.
+        :param time_limit: A wall-clock budget for the run in seconds, None means no limit.
+        """
+        self.window = window
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.min_diversity = min_diversity
+        self.boost = boost
+        self.max_mutation = max_mutation
+        self.diversity_sample = diversity_sample
+        self.time_limit = time_limit
+        self.best_history = deque(maxlen=window)
+        self.mean_history = deque(maxlen=window)
+        self.start()
+
+    def start(self) -> None:
+        """Called by life_cycle and steady_state_life_cycle right before their main loop: forgets the history of an earlier run
+        and starts counting the time budget from now."""
+        self.best_history.clear()
+        self.mean_history.clear()
+        self.best_fitness = None
+        self.stale_generations = 0
+        self.diversity = 1.0
+        self.stop_reason = None
+        self.start_time = perf_counter()
+
+    def update(self, generation: list) -> None:
+        """Called by life_cycle after the selection of every generation.
+
+        :param generation: The new generation, sorted from the best Schedule."""
+        fitness = [schedule.get_fitness_score() for schedule in generation]
+        best = fitness[0]
+        self.best_history.append(best)
+        self.mean_history.append(sum(fitness) / len(fitness))
+        if self.best_fitness is None or best > self.best_fitness:
+            self.best_fitness = best
+            self.stale_generations = 0
+        else:
+            self.stale_generations += 1
+        self.diversity = mapping_diversity(generation, self.diversity_sample)
+
+    def stagnating(self) -> bool:
+        """True if the best fitness did not grow enough over the whole window or the population lost its diversity."""
+        if self.diversity < self.min_diversity:
+            return True
+        if len(self.best_history) < self.window:
+            return False
+        first = self.best_history[0]
+        return self.best_history[-1] - first <= self.min_improvement * abs(first)
+
+    def mutation_chance(self, base: float) -> float:
+        """Returns the mutation chance to use in the next generation, {base} is the chance of the current phase (mutation_for_generation)."""
+        if self.stale_generations and self.stagnating():
+            return min(self.max_mutation, base * self.boost)
+        return base
+
+    def should_stop(self) -> bool:
+        """True if the run should end, the reason is kept in stop_reason."""
+        if self.patience and self.stale_generations >= self.patience:
+            self.stop_reason = "stagnation"
+        elif self.time_limit is not None and perf_counter() - self.start_time > self.time_limit:
+            self.stop_reason = "time_limit"
+        return self.stop_reason is not None
+
+    def summary(self) -> dict:
+        """The state of the controller, for printing and for the instrumentation records."""
+        return {
+            "best_fitness": self.best_fitness,
+            "window_mean": sum(self.mean_history) / len(self.mean_history) if self.mean_history else None,
+            "stale_generations": self.stale_generations,
+            "diversity": round(self.diversity, 4),
+            "stagnating": self.stagnating(),
+        }
@@ -0,0 +1,143 @@
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+from genetic_algorithm.individual import Schedule
+
+
+# Options only some engines use, an engine refuses a config where one of the others is not at its default
+GENERATIONAL_OPTIONS = ("batch_fitness", "workers", "parent_selection", "checkpoint_path", "resume_from", "local_search_every")
+STEADY_STATE_OPTIONS = ("pairs_per_step", "tournament_size", "reject_duplicates")
+ISLAND_OPTIONS = ("islands", "migration_interval", "migrants", "topology")
+LOOP_OPTIONS = ("fitness_cache_size", "instrumentation", "time_limit", "repair_overlaps", "heuristic_init", "convergence", "pool_buffers",
+                "initial_schedule")  # used by life_cycle and steady_state_life_cycle, not by the islands
+
+
+class EngineConfig:
+    """
+    All options of a run of the genetic algorithm besides the problem itself (the classes, rooms, population size,
+    mutation chances and stopping criteria), given to life_cycle, steady_state_life_cycle and island_life_cycle as config=...
+    Every option is off (or the same as the original algorithm) by default, so EngineConfig() is a plain run.
+    One config can be given to any engine, but an engine raises ValueError for an option it does not support (reject_options).
+    """
+    __slots__ = ('schedule_class', 'seed', 'grid', 'conflict_index', 'fitness_cache_size', 'instrumentation', 'verbose', 'time_limit',
+                 'repair_overlaps', 'heuristic_init', 'convergence', 'pool_buffers', 'initial_schedule', 'warm_start_perturbation',
+                 'batch_fitness', 'workers', 'parent_selection', 'checkpoint_path', 'checkpoint_every', 'resume_from', 'local_search_every',
+                 'local_search_fraction', 'local_search_strategy', 'pairs_per_step', 'tournament_size', 'reject_duplicates', 'islands',
+                 'migration_interval', 'migrants', 'topology', 'poll_seconds')
+    def __init__(self, schedule_class=Schedule, seed: int = None, grid: TimeGrid = DEFAULT_GRID, conflict_index=None,
+                 fitness_cache_size: int = 0, instrumentation=None, verbose: bool = True, time_limit: float = None,
+                 repair_overlaps: bool = False, heuristic_init: float = 0.0, convergence=None, pool_buffers: bool = False,
+                 initial_schedule: list[int] = None, warm_start_perturbation: float = 0.1,
+                 batch_fitness: bool = False, workers: int = 1, parent_selection: str = "roulette", checkpoint_path: str = None,
+                 checkpoint_every: int = 0, resume_from: str = None, local_search_every: int = 0, local_search_fraction: float = 0.1,
+                 local_search_strategy: str = "first",
+                 pairs_per_step: int = 1, tournament_size: int = 3, reject_duplicates: bool = True,
+                 islands: int = 4, migration_interval: int = 50, migrants: int = 2, topology: str = "ring", poll_seconds: float = 1.0):
+        """
+        All engines:
+        :param schedule_class: The representation of individuals, Schedule (default), CompactSchedule or SparseSchedule (for big grids).
+        Children have the same type as their parents. All of them place random classes from their free slot index,
+        so with the same seed they give the same run.
+        :param seed: If given, the random generator is seeded with it, so the run can be repeated (for the same number of workers).
+        The islands each get their own seed made from it.
+        :param grid: The time grid (days, slot length, start and end of the day). The classes have to be loaded with the same grid,
+        since their durations are counted in its slots.
+        :param conflict_index: If given (conflicts.conflict_index_for), two classes of the same student group or lecturer at the same time
+        are penalized like an overlap, even in different rooms. None means the groups and lecturers are not checked.
+
+        life_cycle and steady_state_life_cycle:
+        :param fitness_cache_size: If bigger than 0, the fitness scores of up to this many genomes are remembered (FitnessCache)
+        so identical children are not evaluated again. It is not used by parallel breeding or batch_fitness.
+        :param instrumentation: An optional Instrumentation that measures every phase and sends records to its callbacks (for example
+        a JSON-lines file). With parallel breeding the whole breeding step is counted as crossover.
+        :param verbose: If False the statistics of every generation are not printed (print_generation).
+        :param time_limit: If given, the run also stops after this many seconds (checked once per generation).
+        :param repair_overlaps: If True every child is repaired right after the crossover with repair.OverlapRepair (classes forced into
+        overlapping slots are moved to the nearest free position). It is not used by parallel breeding.
+        :param heuristic_init: The part of the first generation (0 to 1) built with constructive heuristics instead of random placement,
+        see generate_first_gen.
+        :param convergence: An optional ConvergenceController. It raises the mutation chance while the population stagnates and stops the run
+        after too many generations without a better Schedule ("stagnation") or when its time budget is used ("time_limit").
+        The engine calls its start when the main loop begins (after the first generation), so the history and the time budget
+        belong to this run even if the controller was made earlier or used before.
+        :param pool_buffers: If True the Schedules that are thrown away are kept in a SchedulePool and reused as the next children,
+        instead of making new ones every generation. It is not used by parallel breeding.
+        :param initial_schedule: For re-scheduling after small changes: the start slot of every class in a previous schedule
+        (warm_start.reference_starts, -1 for new classes). The first generation is then made of that schedule and copies of it
+        with a few classes moved (warm_start.warm_start_generation) instead of random individuals. To keep the classes where they were,
+        give a conflict_index with the same reference (conflict_index_for(classes, reference=...)).
+        :param warm_start_perturbation: The biggest part of the classes moved in one copy of the initial schedule.
+
+        life_cycle:
+        :param batch_fitness: If True every generation of children is evaluated at once with NumPy instead of one child at a time.
+        It does not work with SparseSchedule.
+        :param workers: The number of processes that make children (parallel.parallel_crossover_all), 1 means everything is done in this process.
+        Needs CompactSchedule, the children are evaluated in the workers so batch_fitness is not used then.
+        :param parent_selection: "roulette" (default, roulette_parent_selection), "rank" or "tournament", see choose_parent_pairs.
+        "rank" and "tournament" build their sampler once per generation, so they are much faster for big populations,
+        but they choose the parents differently, so the runs do not give the same results as with roulette.
+        :param checkpoint_path: If given (with checkpoint_every), the population is saved to this file every {checkpoint_every} generations.
+        :param checkpoint_every: How many generations pass between two checkpoints, 0 means no checkpoints.
+        :param resume_from: The path of a checkpoint to continue from instead of starting with a new first generation.
+        The population, the generation index and the random generator are restored. The rest of the state of the run is not saved
+        and starts again: the convergence history (stale generations, mutation boost), the FitnessCache and the elapsed time
+        for time_limit. Without a ConvergenceController or time_limit the resumed run makes the same generations as a run
+        that was never stopped, otherwise it can stop later or mutate differently.
+        :param local_search_every: If bigger than 0, every {local_search_every} generations the best children are improved with
+        local_search.improve_children before the selection. Needs CompactSchedule.
+        :param local_search_fraction: The part of the children that is improved (the best ones by fitness), 1 means all of them.
+        :param local_search_strategy: "first" (first improvement) or "best" (hill climbing), see local_search.local_search.
+
+        steady_state_life_cycle:
+        :param pairs_per_step: How many pairs of parents breed in one step before the next parents are chosen. All parents of a step
+        are chosen from the population as it is before the step.
+        :param tournament_size: How many Schedules take part in the tournament for one parent.
+        :param reject_duplicates: If True a child that is the same as a Schedule in the population is thrown away.
+
+        island_life_cycle:
+        :param islands: The number of islands (processes).
+        :param migration_interval: How many generations pass between two migrations.
+        :param migrants: How many of the best Schedules of an island migrate each time.
+        :param topology: "ring" or "random", where the migrants go.
+        :param poll_seconds: How long the driver waits for a result before it checks that all island processes are still alive.
+        """
+        self.schedule_class = schedule_class
+        self.seed = seed
+        self.grid = grid
+        self.conflict_index = conflict_index
+        self.fitness_cache_size = fitness_cache_size
+        self.instrumentation = instrumentation
+        self.verbose = verbose
+        self.time_limit = time_limit
+        self.repair_overlaps = repair_overlaps
+        self.heuristic_init = heuristic_init
+        self.convergence = convergence
+        self.pool_buffers = pool_buffers
+        self.initial_schedule = initial_schedule
+        self.warm_start_perturbation = warm_start_perturbation
+        self.batch_fitness = batch_fitness
+        self.workers = workers
+        self.parent_selection = parent_selection
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.resume_from = resume_from
+        self.local_search_every = local_search_every
+        self.local_search_fraction = local_search_fraction
+        self.local_search_strategy = local_search_strategy
+        self.pairs_per_step = pairs_per_step
+        self.tournament_size = tournament_size
+        self.reject_duplicates = reject_duplicates
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.topology = topology
+        self.poll_seconds = poll_seconds
+
+    def changed_options(self, names) -> list[str]:
+        """Returns the options of {names} that are not at their default value."""
+        default = EngineConfig()
+        return [name for name in names if getattr(self, name) != getattr(default, name)]
+
+    def reject_options(self, engine: str, names) -> None:
+        """Raises ValueError if one of the options {names}, which {engine} does not support, is not at its default value."""
+        changed = self.changed_options(names)
+        if changed:
+            raise ValueError(f"The {engine} engine does not support these options: {', '.join(changed)}")
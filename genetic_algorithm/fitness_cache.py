@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+from structures.subject import Subject
+
+
+class FitnessCache:
+    """
+    Remembers the fitness scores of Schedules that were already evaluated, so a child that is the same as some earlier Schedule
+    (which happens a lot in late generations, when the population is very similar) does not have to be evaluated again.
+    The key is the genome of a Schedule (the start slot of every class, see genome_key), and when there are more than {maxsize}
+    entries the least recently used one is thrown out (LRU).
+    """
+    __slots__ = ('maxsize', 'entries', 'hits', 'misses')
+    def __init__(self, maxsize: int = 10000):
+        """
+        :param maxsize: The maximum number of fitness scores kept.
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the kept fitness score for the key or None, and counts a hit or a miss."""
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness) -> None:
+        """Keeps the fitness score for the key, throwing out the least recently used entry if the cache is full."""
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        """Returns the part of lookups that were found in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"FitnessCache(size={len(self.entries)}/{self.maxsize}, hits={self.hits}, misses={self.misses})"
+
+
+def evaluate_with_cache(schedule, classes: list[Subject], cache: FitnessCache = None) -> None:
+    """Sets the fitness score of the Schedule, from the cache if the same genome was already evaluated, otherwise with calculate_fitness.
+
+    :param schedule: A Schedule or CompactSchedule.
+    :param classes: The list of classes.
+    :param cache: The FitnessCache, if it is None the fitness is always calculated.
+    """
+    if cache is None:
+        schedule.calculate_fitness(classes)
+        return
+    key = schedule.genome_key()
+    fitness = cache.get(key)
+    if fitness is None:
+        schedule.calculate_fitness(classes)
+        cache.put(key, schedule.get_fitness_score())
+    else:
+        schedule.set_fitness_score(fitness)
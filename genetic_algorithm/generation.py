@@ -1,25 +1,49 @@
-import random
+import random as random_module
 from statistics import mean, median
 from genetic_algorithm.individual import *
-import time
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.sparse_individual import SparseSchedule
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+from genetic_algorithm.parent_selection import make_parent_sampler
+from genetic_algorithm.fitness_cache import FitnessCache, evaluate_with_cache
+from genetic_algorithm.instrumentation import Instrumentation
+from genetic_algorithm.checkpoint import save_checkpoint, load_checkpoint
+from genetic_algorithm.local_search import improve_children
+from genetic_algorithm.repair import OverlapRepair
+from genetic_algorithm.initialization import heuristic_individuals
+from genetic_algorithm.schedule_pool import SchedulePool
+from genetic_algorithm.conflicts import ConflictIndex
+from genetic_algorithm.warm_start import warm_start_generation
+from genetic_algorithm.engine_config import EngineConfig, STEADY_STATE_OPTIONS, ISLAND_OPTIONS
+from time import perf_counter
 
 
-def generate_first_gen(classes, population_size, room_number):
+def generate_first_gen(classes, population_size, room_number, schedule_class=Schedule, heuristic_mix=0.0, grid: TimeGrid = DEFAULT_GRID,
+                       conflict_index: ConflictIndex = None):
     """Generates the first generation of Schedules (individuals) with random classes assigned to them.
     Calls the Schedule class to create a new Schedule object for each individual until the population is filled.
+    A part of the individuals ({heuristic_mix}) can be built with constructive heuristics instead (initialization.py).
     A generation is regarded as a list of Schedule objects, each representing a potential solution to the scheduling problem.
 
     :param classes: List of Subject objects representing the classes to be scheduled.
     :param population_size: The number of individuals in the population.
     :param room_number: The number of rooms available for scheduling.
+    :param schedule_class: The representation of individuals, Schedule (list of lists, default), CompactSchedule (arrays)
+    or SparseSchedule (only the occupied intervals, for big grids).
+    :param heuristic_mix: The part of the population (0 to 1) made with heuristics (first fit, round robin, compact), the rest is random.
+    :param grid: The time grid of the Schedules.
+    :param conflict_index: The group and lecturer conflicts the Schedules check, None if they are not checked.
 
     :return: A list of Schedule objects representing the first generation of individuals."""
-    generation = []  # A generation is a list of Schedule objects, so this list is the first generation
-    for i in range (population_size):
-            current_individual = Schedule(len(classes), room_number) # Intialize a new Schedule object with the number of classes and rooms
+    # A generation is a list of Schedule objects, so this list is the first generation
+    generation = heuristic_individuals(schedule_class, classes, room_number, int(heuristic_mix * population_size), grid=grid,
+                                       conflict_index=conflict_index)
+    for i in range (population_size - len(generation)):
+            current_individual = schedule_class(len(classes), room_number, grid, conflict_index) # Intialize a new Schedule object with the number of classes and rooms
             current_individual.set_random_classes(len(classes), classes) # Assign random classes to the Schedule object
             generation.append(current_individual) # Add the Schedule to the generation list
-        
+
+    generation.sort(reverse=True, key=lambda Schedule: Schedule.get_fitness_score()) # The best Schedules are first, as after selection
     return generation
 
 
@@ -49,7 +73,7 @@ def roulette_parent_selection(generation: list[Schedule]):
 
     :param generation: The current generation of Schedules.
 
-    :return: Indices of the two parents chosen for crossover."""
+    :return: Indices of the two parents chosen for crossover (indices in the list after it is sorted)."""
 
     generation.sort(reverse=True, key=lambda Schedule: Schedule.get_fitness_score()) # sort the generation by fitness score
     schedule_ranking = list(range(len(generation), 0, -1)) # create a ranking
@@ -58,7 +82,24 @@ def roulette_parent_selection(generation: list[Schedule]):
     sorted_scores = sorted(range(len(final)), key=lambda i:final[i]) # sort the list of scores, so the biggest nums are on the end
     return sorted_scores[-1], sorted_scores[-2]  # choose the last two indices, which correspond to the biggest scores
 
-def crossover_all(generation: list[Schedule], population_size: int, mutation_chance: float, classes: list[Subject]):
+
+def choose_parent_pairs(parents: list[Schedule], count: int, method: str = "roulette"):
+    """Chooses {count} pairs of parents at once from a list of Schedules.
+    For "rank" and "tournament" a sampler is built only once (parent_selection.py) and each pair costs O(1),
+    "roulette" calls roulette_parent_selection for every pair, which sorts the Schedules every time.
+
+    :param parents: The Schedules the parents are chosen from (sorted in place by "roulette").
+    :param count: The number of pairs.
+    :param method: "roulette" (default), "rank" or "tournament".
+
+    :return: A list of pairs of indices in the parents list (as it is after the call)."""
+    if method == "roulette":
+        return [roulette_parent_selection(generation=parents) for _ in range(count)]
+    return make_parent_sampler(parents, method).draw_pairs(count)
+
+def crossover_all(generation: list[Schedule], population_size: int, mutation_chance: float, classes: list[Subject], batch_fitness: bool = False,
+                  parent_selection: str = "roulette", fitness_cache: FitnessCache = None, instrumentation: Instrumentation = None,
+                  repair=None, pool: SchedulePool = None):
     """Breeds individuals (Schedules) which passed the selection (previous step in life cycle). 
     Works by selecting two parents (roulette selection) and creating two children from them through crossover function.
     
@@ -66,30 +107,111 @@ def crossover_all(generation: list[Schedule], population_size: int, mutation_cha
     :param population_size: The total number of Schedules in the population.
     :param mutation_chance: The chance of mutation for each child.
     :param classes: List of Subject objects representing the classes to be scheduled.
+    :param batch_fitness: If True the children are evaluated all together with NumPy (batch_fitness.evaluate_population)
+    instead of one by one. Since children have no fitness until the end, the parents are then chosen only from the current population.
+    :param parent_selection: How the parents are chosen (choose_parent_pairs). With "rank" or "tournament" all pairs are drawn at once
+    from the current population. With "roulette" (and no batch_fitness) each pair is chosen from the growing generation, so children made
+    earlier in this step can also be parents.
+    :param fitness_cache: An optional FitnessCache used when the children are evaluated one by one.
+    :param instrumentation: An optional Instrumentation, then the time of parent selection, crossover, mutation and fitness is measured.
+    :param repair: An optional repair operator called on every child right after the crossover (repair.OverlapRepair), it counts its repairs.
+    :param pool: An optional SchedulePool, children are then made from Schedules thrown away by the last selection.
 
     :return: The new generation of Schedules after crossover and mutation."""
 
+    if batch_fitness or parent_selection != "roulette":
+        parents = generation[:population_size]
+        if instrumentation is not None:
+            start = perf_counter()
+        pairs = choose_parent_pairs(parents, (2 * population_size - len(generation) + 1) // 2, parent_selection)
+        if instrumentation is not None:
+            instrumentation.add_time("parent_selection", perf_counter() - start)
+        children = []
+        for parent1, parent2 in pairs:
+            children.extend(breed(parents[parent1], parents[parent2], classes, mutation_chance, not batch_fitness, fitness_cache, instrumentation,
+                                  repair, pool))
+        if batch_fitness:
+            from genetic_algorithm.batch_fitness import evaluate_population  # NumPy is only needed for this mode
+            if instrumentation is not None:
+                start = perf_counter()
+            evaluate_population(children, classes)
+            if instrumentation is not None:
+                instrumentation.add_time("fitness", perf_counter() - start)
+                instrumentation.add_evaluations(len(children))
+        generation.extend(children)
+        return generation
+
     # The generation will be filled with {population_size} parents so we add {population_size} children to do the selection from,
     # so the new generation will have 2 * population_size individuals
     while len(generation) < 2 * population_size:
+        if instrumentation is not None:
+            start = perf_counter()
         parent1, parent2 = roulette_parent_selection(generation=generation)
-        child1, child2 = cross_over(parent1=generation[parent1], parent2=generation[parent2], class_list=classes, mutations = mutation_chance)
+        if instrumentation is not None:
+            instrumentation.add_time("parent_selection", perf_counter() - start)
+        child1, child2 = breed(generation[parent1], generation[parent2], classes, mutation_chance, True, fitness_cache, instrumentation, repair,
+                               pool)
 
         generation.append(child1)
         generation.append(child2)
 
     return generation
-     
 
-def life_cycle(max_generations, optimal_fitness, stopping_criteria, classes, population_size, selection_parameter, mutation_chance,rooms, output_file):
+
+def breed(parent1: Schedule, parent2: Schedule, classes: list[Subject], mutation_chance: float, evaluate: bool = True,
+          fitness_cache: FitnessCache = None, instrumentation: Instrumentation = None, repair=None, pool: SchedulePool = None):
+    """Makes two children of the parents with cross_over (which also repairs, mutates and evaluates them).
+    With instrumentation, the three steps are done one after another here so that each of them can be timed,
+    the random numbers are used in the same order, so the children are the same either way.
+
+    :return: The two children."""
+    if instrumentation is None:
+        return cross_over(parent1=parent1, parent2=parent2, class_list=classes, mutations=mutation_chance, evaluate=evaluate, cache=fitness_cache,
+                          repair=repair, pool=pool)
+
+    start = perf_counter()
+    children = cross_over(parent1=parent1, parent2=parent2, class_list=classes, mutations=None, evaluate=evaluate, repair=repair, pool=pool)
+    crossed = perf_counter()
+    for child in children:
+        child.mutate(mutation_chance, classes, evaluate=False)
+    mutated = perf_counter()
+    if evaluate:
+        hits = fitness_cache.hits if fitness_cache is not None else 0
+        for child in children:
+            evaluate_with_cache(child, classes, fitness_cache)
+        instrumentation.add_evaluations(len(children), (fitness_cache.hits - hits) if fitness_cache is not None else 0)
+    instrumentation.add_time("crossover", crossed - start)
+    instrumentation.add_time("mutation", mutated - crossed)
+    instrumentation.add_time("fitness", perf_counter() - mutated)
+    return children
+
+
+def mutation_for_generation(generation_index, max_generations, mutation_chance):
+    """Returns the mutation chance for the current generation - in the first half of the generations mutations are the most likely,
+    then until 75% of generations the second chance is used, and the third one until the end.
+
+    :param generation_index: The index of the generation in the life cycle.
+    :param max_generations: The maximum number of generations.
+    :param mutation_chance: A list of three mutation chances for different stages of the algorithm."""
+    if generation_index< max_generations/2:
+        return mutation_chance[0]
+    elif generation_index < max_generations * 0.75:
+        return mutation_chance[1]
+    return mutation_chance[2]
+
+
+def life_cycle(max_generations, optimal_fitness, stopping_criteria, classes, population_size, selection_parameter, mutation_chance,rooms, output_file,
+               config: EngineConfig = None):
     """This is the main function that will do the genetic algorithm on populations, where the algorithm consists of:
         0. Generating the first population (Gen. 1)
         Then, we loop through the following 4 steps until one of the stopping criteria is fulfilled 
-        * Loop stop criteria - reached max number of generations or the best Schedule is within an acceptable distance from an optimal one.
+        * Loop stop criteria - reached max number of generations or the best Schedule is within an acceptable distance from an optimal one
+          (and with a ConvergenceController also too many generations without improvement or the end of the time budget).
         The main loop consists of:
             1. Selection
             2. Crossover (breeding) including possible mutations on children genomes
             3. Recalculating fitness upon the population
+            (optional) Local search on the best children before the selection (memetic step)
         
     :param max_generations: The maximum number of generations to run the algorithm for.
     :param optimal_fitness: The fitness score of the "ideal" Schedule which has not yet been reached with the algorithm, chosen based on previous results.
@@ -99,38 +221,136 @@ def life_cycle(max_generations, optimal_fitness, stopping_criteria, classes, pop
     :param selection_parameter: The percentage of the best Schedules that will survive to the next generation.
     :param mutation_chance: A list of three mutation chances for different stages of the algorithm.
     :param rooms: List of rooms available for scheduling.
+    :param output_file: The path of the HTML file the best schedule is written to.
+    :param config: The options of the run (EngineConfig: representation, seed, parallel breeding, checkpoints, local search,
+    warm start, ...), None means EngineConfig() with every option off.
 
     :return: The best Schedule from the population, which is regarded as the best schedule.
     """
-    # The 0 step - generating the first generation with random individuals
-    current_gen = generate_first_gen(classes, population_size,len(rooms))
-    generation_index = 1
+    if config is None:
+        config = EngineConfig()
+    config.reject_options("generational", STEADY_STATE_OPTIONS + ISLAND_OPTIONS)
+    instrumentation = config.instrumentation
+    if config.seed is not None:
+        random_module.seed(config.seed)
+    if any(subject.duration > config.grid.block_size for subject in classes):
+        raise ValueError(f"A class is longer than a day of {config.grid}, were the classes loaded with another grid?")
+    if config.batch_fitness and config.schedule_class is SparseSchedule:
+        raise ValueError("batch_fitness needs the slot counts of every Schedule, it does not work with SparseSchedule")
+    breeding_pool = None
+    if config.workers > 1:
+        if config.schedule_class is not CompactSchedule:
+            raise ValueError("Parallel breeding (workers > 1) only works with CompactSchedule")
+        from genetic_algorithm.parallel import create_breeding_pool, parallel_crossover_all
+        breeding_pool = create_breeding_pool(config.workers, classes, config.conflict_index)
+    if config.local_search_every > 0 and config.schedule_class is not CompactSchedule:
+        raise ValueError("Local search (local_search_every > 0) only works with CompactSchedule")
+
+    fitness_cache = FitnessCache(config.fitness_cache_size) if config.fitness_cache_size > 0 else None
+    repair = OverlapRepair() if config.repair_overlaps else None
+    pool = SchedulePool() if config.pool_buffers and breeding_pool is None else None
+    total_repairs = 0
+
+    if config.resume_from is not None:
+        current_gen, generation_index = load_checkpoint(config.resume_from, classes, len(rooms), config.schedule_class, config.grid,
+                                                        config.conflict_index)
+        print(f"Resumed from {config.resume_from} at generation {generation_index}")
+    elif config.initial_schedule is not None:
+        # The 0 step from a previous schedule instead of random individuals
+        current_gen = warm_start_generation(classes, population_size, len(rooms), config.initial_schedule, config.schedule_class, config.grid,
+                                            config.conflict_index, config.warm_start_perturbation)
+        generation_index = 1
+    else:
+        # The 0 step - generating the first generation with random individuals
+        current_gen = generate_first_gen(classes, population_size,len(rooms), config.schedule_class, config.heuristic_init, config.grid,
+                                         config.conflict_index)
+        generation_index = 1
     max_fitness = 0
 
+    run_start = perf_counter()
+    if config.convergence is not None:
+        config.convergence.start()  # the time budget and the history start with the main loop
+    stop_reason = "max_generations"
     # The main loop of the genetic algorithm
     while not (generation_index == max_generations or (optimal_fitness - max_fitness) < stopping_criteria):
-        print_generation(current_gen, generation_index)
+        if config.time_limit is not None and perf_counter() - run_start > config.time_limit:
+            stop_reason = "time_limit"
+            break
+        if config.verbose:
+            print_generation(current_gen, generation_index)
         max_fitness = current_gen[0].get_fitness_score()
         # Variant mutation chance based on generation number
-        if generation_index< max_generations/2:
-            mutatation = mutation_chance[0]
-        elif generation_index < max_generations * 0.75:
-            mutatation = mutation_chance[1]
+        mutatation = mutation_for_generation(generation_index, max_generations, mutation_chance)
+        if config.convergence is not None:
+            mutatation = config.convergence.mutation_chance(mutatation)  # more mutations while the population stagnates
+        if breeding_pool is not None:
+            if instrumentation is not None:
+                start = perf_counter()
+            current_gen = parallel_crossover_all(current_gen, population_size, mutatation, classes, breeding_pool, config.workers,
+                                                 config.parent_selection)
+            if instrumentation is not None:
+                instrumentation.add_time("crossover", perf_counter() - start)
         else:
-            mutatation = mutation_chance[2]
-        current_gen = crossover_all(current_gen, population_size, mutatation, classes) # Crossover includes mutations of children
+            current_gen = crossover_all(current_gen, population_size, mutatation, classes, config.batch_fitness, config.parent_selection,
+                                        fitness_cache, instrumentation, repair, pool) # Crossover includes mutations of children
+            if repair is not None:
+                moved, repaired_children = repair.reset()
+                total_repairs += moved
+                if instrumentation is not None:
+                    instrumentation.add_repairs(moved, repaired_children)
+        if config.local_search_every > 0 and generation_index % config.local_search_every == 0:
+            if instrumentation is not None:
+                start = perf_counter()
+            improve_children(current_gen[population_size:], classes, config.local_search_fraction, config.local_search_strategy)
+            if instrumentation is not None:
+                instrumentation.add_time("local_search", perf_counter() - start)
+        if instrumentation is not None:
+            start = perf_counter()
+        before_selection = current_gen
         current_gen = selection(current_gen, selection_parameter, population_size) # Selection of the best individuals via elitism
+        if pool is not None:
+            pool.release_discarded(before_selection, current_gen)  # the thrown away Schedules become the next children
+        if instrumentation is not None:
+            instrumentation.add_time("survivor_selection", perf_counter() - start)
+            if pool is not None:
+                instrumentation.add_allocations(*pool.reset_counts())
+            else:
+                instrumentation.add_allocations(len(before_selection) - population_size, 0)  # every child was a new Schedule
+            instrumentation.end_generation(generation_index, current_gen, mutatation)
 
         generation_index += 1
+        if config.checkpoint_path is not None and config.checkpoint_every > 0 and generation_index % config.checkpoint_every == 0:
+            save_checkpoint(config.checkpoint_path, current_gen, generation_index)
+        if config.convergence is not None:
+            config.convergence.update(current_gen)
+            if config.convergence.should_stop():
+                stop_reason = config.convergence.stop_reason
+                break
+
+    if stop_reason == "max_generations" and (optimal_fitness - max_fitness) < stopping_criteria:
+        stop_reason = "optimal_fitness"
+    if breeding_pool is not None:
+        breeding_pool.shutdown()
 
     current_gen.sort(reverse=True, key=lambda Schedule: Schedule.get_fitness_score())  # Sort the generation by fitness score
     # After sorting, the best Schedule by its fitness score is the first one in the list 
     print("\n\nBEST SCHEDULE:")
     print("Fitness score:", current_gen[0].get_fitness_score())
+    print(f"Stopped after {generation_index} generations: {stop_reason}")
+    if fitness_cache is not None:
+        print(f"Fitness cache: {fitness_cache.hits} hits, {fitness_cache.misses} misses ({fitness_cache.hit_rate():.1%})")
+    if repair is not None:
+        print(f"Overlap repair: {total_repairs} classes moved")
+    if current_gen[0].conflicts is not None:
+        print(f"Group and lecturer conflicts: {len(current_gen[0].conflicts.overlapping_pairs())} pairs of classes at the same time")
+        if current_gen[0].conflicts.index.reference is not None:
+            print(f"Warm start: {current_gen[0].conflicts.moved} classes moved from the previous schedule")
     # Check if the best schedule has no overlaps
     current_gen[0].no_overlap()
 
     current_gen[0].write_schedule_to_html(classes, output_file, generation=generation_index, mutation=mutation_chance, keepPercent=selection_parameter)
+    if instrumentation is not None:
+        instrumentation.end_run(generation_index, current_gen[0], stop_reason)
     return current_gen[0]  # The best schedule
 
 
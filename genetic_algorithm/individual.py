@@ -1,36 +1,64 @@
 
+from array import array
 from random import random, randint
 
 from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+from genetic_algorithm.fitness_cache import FitnessCache, evaluate_with_cache
+from genetic_algorithm.conflicts import ConflictIndex, ConflictState, index_of
+from exporting.exporters import ExportItem, write_html
+from const import DEBUG_DELTA_FITNESS
 
 class Schedule:
     """
     Represents a schedule for classes in a school. It contains class_list, 
-    it is a list of lists (each sublist represents a time slot so there are 12 hours * 4 quarters * 5 days  * room_count),
-    so the first list is on Monday at 7:00 in the first room, the second is on Monday at 7:15 also first room, and so on.
+    it is a list of lists (each sublist represents a time slot so there are slots per day * days * room_count, 12 hours * 4 quarters * 5 days
+    with the default TimeGrid), so the first list is on Monday at 7:00 in the first room, the second is on Monday at 7:15 also first room, and so on.
     If the class lasts 1 hour, it will occupy 4 consecutive slots.
     Also, blocks are introduced to prevent overlap of one subject across days or different rooms.
     It is a list of lists, because in the beginning we allow multiple classes to be scheduled at the same time,
     but this will be corrected later in the algorithm (negative impact on fitness score).
     The mapping is a dictionary that maps class indices to their first positions (start of the class) in the class_list.
+    With a ConflictIndex the Schedule also keeps a ConflictState (conflicts), so classes of the same student group or lecturer
+    at the same time in different rooms are penalized too.
+    For placing classes it keeps a free slot index, free_masks: one bitmask per block where bit k is set if slot k of the block is empty,
+    the same as in CompactSchedule, so the free starting positions of a class are found with a few bit operations instead of random tries.
+    The fitness is calculated with delta updates like in CompactSchedule: the penalty of every class and the spread of every block are kept,
+    and after a move only the blocks that changed (dirty_blocks) are calculated again. To find the classes of those blocks quickly,
+    block_classes keeps a set of the classes that start in every block, and unplaced the classes that are not placed.
 
     """
-    __slots__ = ('class_list', 'mapping', 'fitness_score', 'num_blocks', 'block_size')
-    def __init__(self, class_count: int, room_count: int):
+    __slots__ = ('class_list', 'mapping', 'fitness_score', 'num_blocks', 'block_size', 'grid', 'conflicts', 'free_masks', 'block_classes',
+                 'unplaced', 'penalty_terms', 'penalty_total', 'block_scores', 'spread_total', 'dirty_blocks')
+    debug_fitness = DEBUG_DELTA_FITNESS  # if True every delta fitness update is checked against a full calculation
+    def __init__(self, class_count: int, room_count: int, grid: TimeGrid = DEFAULT_GRID, conflict_index: ConflictIndex = None):
         """
         Initializes a Schedule object with the given number of classes and rooms. The time slots are represented as a list of lists,
-        where each sublist corresponds to a time slot (12 hours * 4 quarters * 5 days * room_count).
+        where each sublist corresponds to a time slot of the grid (12 hours * 4 quarters * 5 days * room_count by default).
         Besides the list, each Schedule has a mapping.
         The mapping is a dictionary where the key is the class index and the value is -1 (indicating no class scheduled).
         The mapping will be updated when classes are added to the schedule.
         :param class_count: The number of classes in the schedule.
-        :param room_count: The number of rooms in the schedule."""
+        :param room_count: The number of rooms in the schedule.
+        :param grid: The time grid (days, slot length, start and end of the day).
+        :param conflict_index: The group and lecturer conflicts of the classes, None means they are not checked."""
         
-        self.class_list = [[] for _ in range(12 * 4 * 5 * room_count)]
+        self.class_list = [[] for _ in range(grid.slot_count(room_count))]
         self.mapping = {i: -1 for i in range(class_count)}
         self.fitness_score = -1
-        self.num_blocks = 5 * room_count  # We have 5 work days and n rooms, so each combination of these is one block
-        self.block_size = 4 * 12 # Since we work with quarters of an hour, this is 4 quarters per 12 hours (from 7 am to 7 pm)
+        self.grid = grid
+        self.num_blocks = grid.num_blocks(room_count)  # We have grid.days work days and n rooms, so each combination of these is one block
+        self.block_size = grid.block_size # With the default grid we work with quarters of an hour, so 4 quarters per 12 hours (from 7 am to 7 pm)
+        self.free_masks = [(1 << self.block_size) - 1] * self.num_blocks  # every slot of every block is free
+        self.block_classes = [set() for _ in range(self.num_blocks)]
+        self.unplaced = set(range(class_count))
+        self.conflicts = ConflictState(conflict_index, room_count, self.block_size) if conflict_index is not None else None
+        # Kept parts of the fitness for delta updates, None until the fitness is calculated for the first time
+        self.penalty_terms = None
+        self.penalty_total = 1
+        self.block_scores = None
+        self.spread_total = 0
+        self.dirty_blocks = None
 
     def get_class_list(self):
         """Returns the list of classes in the schedule."""
@@ -48,49 +76,238 @@ class Schedule:
         """Sets the fitness score of the schedule."""
         self.fitness_score = score
 
+    def reset(self) -> None:
+        """Empties the schedule in place (all classes unplaced, no fitness), so its lists can be used again for a new child (SchedulePool)."""
+        for slot in self.class_list:
+            if slot:
+                slot.clear()
+        mapping = self.mapping
+        for class_idx in mapping:
+            mapping[class_idx] = -1
+        self.free_masks[:] = [(1 << self.block_size) - 1] * self.num_blocks
+        for classes in self.block_classes:
+            classes.clear()
+        self.unplaced.update(mapping)
+        self.fitness_score = -1
+        if self.conflicts is not None:
+            self.conflicts.clear()
+        self.penalty_terms = None
+        self.penalty_total = 1
+        self.block_scores = None
+        self.spread_total = 0
+        self.dirty_blocks = None
+
+    def copy_from(self, other) -> None:
+        """Makes this schedule the same as {other} (with the same number of classes and rooms) without making new slot lists.
+        The kept fitness terms are copied too, into the arrays this schedule already has if it has them."""
+        for slot, other_slot in zip(self.class_list, other.class_list):
+            if slot or other_slot:
+                slot[:] = other_slot
+        self.mapping.update(other.mapping)
+        self.free_masks[:] = other.free_masks
+        self.block_classes = [set(classes) for classes in other.block_classes]
+        self.unplaced = set(other.unplaced)
+        self.fitness_score = other.fitness_score
+        if self.conflicts is not None:
+            self.conflicts.copy_from(other.conflicts)
+        if other.penalty_terms is None:
+            self.penalty_terms = None
+            self.block_scores = None
+            self.dirty_blocks = None
+        else:
+            if self.penalty_terms is None:
+                self.penalty_terms = array('l', other.penalty_terms)
+                self.block_scores = array('l', other.block_scores)
+            else:
+                self.penalty_terms[:] = other.penalty_terms
+                self.block_scores[:] = other.block_scores
+            self.dirty_blocks = set(other.dirty_blocks)
+        self.penalty_total = other.penalty_total
+        self.spread_total = other.spread_total
+
+    def reuse_fitness_terms(self, parent1, parent2) -> None:
+        """Used for children made in cross_over. Takes the kept fitness terms from the parent that is more similar to this child,
+        and marks only the blocks where the child is different as dirty, so the next calculate_fitness is a small update.
+
+        :param parent1: The first parent Schedule.
+        :param parent2: The second parent Schedule.
+        """
+        best_parent = None
+        best_changes = None
+        for parent in (parent1, parent2):
+            if parent.penalty_terms is None:
+                continue
+            changes = [(own, other) for own, other in zip(self.mapping.values(), parent.mapping.values()) if own != other]
+            if best_changes is None or len(changes) < len(best_changes):
+                best_parent, best_changes = parent, changes
+        if best_parent is None:
+            return
+
+        block_size = self.block_size
+        dirty = set(best_parent.dirty_blocks)
+        for own, other in best_changes:
+            if own != -1:
+                dirty.add(own // block_size)
+            if other != -1:
+                dirty.add(other // block_size)
+        self.penalty_terms = array('l', best_parent.penalty_terms)
+        self.penalty_total = best_parent.penalty_total
+        self.block_scores = array('l', best_parent.block_scores)
+        self.spread_total = best_parent.spread_total
+        self.dirty_blocks = dirty
+
+    def to_genome(self):
+        """Returns the schedule as a small tuple (room count, starts as int32 bytes, fitness score, time grid), like CompactSchedule.to_genome,
+        so a Schedule can be sent to another process (islands.py)."""
+        return self.get_room_count(), array('i', self.mapping.values()).tobytes(), self.fitness_score, self.grid
+
+    @classmethod
+    def from_genome(cls, genome, classes: list[Subject], conflict_index: ConflictIndex = None):
+        """Builds a Schedule from a genome (room count, starts as int32 bytes, fitness score, time grid), the same format as CompactSchedule.to_genome.
+
+        :param genome: A tuple (room count, starts as bytes, fitness score, time grid).
+        :param classes: The list of classes, needed for their durations.
+        :param conflict_index: The group and lecturer conflicts to check, if any.
+        """
+        room_count, starts, fitness_score, grid = genome
+        schedule = cls(len(classes), room_count, grid, conflict_index)
+        for class_idx, start in enumerate(array('i', starts)):
+            if start != -1:
+                schedule.place_class(class_idx, start, classes[class_idx].duration)
+        schedule.fitness_score = fitness_score
+        return schedule
+
+    def genome_key(self):
+        """Returns the start slots of all classes as a tuple, used as the key of the FitnessCache."""
+        return tuple(self.mapping.values())
+
+    def get_start(self, class_idx: int) -> int:
+        """Returns the first slot of the class, or -1 if the class is not placed."""
+        return self.mapping.get(class_idx, -1)
+
+    def get_class_count(self):
+        """Returns the number of classes the schedule was made for."""
+        return len(self.mapping)
+
+    def get_room_count(self):
+        """Returns the number of rooms the schedule was made for."""
+        return self.grid.room_count(self.num_blocks)
+
+    def new_empty(self):
+        """Returns a new empty Schedule with the same number of classes and rooms (and the same grid), used for creating children."""
+        return Schedule(self.get_class_count(), self.get_room_count(), self.grid, index_of(self))
+
+    def is_free(self, start: int, duration: int) -> bool:
+        """Checks if {duration} consecutive slots starting from {start} are all empty (a class never goes over the end of its block)."""
+        block, offset = divmod(start, self.block_size)
+        needed = ((1 << duration) - 1) << offset
+        return self.free_masks[block] & needed == needed
+
+    def place_class(self, class_idx: int, start: int, duration: int) -> None:
+        """Puts the class in {duration} slots starting from {start} and remembers its start in the mapping."""
+        for j in range(duration):
+            self.class_list[start + j].append(class_idx)
+        self.mapping[class_idx] = start
+        block, offset = divmod(start, self.block_size)
+        self.free_masks[block] &= ~(((1 << duration) - 1) << offset)
+        self.block_classes[block].add(class_idx)
+        self.unplaced.discard(class_idx)
+        if self.dirty_blocks is not None:
+            self.dirty_blocks.add(block)
+        if self.conflicts is not None:
+            self.conflicts.place(class_idx, start, duration)
+
+    def remove_class(self, class_idx: int, duration: int) -> None:
+        """Takes the class out of its slots, the class stays unplaced (-1) until it is placed again."""
+        start = self.get_start(class_idx)
+        if start == -1:
+            return
+        block = start // self.block_size
+        block_start = block * self.block_size
+        freed = 0
+        for j in range(start, start + duration):
+            self.class_list[j].remove(class_idx)
+            if not self.class_list[j]:
+                freed |= 1 << (j - block_start)
+        self.free_masks[block] |= freed
+        self.mapping[class_idx] = -1
+        self.block_classes[block].discard(class_idx)
+        self.unplaced.add(class_idx)
+        if self.dirty_blocks is not None:
+            self.dirty_blocks.add(block)
+        if self.conflicts is not None:
+            self.conflicts.remove(class_idx, start, duration)
+
+    def has_overlap(self, start: int, duration: int) -> bool:
+        """Checks if any of the {duration} slots starting from {start} has more than one class."""
+        return any(len(self.class_list[j]) > 1 for j in range(start, start + duration))
+
+    def free_starts(self, block: int, duration: int) -> int:
+        """Returns a bitmask of all positions in the block where a class of {duration} slots can start without an overlap,
+        bit k is set if slots k to k + duration - 1 are all free. 0 means that the class does not fit anywhere in the block.
+
+        :param block: The index of the block.
+        :param duration: The duration of the class in slots.
+        """
+        starts = self.free_masks[block]
+        length = 1
+        # After each step bit k says that {length} slots from k are free, the length doubles until it reaches the duration
+        while length < duration and starts:
+            step = min(length, duration - length)
+            starts &= starts >> step
+            length += step
+        return starts
+
+    def random_free_start(self, block: int, duration: int) -> int:
+        """Returns a random slot (global index) where a class of {duration} slots fits in the block without an overlap, or -1 if there is none.
+
+        :param block: The index of the block.
+        :param duration: The duration of the class in slots.
+        """
+        starts = self.free_starts(block, duration)
+        if not starts:
+            return -1
+        for _ in range(randint(0, starts.bit_count() - 1)):
+            starts &= starts - 1  # remove the lowest set bit
+        return block * self.block_size + (starts & -starts).bit_length() - 1
+
+    def random_free_block(self, duration: int) -> int:
+        """Returns a random block that has room for a class of {duration} slots, or -1 if no block has it."""
+        blocks = [block for block in range(self.num_blocks) if self.free_starts(block, duration)]
+        if not blocks:
+            return -1
+        return blocks[randint(0, len(blocks) - 1)]
+
     def set_random_classes(self, class_number: int, classes: list[Subject]):
         """
         Used for randomizing an individual Schedule, used in creating the first generation.
-        Iterates through all the classes and assignes them to a random timeslot (15 minutes) and classroom, according to Schedule structure. 
-        Adding a class to the schedule is done by appending it to the class_list and updating the mapping
-        and checking for overlaps, if any occur the class will be placed in a different slot.
+        Iterates through all the classes and assignes them to a random free position of a random block (day and classroom).
+        The free positions come from the free slot index, so if the random block is full another block with enough room is chosen,
+        and only if no block has room the class is placed in a random position anyway (with an overlap).
 
         :param class_number: The number of classes to be scheduled.
-        :param room_number: The number of rooms available for scheduling.
         :param classes: The list of classes to be scheduled.
         """
         for i in range(class_number):
-            # For each class, we try to place it in a random time slot
-            # We will try to place it in a random time slot, if it overlaps with another class, we will try again
-            placed = False
-            tries = 0
-            while not placed and tries < 100:
-                # Pick a random block (day and room) and place a random class in it
-                block_id = randint(0, self.num_blocks - 1)
-                block_start = block_id * self.block_size
-                block_end = block_start + self.block_size - classes[i].duration
-                random_class_index = randint(block_start, block_end)
-               # Check for overlap
-                overlap = False
-                for j in range(classes[i].duration):
-                    if self.class_list[random_class_index + j]:
-                        overlap = True
-                        break
-                if not overlap:
-                    placed = True
-                tries += 1
-            if not placed:
-                block_id = randint(0, self.num_blocks - 1)   # first pick out a block
-                block_start = block_id * self.block_size
-                block_end = block_start + self.block_size - classes[i].duration
-                random_class_index = randint(block_start, block_end)
-
-            for j in range(classes[i].duration):
-                self.class_list[random_class_index + j].append(i) 
-            self.mapping[i] = random_class_index
+            duration = classes[i].duration
+            # Pick a random block (day and room) and a random free position in it
+            position = self.random_free_start(randint(0, self.num_blocks - 1), duration)
+            if position == -1:
+                position = self.place_anywhere(duration)
+            self.place_class(i, position, duration)
 
         self.calculate_fitness(classes)
 
+    def place_anywhere(self, duration: int) -> int:
+        """Returns a free position in a random block that has room for the class,
+        or a random position in a random block if there is no room anywhere (an overlap that the fitness will punish)."""
+        block = self.random_free_block(duration)
+        if block != -1:
+            return self.random_free_start(block, duration)
+        block = randint(0, self.num_blocks - 1)
+        block_start = block * self.block_size
+        return randint(block_start, block_start + self.block_size - duration)
+
 
     def calculate_fitness(self, all_class: list[Subject]) -> None:
         """
@@ -103,65 +320,135 @@ class Schedule:
         Second:
         - Schedule Spread: Checks if the classes are spread evenly throughout the day.
           The score is calculated based on the time slots used and the spread of classes.
+        The first time everything is calculated and the penalty of every class and the spread of every block are kept.
+        After that only the blocks that were changed since the last call (dirty_blocks) and the classes in and next to them
+        are calculated again, like in CompactSchedule.calculate_fitness.
 
         :param all_class: The list of classes to calculate the fitness score for.
         """
-
-        penalty= 1
-
+        if self.penalty_terms is None:
+            self.full_fitness_terms(all_class)
+        elif self.dirty_blocks:
+            self.update_fitness_terms(all_class)
+
+        self.set_fitness_score(self.spread_total / (self.penalty_total + self.conflict_penalty()))
+
+        if Schedule.debug_fitness:
+            # Debug mode: the delta result has to be the same as calculating everything again
+            penalty_total, spread_total = self.penalty_total, self.spread_total
+            penalty_terms, block_scores = self.penalty_terms, self.block_scores
+            self.full_fitness_terms(all_class)
+            if (penalty_total, spread_total) != (self.penalty_total, self.spread_total) or penalty_terms != self.penalty_terms or block_scores != self.block_scores:
+                raise AssertionError(f"Delta fitness (penalty {penalty_total}, spread {spread_total}) does not match "
+                                     f"the full calculation (penalty {self.penalty_total}, spread {self.spread_total})")
+
+    def conflict_penalty(self) -> int:
+        """The penalty of the group and lecturer conflicts (classes of the same group or lecturer at the same time), 0 if they are not checked."""
+        return self.conflicts.penalty() if self.conflicts is not None else 0
+
+    def full_fitness_terms(self, all_class: list[Subject]) -> None:
+        """Calculates the penalty of every class and the spread score of every block from scratch and keeps them for later updates.
+
+        :param all_class: The list of classes, needed for their durations.
+        """
         # First Part: Schedule Validity
-        for class_index, start_slot in self.mapping.items():
-            duration = all_class[class_index].get_duration()
-            
-
-            # Check before
-            if start_slot == 0 or not self.class_list[start_slot - 1]:
-                continue
-            else:
-                penalty +=5
-
-            # Check after
-            if start_slot + duration >= len(self.class_list) or not self.class_list[start_slot + duration]:
-                continue
-            else:
-                penalty += 5
-
-            # Check slot overlap
-            
-            for i in range(start_slot, start_slot + duration):
-                if len(self.class_list[i]) > 1:
-                    penalty += 1000
-
+        self.penalty_terms = array('l', [self.class_penalty(start, all_class[i].duration) for i, start in self.mapping.items()])
+        self.penalty_total = 1 + sum(self.penalty_terms)
 
         # Second Part: Schedule Spread (Late Starts + Early Finishes)
-        total_score = 0
-        slots_per_day = 12 * 4  # 12 hours * 4 = 48 slots/day
-
-        for day_start in range(0, len(self.class_list), slots_per_day):
-            slots = self.class_list[day_start: day_start + slots_per_day]
-            p1=1
+        self.block_scores = array('l', [self.block_spread(block) for block in range(self.num_blocks)])
+        self.spread_total = sum(self.block_scores)
+        self.dirty_blocks = set()
 
-            prefix = next((i for i, s in enumerate(slots) if s), slots_per_day)
-            suffix = next((i for i, s in enumerate(reversed(slots)) if s), slots_per_day)
-            
-            # If the prefix or suffix is equal to slots_per_day, it means that there are no classes scheduled in that day
-            if prefix == slots_per_day or suffix == slots_per_day:
-                p1 = 0
+    def update_fitness_terms(self, all_class: list[Subject]) -> None:
+        """Updates the kept penalties and spread scores only for the blocks in dirty_blocks.
+        A class penalty depends on its own slots and the slot right before and after it, so the classes that start in a dirty block
+        are updated, and also the classes of the neighbouring blocks that touch the edge of a dirty block.
 
-            total_score += (prefix * 15) * ((suffix) * 15) * p1  # Convert slots to minutes
-
-        fitness_score = total_score/ penalty
-
-        self.set_fitness_score(fitness_score)
-    
-    
-    def mutate(self, mutation_chance: float, all_classes: list[Subject]):
+        :param all_class: The list of classes, needed for their durations.
+        """
+        block_size = self.block_size
+        dirty = self.dirty_blocks
+        block_scores = self.block_scores
+        for block in dirty:
+            score = self.block_spread(block)
+            self.spread_total += score - block_scores[block]
+            block_scores[block] = score
+
+        penalty_terms = self.penalty_terms
+        mapping = self.mapping
+        for class_index in self.unplaced:
+            if penalty_terms[class_index]:
+                self.penalty_total -= penalty_terms[class_index]
+                penalty_terms[class_index] = 0
+
+        def update(class_index):
+            term = self.class_penalty(mapping[class_index], all_class[class_index].duration)
+            self.penalty_total += term - penalty_terms[class_index]
+            penalty_terms[class_index] = term
+
+        for block in dirty:
+            block_start = block * block_size
+            for class_index in self.block_classes[block]:
+                update(class_index)
+            # A class that ends at the end of the block before, or starts at the start of the block after, sees a slot of this block
+            if block > 0 and block - 1 not in dirty:
+                for class_index in self.block_classes[block - 1]:
+                    if mapping[class_index] + all_class[class_index].duration == block_start:
+                        update(class_index)
+            if block < self.num_blocks - 1 and block + 1 not in dirty:
+                for class_index in self.block_classes[block + 1]:
+                    if mapping[class_index] == block_start + block_size:
+                        update(class_index)
+        dirty.clear()
+
+    def class_penalty(self, start: int, duration: int) -> int:
+        """Returns the validity penalty of one class:
+        +5 if the slot before the class is taken, another +5 if the slot after it is taken as well,
+        and only then +1000 for every slot of the class that has an overlap.
+
+        :param start: The first slot of the class (-1 if the class is not placed).
+        :param duration: The duration of the class in slots.
+        """
+        class_list = self.class_list
+        # Check before
+        if start <= 0 or not class_list[start - 1]:
+            return 0
+        # Check after
+        end = start + duration
+        if end >= len(class_list) or not class_list[end]:
+            return 5
+        penalty = 10
+        # Check slot overlap
+        for i in range(start, end):
+            if len(class_list[i]) > 1:
+                penalty += 1000
+        return penalty
+
+    def block_spread(self, block: int) -> int:
+        """Returns the spread score of one block (day and room), free minutes before the first class times free minutes after the last one.
+        The free slots are read from the free slot index of the block.
+
+        :param block: The index of the block.
+        """
+        taken = ~self.free_masks[block] & ((1 << self.block_size) - 1)
+        # If no slot is taken, there are no classes scheduled in that block
+        if not taken:
+            return 0
+        prefix = (taken & -taken).bit_length() - 1  # free slots before the first class
+        suffix = self.block_size - taken.bit_length()  # free slots after the last class
+        slot_minutes = self.grid.slot_minutes
+        return (prefix * slot_minutes) * (suffix * slot_minutes)  # Convert slots to minutes
+
+    def mutate(self, mutation_chance: float, all_classes: list[Subject], evaluate: bool = True, cache: FitnessCache = None):
         """Funtion that handles the mutation of an individual.
-        It randomly selects a class and tries to move it to a different time slot,
-        in the same block (same day and room), if possible.
+        It randomly selects a class and moves it to a random free position in the same block (same day and room),
+        taken from the free slot index. If the block has no room, the class goes to a random block that has it.
 
         :param mutation_chance: The chance of mutation happening, a number between 0 and 1.
         :param all_clases: The list of classes to be scheduled.
+        :param evaluate: If False the fitness score is not recalculated, used when the whole generation is evaluated at once.
+        :param cache: An optional FitnessCache, checked before the fitness is calculated.
            """
         
         mutation_happens = random()
@@ -169,7 +456,8 @@ class Schedule:
         # mutation_chance - if the random number is smaller than mutation chance then we mutate the individual. Otherwise, we exit this function,
         # which is what is implemented below
         if mutation_happens > mutation_chance:
-            self.calculate_fitness(all_classes)  # If we do not mutate, we still need to calculate the fitness score
+            if evaluate:
+                evaluate_with_cache(self, all_classes, cache)  # If we do not mutate, we still need to calculate the fitness score
             return
 
         class_num = randint(len(all_classes)//16, len(all_classes)//4)
@@ -177,44 +465,20 @@ class Schedule:
         for _ in range(class_num):
             class_index = randint(0, len(self.mapping) - 1) # We pick a class out of all classes that are in this Schedule
 
-            old_position = self.mapping[class_index]
-            block= old_position // self.block_size
-
+            block = self.mapping[class_index] // self.block_size
             duration = all_classes[class_index].duration
 
-            # Remove the class from the old position
-            for i in range(old_position, old_position + duration):
-                if class_index in self.class_list[i]:
-                    self.class_list[i].remove(class_index)
-
-            placed = False
-            tries = 0
-
-            while not placed and tries < 100:
-                block_id = block  
-                block_start = block_id * self.block_size
-                block_end = block_start + self.block_size - duration
-                new_position = randint(block_start, block_end)
-               # Check for overlap
-                overlap = False
-                for j in range(duration):
-                    if self.class_list[new_position + j]:
-                        overlap = True
-                        break
-                if not overlap:
-                    placed = True
-                tries += 1
-            if not placed:
-                block_id = randint(0, self.num_blocks - 1)   # first pick out a block
-                block_start = block_id * self.block_size
-                block_end = block_start + self.block_size - duration
-                new_position = randint(block_start, block_end)
-
-            for j in range(duration):
-                self.class_list[new_position + j].append(class_index)
-            self.mapping[class_index] = new_position
-
-        self.calculate_fitness(all_classes)
+            # Take the class out first, so its own slots count as free
+            self.remove_class(class_index, duration)
+            # A random free position in the same block, if the block is full somewhere else
+            new_position = self.random_free_start(block, duration)
+            if new_position == -1:
+                new_position = self.place_anywhere(duration)
+
+            self.place_class(class_index, new_position, duration)
+
+        if evaluate:
+            evaluate_with_cache(self, all_classes, cache)
 
 
     def __repr__(self):
@@ -230,12 +494,10 @@ class Schedule:
         print("\n-------------------------------")
         print("SCHEDULE BY DAYS AND ROOMS:\n")
 
-        slots_per_hour = 4
-        hours_per_day = 12
-        days_per_week = 5
+        days_per_week = self.grid.days
 
-        slots_per_day_per_room = hours_per_day * slots_per_hour  # 48
-        num_rooms = len(self.class_list) // (slots_per_day_per_room * days_per_week)
+        slots_per_day_per_room = self.block_size  # 48 with the default grid
+        num_rooms = self.get_room_count()
 
         for day in range(days_per_week):
             print(f"\nDAY {day + 1}")
@@ -244,86 +506,26 @@ class Schedule:
                 start = (day * slots_per_day_per_room * num_rooms) + (room * slots_per_day_per_room)
                 end = start + slots_per_day_per_room
                 for slot in range(start, end):
-                    print(f"    Slot {slot - start:2d}: {self.class_list[slot]}")
+                    print(f"    Slot {slot - start:2d} ({self.grid.clock(slot - start)}): {self.class_list[slot]}")
                 print("  -------------------------")
             print("*****************************")
 
-    # adding constant of days numbers and room names would have been an easy update, but the print is in English
     def write_schedule_to_html(self, classes: list[Subject], filename: str, generation: int = 0, mutation: list[float] = [0.5, 0.3, 0.2], keepPercent: float = 0.2):
         """
         Write the schedule to an HTML file in a clear table format:
         - Each day has a separate table.
         - Each table shows rows for time slots and columns for rooms.
-        - Each cell shows the class name(s) scheduled in that slot.
+        - Each class is one cell spanning all of its time slots (see exporting/exporters.py, which also writes JSON, CSV and iCalendar).
         """
-
-        slots_per_hour = 4
-        hours_per_day = 12
-        slots_per_day_per_room = slots_per_hour * hours_per_day  # 48
-        days_per_week = 5
-        # Calculate the number of rooms based on the class_list length
-        num_rooms = len(self.class_list) // (slots_per_day_per_room * days_per_week)
-
-        html = [
-            "<!DOCTYPE html>",
-            "<html>",
-            "<head>",
-            "<meta charset='UTF-8'>",
-            "<title>Schedule</title>",
-            "<style>",
-            "table { border-collapse: collapse; margin: 20px; }",
-            "th, td { border: 1px solid black; padding: 5px; text-align: center; }",
-            "th { background-color: #f2f2f2; }",
-            "</style>",
-            "</head>",
-            "<body>",
-            f"<h1>Schedule (Fitness Score: {self.get_fitness_score():.2f})</h1>",
-            f"<p>Generation: {generation}, Mutation: {mutation}, Keep Percent: {keepPercent}</p>"
-
-        ]
-
-        # For each day, creates a table
-        for day in range(days_per_week):
-            html.append(f"<h2>Day {day + 1}</h2>")
-            html.append("<table>")
-            
-            # Table header: time slot | room 1 | room 2 | ...
-            header = "<tr><th>Time</th>"
-            for room in range(num_rooms):
-                header += f"<th>Room {room + 1}</th>"
-            header += "</tr>"
-            html.append(header)
-
-            # For each time slot in a day
-            for slot_in_day in range(slots_per_day_per_room):
-                row = f"<tr><td>{7 + slot_in_day // slots_per_hour}:{(slot_in_day % slots_per_hour) * 15:02d}</td>"
-                
-                for room in range(num_rooms):
-                    # Compute the global slot index
-                    slot_idx = (day * num_rooms * slots_per_day_per_room) + (room * slots_per_day_per_room) + slot_in_day
-                    slot_classes = self.class_list[slot_idx]
-
-                    if slot_classes:
-                        names = ", ".join(classes[i].name for i in slot_classes)
-                    else:
-                        names = "-"
-                    row += f"<td>{names}</td>"
-
-                row += "</tr>"
-                html.append(row)
-
-            html.append("</table>")
-
-        html.append("</body>")
-        html.append("</html>")
-
-        # Write to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(html))
-
+        write_html([ExportItem.from_schedule(self, classes)], filename,
+                   subtitle=f"Generation: {generation}, Mutation: {mutation}, Keep Percent: {keepPercent}")
         print(f"\n Schedule written to {filename}")
 
 
+    def count_overlaps(self) -> int:
+        """Returns the number of slots that have more than one class."""
+        return sum(1 for slot in self.class_list if len(slot) > 1)
+
     def no_overlap(self):
         """Check if the schedule has no overlaps and print a message accordingly."""
 
@@ -336,7 +538,8 @@ class Schedule:
         print("\n YAYYYYYY NO OVERLAP, VALID SCHEDULE!!!! \n   >>>>>>>>>>>>>>>")
         return True
 
-def cross_over(parent1: Schedule, parent2: Schedule, class_list: list[Subject], mutations: float):
+def cross_over(parent1: Schedule, parent2: Schedule, class_list: list[Subject], mutations: float, evaluate: bool = True, cache: FitnessCache = None,
+               repair=None, pool=None):
     """
     Performs crossover between two schedules using three-point crossover.
     If preferred parent's position is invalid, FORCE the fallback parent's position.
@@ -344,12 +547,22 @@ def cross_over(parent1: Schedule, parent2: Schedule, class_list: list[Subject],
     :param parent1: The first parent Schedule.
     :param parent2: The second parent Schedule.
     :param class_list: The list of classes to be scheduled.
-    :param mutations: The mutation chance for the children schedules.
+    :param mutations: The mutation chance for the children schedules. If it is None the children are not mutated or evaluated here,
+    the caller does both (used when the phases are timed separately).
+    :param evaluate: If False the children are returned without fitness scores, so they can be evaluated together (batch_fitness).
+    :param cache: An optional FitnessCache, children that are the same as an earlier Schedule take their fitness from it.
+    :param repair: An optional repair operator (for example repair.OverlapRepair), called on both children right after the crossover
+    to move the classes that were forced into overlapping slots.
+    :param pool: An optional SchedulePool, the children are then reused Schedules that selection threw away.
     """
-    class_count = len(parent1.mapping)
-    room_count = len(parent1.class_list) // (12 * 4 * 5)
-    child1 = Schedule(class_count, room_count)
-    child2 = Schedule(class_count, room_count)
+    class_count = parent1.get_class_count()
+    # new_empty keeps the children in the same representation as the parents (Schedule or CompactSchedule)
+    if pool is not None:
+        child1 = pool.acquire(parent1)
+        child2 = pool.acquire(parent1)
+    else:
+        child1 = parent1.new_empty()
+        child2 = parent1.new_empty()
 
     # pick two random crossover points
     k1 = randint(0, class_count // 2)
@@ -360,24 +573,18 @@ def cross_over(parent1: Schedule, parent2: Schedule, class_list: list[Subject],
         duration = class_list[class_idx].get_duration()
         
         # Try preferred parent
-        value = preferred_parent.mapping.get(class_idx, -1)
+        value = preferred_parent.get_start(class_idx)
         if value != -1:
             # Check if slots are free (no overlap)
-            if all(not child.class_list[value + j] for j in range(duration) if value + j < len(child.class_list)):
-                child.mapping[class_idx] = value
-                for j in range(duration):
-                    child.class_list[value + j].append(class_idx)
+            if child.is_free(value, duration):
+                child.place_class(class_idx, value, duration)
                 return
         
         # If preferred failed, FORCE fallback parent (no matter what)
-        value = fallback_parent.mapping.get(class_idx, -1)
+        value = fallback_parent.get_start(class_idx)
         if value != -1:
-            child.mapping[class_idx] = value
-            for j in range(duration):
-                child.class_list[value + j].append(class_idx)
-        else:
-            # If both parents don't have this class, leave unplaced
-            child.mapping[class_idx] = -1
+            child.place_class(class_idx, value, duration)
+        # If both parents don't have this class, it stays unplaced (the child is empty from new_empty or the pool)
 
     # Child 1: parent1 -> parent2 -> parent1
     for i in range(k1):
@@ -395,8 +602,20 @@ def cross_over(parent1: Schedule, parent2: Schedule, class_list: list[Subject],
     for i in range(k2, class_count):
         place_class(child2, i, parent2, parent1)
 
+    if repair is not None:
+        repair(child1, class_list)
+        repair(child2, class_list)
+
+    # children that are evaluated now can start from the fitness terms of the more similar parent
+    if evaluate:
+        child1.reuse_fitness_terms(parent1, parent2)
+        child2.reuse_fitness_terms(parent1, parent2)
+
+    if mutations is None:
+        return child1, child2
+
     # mutate both children
-    child1.mutate(mutations, class_list)
-    child2.mutate(mutations, class_list)
+    child1.mutate(mutations, class_list, evaluate, cache)
+    child2.mutate(mutations, class_list, evaluate, cache)
 
     return child1, child2
\ No newline at end of file
@@ -0,0 +1,170 @@
+from random import randint, random, shuffle
+
+from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+
+
+def start_with_breaks(schedule, block: int, duration: int, from_end: bool = False) -> int:
+    """Returns a free start in the block for a class of {duration} slots, preferring a position with a free slot (a 15 minute break)
+    before and after the class so that it gets no penalty. The first such position is returned (the last one if from_end), -1 if there is none."""
+    # A start k with breaks needs slots k - 1 to k + duration free, so it is a free start of a class that is 2 slots longer, shifted by one
+    for starts in (schedule.free_starts(block, duration + 2) << 1, schedule.free_starts(block, duration)):
+        if starts:
+            offset = starts.bit_length() - 1 if from_end else (starts & -starts).bit_length() - 1
+            return block * schedule.block_size + offset
+    return -1
+
+
+def fallback_start(schedule, duration: int) -> int:
+    """A free start in a random block with room, or a random position (with an overlap) if no block has room."""
+    block = schedule.random_free_block(duration)
+    if block != -1:
+        return start_with_breaks(schedule, block, duration)
+    block = randint(0, schedule.num_blocks - 1)
+    return block * schedule.block_size + randint(0, schedule.block_size - duration)
+
+
+def duration_order(classes: list[Subject], randomized: bool) -> list[int]:
+    """Class indices from the longest to the shortest class, classes of the same duration are shuffled if randomized."""
+    order = list(range(len(classes)))
+    if randomized:
+        shuffle(order)  # sort is stable, so the shuffle stays inside every group of the same duration
+    order.sort(key=lambda i: classes[i].duration, reverse=True)
+    return order
+
+
+def first_fit_decreasing(schedule, classes: list[Subject], randomized: bool = False) -> None:
+    """Places the classes from the longest to the shortest, each one in the first block (and the first position in it) where it fits.
+    The randomized variant goes through the blocks in a random order."""
+    blocks = list(range(schedule.num_blocks))
+    if randomized:
+        shuffle(blocks)
+    for class_idx in duration_order(classes, randomized):
+        duration = classes[class_idx].duration
+        start = -1
+        for block in blocks:
+            start = start_with_breaks(schedule, block, duration)
+            if start != -1:
+                break
+        if start == -1:
+            start = fallback_start(schedule, duration)
+        schedule.place_class(class_idx, start, duration)
+
+
+def round_robin(schedule, classes: list[Subject], randomized: bool = False) -> None:
+    """Deals the classes (from the longest to the shortest) to the blocks one after another, like cards, so every day and room gets some.
+    The randomized variant deals in a random order of blocks and places a class at the start or the end of the free space at random."""
+    blocks = list(range(schedule.num_blocks))
+    if randomized:
+        shuffle(blocks)
+    turn = 0
+    for class_idx in duration_order(classes, randomized):
+        duration = classes[class_idx].duration
+        start = -1
+        for i in range(len(blocks)):  # the next block in turn that has room
+            block = blocks[(turn + i) % len(blocks)]
+            start = start_with_breaks(schedule, block, duration, from_end=randomized and random() < 0.5)
+            if start != -1:
+                turn += i + 1
+                break
+        if start == -1:
+            start = fallback_start(schedule, duration)
+        schedule.place_class(class_idx, start, duration)
+
+
+def centered_spread(load: int, block_size: int = 48, slot_minutes: int = 15) -> int:
+    """The spread score of a block whose classes take {load} slots (with the breaks) and are put in the middle of the day."""
+    if load <= 0:
+        return 0
+    free = block_size - load
+    return (free // 2 * slot_minutes) * ((free - free // 2) * slot_minutes)
+
+
+def compact_to_center(schedule, classes: list[Subject], randomized: bool = False) -> None:
+    """Built for the spread part of the fitness, which is (free minutes before the first class) * (free minutes after the last class)
+    summed over the blocks. The classes of a block are put one after another with 15 minute breaks in the middle of the day,
+    so the free time is at both edges of the day. The score of a block goes down more slowly the fuller it already is
+    and an empty block scores nothing, so the classes are given to the blocks from the shortest to the longest, each one to the block
+    where the total score gets the best (or drops the least): the short classes get a block each and the long ones are packed together.
+    The randomized variant sometimes takes the second best block, shuffles the classes inside every block and moves them a little from the middle."""
+    block_size = schedule.block_size
+    slot_minutes = schedule.grid.slot_minutes
+    loads = [0] * schedule.num_blocks  # slots used in each block, without the break after the last class
+    block_classes = [[] for _ in range(schedule.num_blocks)]
+    leftover = []
+    order = duration_order(classes, randomized)
+    order.reverse()  # from the shortest to the longest
+    for class_idx in order:
+        duration = classes[class_idx].duration
+        best_gain, second_gain, best_block, second_block = None, None, -1, -1
+        for block in range(schedule.num_blocks):
+            load = loads[block] + duration + (1 if loads[block] else 0)
+            if load > block_size:
+                continue
+            gain = centered_spread(load, block_size, slot_minutes) - centered_spread(loads[block], block_size, slot_minutes)
+            if best_gain is None or gain > best_gain:
+                second_gain, second_block = best_gain, best_block
+                best_gain, best_block = gain, block
+            elif second_gain is None or gain > second_gain:
+                second_gain, second_block = gain, block
+        if best_block == -1:
+            leftover.append(class_idx)
+            continue
+        block = second_block if randomized and second_block != -1 and random() < 0.2 else best_block
+        loads[block] += duration + (1 if loads[block] else 0)
+        block_classes[block].append(class_idx)
+
+    for block, group in enumerate(block_classes):
+        if not group:
+            continue
+        if randomized:
+            shuffle(group)
+        offset = (block_size - loads[block]) // 2
+        if randomized:
+            offset = min(max(0, offset + randint(-2, 2)), block_size - loads[block])
+        position = block * block_size + offset
+        for class_idx in group:
+            schedule.place_class(class_idx, position, classes[class_idx].duration)
+            position += classes[class_idx].duration + 1
+
+    for class_idx in leftover:
+        duration = classes[class_idx].duration
+        schedule.place_class(class_idx, fallback_start(schedule, duration), duration)
+
+
+HEURISTICS = {
+    "first_fit": first_fit_decreasing,
+    "round_robin": round_robin,
+    "compact": compact_to_center,
+}
+
+
+def heuristic_individual(schedule_class, classes: list[Subject], room_number: int, heuristic: str, randomized: bool = True,
+                         grid: TimeGrid = DEFAULT_GRID, conflict_index=None):
+    """Builds one Schedule with a constructive heuristic and calculates its fitness.
+
+    :param schedule_class: Schedule or CompactSchedule.
+    :param classes: The list of classes to be scheduled.
+    :param room_number: The number of rooms.
+    :param heuristic: "first_fit", "round_robin" or "compact" (see HEURISTICS).
+    :param randomized: If True the randomized variant of the heuristic is used, so many individuals are not all the same.
+    :param grid: The time grid of the Schedule.
+    :param conflict_index: The group and lecturer conflicts the Schedule checks (the heuristics do not look at them), or None."""
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Unknown initialization heuristic: {heuristic}")
+    schedule = schedule_class(len(classes), room_number, grid, conflict_index)
+    HEURISTICS[heuristic](schedule, classes, randomized)
+    schedule.calculate_fitness(classes)
+    return schedule
+
+
+def heuristic_individuals(schedule_class, classes: list[Subject], room_number: int, count: int, heuristics=tuple(HEURISTICS),
+                          grid: TimeGrid = DEFAULT_GRID, conflict_index=None) -> list:
+    """Builds {count} individuals, taking the heuristics in turn. The first individual of every heuristic is its plain (deterministic)
+    version and all the others are randomized variants, so there are no copies of the same Schedule."""
+    individuals = []
+    for i in range(count):
+        heuristic = heuristics[i % len(heuristics)]
+        individuals.append(heuristic_individual(schedule_class, classes, room_number, heuristic, randomized=i >= len(heuristics),
+                                                grid=grid, conflict_index=conflict_index))
+    return individuals
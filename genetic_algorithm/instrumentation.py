@@ -0,0 +1,153 @@
+import json
+from time import perf_counter
+
+
+PHASES = ("parent_selection", "crossover", "mutation", "fitness", "local_search", "survivor_selection")
+
+
+class Instrumentation:
+    """
+    Measures what happens in life_cycle and sends it to callbacks (hooks).
+    life_cycle adds the wall time of every phase (PHASES) and the number of evaluated children with add_time and add_evaluations,
+    and at the end of a generation it calls end_generation. Every {every} generations a record (a dictionary) with the times,
+    counts, overlaps and fitness quantiles since the last record is made and every callback is called with it.
+    At the end of the run end_run sends one more record with "event": "end".
+    Generation hooks are called after every generation with only its index, for checks that must not wait for the next record
+    (like the cancellation of a service job), without making a record every generation.
+    If the EngineConfig of life_cycle has no Instrumentation (None), none of this is done, so turning it off costs nothing.
+    """
+    __slots__ = ('callbacks', 'generation_hooks', 'every', 'phase_times', 'evaluations', 'cache_hits', 'repairs', 'repaired_children', 'allocations', 'reuses', 'run_start')
+    def __init__(self, callbacks=(), every: int = 1, generation_hooks=()):
+        """
+        :param callbacks: Functions that get every record, for example a JsonLinesWriter.
+        :param every: A record is made every {every} generations.
+        :param generation_hooks: Functions called with the index of every generation.
+        """
+        self.callbacks = list(callbacks)
+        self.generation_hooks = list(generation_hooks)
+        self.every = max(1, every)
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.repairs = 0
+        self.repaired_children = 0
+        self.allocations = 0
+        self.reuses = 0
+        self.run_start = perf_counter()
+
+    def add_callback(self, callback) -> None:
+        """Adds a function that will get every record."""
+        self.callbacks.append(callback)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        """Adds wall time to a phase of the current generation."""
+        self.phase_times[phase] += seconds
+
+    def add_evaluations(self, count: int, cache_hits: int = 0) -> None:
+        """Counts fitness evaluations, cache_hits is how many of them came from the FitnessCache."""
+        self.evaluations += count
+        self.cache_hits += cache_hits
+
+    def add_repairs(self, count: int, children: int) -> None:
+        """Counts the classes moved by the overlap repair and in how many children."""
+        self.repairs += count
+        self.repaired_children += children
+
+    def add_allocations(self, allocations: int, reuses: int) -> None:
+        """Counts the Schedules made new and the ones reused from the SchedulePool."""
+        self.allocations += allocations
+        self.reuses += reuses
+
+    def end_generation(self, generation_index: int, generation: list, mutation_chance: float) -> None:
+        """Called by life_cycle after every generation, every {every} generations it makes a record and sends it to the callbacks.
+
+        :param generation_index: The index of the generation in the life cycle.
+        :param generation: The generation after selection.
+        :param mutation_chance: The mutation chance used in this generation.
+        """
+        for hook in self.generation_hooks:
+            hook(generation_index)
+        if generation_index % self.every:
+            return
+        fitness = sorted(schedule.get_fitness_score() for schedule in generation)
+        overlaps = [schedule.count_overlaps() for schedule in generation]
+        record = {
+            "event": "generation",
+            "generation": generation_index,
+            "elapsed": perf_counter() - self.run_start,
+            "phase_times": {phase: round(seconds, 6) for phase, seconds in self.phase_times.items()},
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache_hits,
+            "repairs": self.repairs,
+            "repaired_children": self.repaired_children,
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+            "mutation_chance": mutation_chance,
+            "overlapping_individuals": sum(1 for count in overlaps if count),
+            "best_overlaps": generation[0].count_overlaps() if generation else 0,
+            "fitness": fitness_quantiles(fitness),
+        }
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.repairs = 0
+        self.repaired_children = 0
+        self.allocations = 0
+        self.reuses = 0
+        self.emit(record)
+
+    def end_run(self, generation_index: int, best_schedule, stop_reason: str = "finished") -> None:
+        """Sends the last record of the run, with the best fitness and the total time."""
+        self.emit({
+            "event": "end",
+            "generation": generation_index,
+            "elapsed": perf_counter() - self.run_start,
+            "best_fitness": best_schedule.get_fitness_score(),
+            "best_overlaps": best_schedule.count_overlaps(),
+            # pairs of classes of the same group or lecturer at the same time, None if they were not checked
+            "best_conflicts": len(best_schedule.conflicts.overlapping_pairs()) if best_schedule.conflicts is not None else None,
+            "stop_reason": stop_reason,
+        })
+
+    def emit(self, record: dict) -> None:
+        """Calls every callback with the record."""
+        for callback in self.callbacks:
+            callback(record)
+
+
+def fitness_quantiles(sorted_fitness: list) -> dict:
+    """Returns the minimum, quartiles, maximum and mean of an already sorted list of fitness scores."""
+    if not sorted_fitness:
+        return {}
+    last = len(sorted_fitness) - 1
+    return {
+        "min": sorted_fitness[0],
+        "q25": sorted_fitness[last // 4],
+        "median": sorted_fitness[last // 2],
+        "q75": sorted_fitness[(3 * last) // 4],
+        "max": sorted_fitness[last],
+        "mean": sum(sorted_fitness) / len(sorted_fitness),
+    }
+
+
+class JsonLinesWriter:
+    """A callback for Instrumentation that writes every record as one line of JSON (a JSON-lines metrics stream)."""
+    __slots__ = ('file',)
+    def __init__(self, file_path: str):
+        """
+        :param file_path: The path of the .jsonl file, it is overwritten.
+        """
+        self.file = open(file_path, 'w', encoding='utf-8')
+
+    def __call__(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,156 @@
+import random
+import multiprocessing
+import traceback
+from queue import Empty
+
+from structures.subject import Subject
+from genetic_algorithm.engine_config import EngineConfig, GENERATIONAL_OPTIONS, STEADY_STATE_OPTIONS, LOOP_OPTIONS
+from genetic_algorithm.generation import generate_first_gen, crossover_all, selection, mutation_for_generation
+
+
+def _run_island(island_index, seed, classes, room_count, max_generations, optimal_fitness, stopping_criteria, population_size,
+                selection_parameter, mutation_chance, config, inboxes, stop_event, results):
+    """The life cycle of one island, it runs in its own process.
+    At the end (index, generations, genome of the best Schedule, None) is put in the results queue,
+    or (index, 0, None, traceback) if the island failed, so the driver can show the error instead of waiting for the result."""
+    # Schedules left in the queues of islands that already finished should not keep this process from exiting
+    for queue in inboxes:
+        queue.cancel_join_thread()
+    try:
+        generation_index, genome = _evolve_island(island_index, seed, classes, room_count, max_generations, optimal_fitness, stopping_criteria,
+                                                  population_size, selection_parameter, mutation_chance, config, inboxes, stop_event)
+    except Exception:
+        stop_event.set()
+        results.put((island_index, 0, None, traceback.format_exc()))
+        return
+    results.put((island_index, generation_index, genome, None))
+
+
+def _evolve_island(island_index, seed, classes, room_count, max_generations, optimal_fitness, stopping_criteria, population_size,
+                   selection_parameter, mutation_chance, config, inboxes, stop_event):
+    """The loop of one island, the same as life_cycle (crossover_all + selection), and every {migration_interval} generations
+    it sends copies of its {migrants} best Schedules to another island and takes in the Schedules other islands sent to it,
+    which replace its worst ones. When the island is close enough to the optimal fitness it tells all the other islands to stop.
+
+    :return: The number of generations and the genome of the best Schedule of the island."""
+    random.seed(seed)
+    inbox = inboxes[island_index]
+    current_gen = generate_first_gen(classes, population_size, room_count, config.schedule_class, grid=config.grid,
+                                     conflict_index=config.conflict_index)
+    generation_index = 1
+    max_fitness = current_gen[0].get_fitness_score()
+
+    while not (generation_index == max_generations or stop_event.is_set()):
+        if (optimal_fitness - max_fitness) < stopping_criteria:
+            stop_event.set()  # this island is good enough, so the whole run is finished
+            break
+
+        mutation = mutation_for_generation(generation_index, max_generations, mutation_chance)
+        current_gen = crossover_all(current_gen, population_size, mutation, classes)
+        current_gen = selection(current_gen, selection_parameter, population_size)
+
+        if len(inboxes) > 1 and generation_index % config.migration_interval == 0:
+            # Send the best ones away
+            if config.topology == "ring":
+                target = (island_index + 1) % len(inboxes)
+            else:
+                target = random.choice([i for i in range(len(inboxes)) if i != island_index])
+            inboxes[target].put([schedule.to_genome() for schedule in current_gen[:config.migrants]])
+
+            # Take in the ones that arrived, they replace the worst Schedules of the island
+            arrived = []
+            while True:
+                try:
+                    arrived.extend(inbox.get_nowait())
+                except Empty:
+                    break
+            if arrived:
+                arrived = arrived[:population_size]
+                current_gen[len(current_gen) - len(arrived):] = [config.schedule_class.from_genome(genome, classes, config.conflict_index)
+                                                                 for genome in arrived]
+                current_gen.sort(reverse=True, key=lambda Schedule: Schedule.get_fitness_score())
+
+        max_fitness = current_gen[0].get_fitness_score()
+        generation_index += 1
+
+    return generation_index, current_gen[0].to_genome()
+
+
+def island_life_cycle(max_generations, optimal_fitness, stopping_criteria, classes: list[Subject], population_size, selection_parameter,
+                      mutation_chance, rooms, output_file, config: EngineConfig = None):
+    """Runs the genetic algorithm as an island model: {islands} separate populations, each in its own process,
+    that evolve on their own and exchange their best Schedules every {migration_interval} generations.
+    The migration goes around a ring (island i sends to island i + 1) or to a random other island.
+    The whole run stops when any island gets within {stopping_criteria} of the optimal fitness or when all islands reach max_generations.
+
+    :param max_generations: The maximum number of generations of every island.
+    :param optimal_fitness: The fitness score of the "ideal" Schedule.
+    :param stopping_criteria: The minimum difference between the best fitness and the optimal fitness.
+    :param classes: List of Subject objects representing the classes to be scheduled.
+    :param population_size: The number of Schedules in the population of one island.
+    :param selection_parameter: The percentage of the best Schedules that will survive to the next generation.
+    :param mutation_chance: A list of three mutation chances for different stages of the algorithm.
+    :param rooms: List of rooms available for scheduling.
+    :param output_file: The path of the HTML file the best schedule is written to.
+    :param config: The options of the run (EngineConfig: islands, migration, seed, representation, grid, conflicts), None means
+    EngineConfig(). Every island gets its own seed made from config.seed so the islands do not evolve the same way,
+    and the migrants are sent as genomes (to_genome).
+
+    :return: The best Schedule of all islands.
+    :raises RuntimeError: If an island raised an exception (its traceback is in the message) or its process died."""
+    if config is None:
+        config = EngineConfig()
+    config.reject_options("islands", GENERATIONAL_OPTIONS + STEADY_STATE_OPTIONS + LOOP_OPTIONS)
+    if config.topology not in ("ring", "random"):
+        raise ValueError(f"Unknown migration topology: {config.topology}")
+
+    seeds = random.Random(config.seed).sample(range(2 ** 32), config.islands)
+    inboxes = [multiprocessing.Queue() for _ in range(config.islands)]
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_run_island, args=(i, seeds[i], classes, len(rooms), max_generations, optimal_fitness, stopping_criteria,
+                                                          population_size, selection_parameter, mutation_chance, config, inboxes,
+                                                          stop_event, results))
+        for i in range(config.islands)
+    ]
+    for process in processes:
+        process.start()
+
+    # Results are read before joining, a process can not finish while its result is still in the queue
+    island_results = {}
+    try:
+        while len(island_results) < config.islands:
+            try:
+                island_index, generation_index, genome, error = results.get(timeout=config.poll_seconds)
+            except Empty:
+                # A process that was killed (for example when it ran out of memory) never sends its result
+                for island_index, process in enumerate(processes):
+                    if island_index not in island_results and not process.is_alive() and process.exitcode != 0:
+                        raise RuntimeError(f"Island {island_index + 1} died with exit code {process.exitcode}")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Island {island_index + 1} failed:\n{error}")
+            island_results[island_index] = (generation_index, genome)
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        raise
+    for process in processes:
+        process.join()
+
+    best_schedule = None
+    best_generation = 0
+    for island_index, (generation_index, genome) in sorted(island_results.items()):
+        schedule = config.schedule_class.from_genome(genome, classes, config.conflict_index)
+        print(f"Island {island_index + 1}: {generation_index} generations, best fitness {schedule.get_fitness_score()}")
+        if best_schedule is None or schedule.get_fitness_score() > best_schedule.get_fitness_score():
+            best_schedule, best_generation = schedule, generation_index
+
+    print("\n\nBEST SCHEDULE:")
+    print("Fitness score:", best_schedule.get_fitness_score())
+    best_schedule.no_overlap()
+    best_schedule.write_schedule_to_html(classes, output_file, generation=best_generation, mutation=mutation_chance, keepPercent=selection_parameter)
+    return best_schedule
@@ -0,0 +1,189 @@
+from collections import defaultdict
+from random import shuffle
+
+from structures.subject import Subject
+
+
+def local_search(schedule, classes: list[Subject], strategy: str = "first", passes: int = 1) -> int:
+    """A local search on one CompactSchedule (the memetic step): every class is tried in all free positions of its block
+    (and of a random other block if the class has an overlap) and moved if the fitness gets better.
+    A class with an overlap is always moved to its best free position, even if the fitness gets a bit worse, so overlaps
+    are removed instead of hidden (the penalty does not see an overlap when the slot before the class is free).
+
+    A position is evaluated without changing the schedule: the penalty of a class only depends on its own slots and the slots
+    right before and after it, so putting the class in free slots can only change its own penalty and the penalties of the classes
+    that end right before it or start right after it. The spread of the block is read from its free slot bitmask.
+    If the schedule checks group and lecturer conflicts, the conflict penalty of a position is read from the interval lists
+    of the ConflictState (penalty_at), and a class in conflict is treated like a class with an overlap.
+    The kept fitness terms of the schedule (penalty_terms, block_scores) are updated only when a move is made.
+
+    :param schedule: The CompactSchedule to improve, it is changed in place and its fitness score is updated.
+    :param classes: The list of classes, needed for their durations.
+    :param strategy: "first" - a class is moved to the first position that is better (first improvement),
+    "best" - a class is moved to the best of all its positions (hill climbing).
+    :param passes: How many times all classes are tried, the search stops earlier if a pass does not improve anything.
+
+    :return: The number of moves that were made."""
+    if strategy not in ("first", "best"):
+        raise ValueError(f"Unknown local search strategy: {strategy}")
+    if schedule.penalty_terms is None or schedule.dirty_blocks:
+        schedule.calculate_fitness(classes)  # the kept terms have to be up to date
+
+    occupancy = schedule.occupancy
+    slot_count = len(occupancy)
+    block_size = schedule.block_size
+    slot_minutes = schedule.grid.slot_minutes
+    full_block = (1 << block_size) - 1
+    free_masks = schedule.free_masks
+    starts = schedule.starts
+    penalty_terms = schedule.penalty_terms
+    block_scores = schedule.block_scores
+    conflicts = schedule.conflicts
+
+    def penalty_with(start: int, duration: int, low: int, high: int) -> int:
+        """The penalty of a class (the same rules as CompactSchedule.class_penalty) as if slots low to high - 1 had one more class."""
+        if start <= 0 or not (occupancy[start - 1] or low <= start - 1 < high):
+            return 0
+        end = start + duration
+        if end >= slot_count or not (occupancy[end] or low <= end < high):
+            return 5
+        penalty = 10
+        for i in range(start, end):
+            if occupancy[i] + (low <= i < high) > 1:
+                penalty += 1000
+        return penalty
+
+    def spread_of(occupied: int) -> int:
+        """The spread score of a block (like CompactSchedule.block_spread) from a bitmask of its taken slots."""
+        if not occupied:
+            return 0
+        prefix = (occupied & -occupied).bit_length() - 1  # free slots before the first class
+        suffix = block_size - occupied.bit_length()  # free slots after the last class
+        return (prefix * slot_minutes) * (suffix * slot_minutes)
+
+    # Which classes start and end in every slot, and start in every block
+    starting = defaultdict(list)
+    ending = defaultdict(list)
+    block_classes = [[] for _ in range(schedule.num_blocks)]
+    for class_idx, start in enumerate(starts):
+        if start != -1:
+            starting[start].append(class_idx)
+            ending[start + classes[class_idx].duration].append(class_idx)
+            block_classes[start // block_size].append(class_idx)
+
+    moves = 0
+    order = list(range(len(starts)))
+    for _ in range(passes):
+        improved = False
+        shuffle(order)
+        for class_idx in order:
+            old_start = starts[class_idx]
+            if old_start == -1:
+                continue
+            duration = classes[class_idx].duration
+            old_end = old_start + duration
+            old_block = old_start // block_size
+            overlapping = any(occupancy[i] > 1 for i in range(old_start, old_end))
+            if conflicts is not None and conflicts.overlap_with(class_idx, old_start, duration):
+                overlapping = True  # at the same time as a class of the same group or lecturer
+            old_fitness = schedule.spread_total / (schedule.penalty_total + schedule.conflict_penalty())
+
+            # Taking the class out, the penalties that change because of that are only kept aside until a move is made
+            schedule.remove_class(class_idx, duration)
+            starting[old_start].remove(class_idx)
+            ending[old_end].remove(class_idx)
+            block_classes[old_block].remove(class_idx)
+            removed_terms = {}
+            for j in (*block_classes[old_block], *ending[old_start], *starting[old_end]):
+                removed_terms[j] = penalty_with(starts[j], classes[j].duration, 0, 0)
+            removed_spread = spread_of(~free_masks[old_block] & full_block)
+            penalty_base = schedule.penalty_total - penalty_terms[class_idx] + sum(term - penalty_terms[j] for j, term in removed_terms.items())
+            spread_base = schedule.spread_total + removed_spread - block_scores[old_block]
+            conflict_base = conflicts.penalty() if conflicts is not None else 0  # without the class
+
+            candidate_blocks = [old_block]
+            if overlapping:  # the class can also go to another block
+                other_block = schedule.random_free_block(duration)
+                if other_block not in (-1, old_block):
+                    candidate_blocks.append(other_block)
+
+            # An overlapping class takes its best free position even if it is worse than the current fitness
+            best_fitness = -1.0 if overlapping else old_fitness
+            best = None
+            for block in candidate_blocks:
+                block_start = block * block_size
+                occupied = ~free_masks[block] & full_block
+                spread_before = removed_spread if block == old_block else block_scores[block]
+                free = schedule.free_starts(block, duration)
+                while free:
+                    offset = (free & -free).bit_length() - 1
+                    free &= free - 1
+                    start = block_start + offset
+                    if start == old_start:
+                        continue
+                    end = start + duration
+                    # Only the classes that end right before or start right after the new position can change
+                    new_terms = {class_idx: penalty_with(start, duration, start, end)}
+                    for j in (*ending[start], *starting[end]):
+                        new_terms[j] = penalty_with(starts[j], classes[j].duration, start, end)
+                    penalty_total = penalty_base + new_terms[class_idx] + sum(
+                        term - removed_terms.get(j, penalty_terms[j]) for j, term in new_terms.items() if j != class_idx)
+                    block_spread = spread_of(occupied | (((1 << duration) - 1) << offset))
+                    spread_total = spread_base + block_spread - spread_before
+                    conflict_penalty = conflict_base
+                    if conflicts is not None:
+                        conflict_penalty += conflicts.penalty_at(class_idx, start, duration)
+                    fitness = spread_total / (penalty_total + conflict_penalty)
+                    if fitness > best_fitness:
+                        best_fitness = fitness
+                        best = (start, new_terms, block, block_spread, penalty_total, spread_total)
+                        if strategy == "first" and not overlapping:
+                            break
+                if best is not None and strategy == "first" and not overlapping:
+                    break
+
+            if best is None:
+                # No better position, the class goes back and nothing changes
+                schedule.place_class(class_idx, old_start, duration)
+                starting[old_start].append(class_idx)
+                ending[old_end].append(class_idx)
+                block_classes[old_block].append(class_idx)
+                continue
+
+            start, new_terms, block, block_spread, schedule.penalty_total, schedule.spread_total = best
+            schedule.place_class(class_idx, start, duration)
+            starting[start].append(class_idx)
+            ending[start + duration].append(class_idx)
+            block_classes[block].append(class_idx)
+            for j, term in removed_terms.items():
+                penalty_terms[j] = term
+            for j, term in new_terms.items():
+                penalty_terms[j] = term
+            block_scores[old_block] = removed_spread
+            block_scores[block] = block_spread
+            moves += 1
+            improved = True
+        if not improved:
+            break
+
+    # The kept terms were updated with every move, nothing has to be calculated again
+    schedule.dirty_blocks.clear()
+    schedule.set_fitness_score(schedule.spread_total / (schedule.penalty_total + schedule.conflict_penalty()))
+    if schedule.debug_fitness:
+        schedule.calculate_fitness(classes)  # compares the kept terms with a full calculation
+    return moves
+
+
+def improve_children(children: list, classes: list[Subject], fraction: float = 0.1, strategy: str = "first", passes: int = 1) -> int:
+    """Runs local_search on the best {fraction} of the children (by fitness), before the selection.
+
+    :param children: The children made in this generation, CompactSchedule objects with fitness scores.
+    :param classes: The list of classes.
+    :param fraction: The part of the children that is improved, 1 means all of them.
+    :param strategy: "first" or "best", see local_search.
+    :param passes: The number of passes over the classes, see local_search.
+
+    :return: The number of moves made in all children."""
+    count = max(1, int(len(children) * fraction)) if children and fraction > 0 else 0
+    best = sorted(children, key=lambda schedule: schedule.get_fitness_score(), reverse=True)[:count]
+    return sum(local_search(schedule, classes, strategy, passes) for schedule in best)
@@ -0,0 +1,94 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from structures.subject import Subject
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.individual import cross_over
+from genetic_algorithm.generation import choose_parent_pairs
+from genetic_algorithm.conflicts import ConflictIndex, index_of
+
+
+# The classes (and their conflict index) are sent to every worker process only once, when the process starts
+_worker_classes = None
+_worker_conflicts = None
+
+
+def _init_worker(classes: list[Subject], conflict_index: ConflictIndex = None):
+    """Initializer of a worker process, remembers the classes so they do not have to be sent with every task."""
+    global _worker_classes, _worker_conflicts
+    _worker_classes = classes
+    _worker_conflicts = conflict_index
+
+
+def _breed_chunk(parent_genomes: list, pairs: list[tuple[int, int]], mutation_chance: float, seed: int):
+    """Runs in a worker process: makes children for a part of the parent pairs (cross_over + mutate + fitness).
+    The random generator of the worker is seeded for every chunk, so the children only depend on the seed and not on
+    which process does the work or in what order the chunks finish.
+
+    :param parent_genomes: Genomes (CompactSchedule.to_genome) of the parents used in this chunk.
+    :param pairs: Pairs of indices into parent_genomes.
+    :param mutation_chance: The chance of mutation for each child.
+    :param seed: The seed of the random stream of this chunk.
+
+    :return: A list of genomes of the children, two for every pair."""
+    random.seed(seed)
+    classes = _worker_classes
+    parents = [CompactSchedule.from_genome(genome, classes, _worker_conflicts) for genome in parent_genomes]
+    for parent in parents:
+        parent.full_fitness_terms(classes)  # so the children can reuse the fitness terms of their parents
+    children = []
+    for parent1, parent2 in pairs:
+        child1, child2 = cross_over(parent1=parents[parent1], parent2=parents[parent2], class_list=classes, mutations=mutation_chance)
+        children.append(child1.to_genome())
+        children.append(child2.to_genome())
+    return children
+
+
+def create_breeding_pool(workers: int, classes: list[Subject], conflict_index: ConflictIndex = None):
+    """Creates the process pool used by parallel_crossover_all, every worker gets the classes once at the start.
+
+    :param workers: The number of worker processes.
+    :param classes: List of Subject objects representing the classes to be scheduled.
+    :param conflict_index: The group and lecturer conflicts the children check, None if they are not checked.
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(classes, conflict_index))
+
+
+def parallel_crossover_all(generation: list[CompactSchedule], population_size: int, mutation_chance: float, classes: list[Subject],
+                           executor: ProcessPoolExecutor, workers: int, parent_selection: str = "roulette"):
+    """The same step as crossover_all, but the children are made in worker processes.
+    All parent pairs are chosen first in this process (choose_parent_pairs on the current population), then they are split
+    into {workers} chunks and each chunk gets its own seed drawn from this process' random generator.
+    For a fixed seed and the same number of workers the run is always the same.
+
+    :param generation: The current generation of CompactSchedules.
+    :param population_size: The total number of Schedules in the population.
+    :param mutation_chance: The chance of mutation for each child.
+    :param classes: List of Subject objects representing the classes to be scheduled.
+    :param executor: The pool made by create_breeding_pool.
+    :param workers: The number of worker processes, the number of chunks the pairs are split into.
+    :param parent_selection: "roulette" (default), "rank" or "tournament", see choose_parent_pairs.
+
+    :return: The new generation of Schedules after crossover and mutation."""
+    parents = generation[:population_size]
+    pair_count = (2 * population_size - len(generation) + 1) // 2
+    pairs = choose_parent_pairs(parents, pair_count, parent_selection)
+    genomes = [parent.to_genome() for parent in parents]
+    conflict_index = index_of(parents[0])
+
+    futures = []
+    chunk_size = -(-pair_count // workers)  # ceiling division
+    for chunk_start in range(0, pair_count, chunk_size):
+        chunk = pairs[chunk_start:chunk_start + chunk_size]
+        # Only the parents used in this chunk are sent, with the pairs renumbered to their positions in the sent list
+        used = sorted({index for pair in chunk for index in pair})
+        position = {index: i for i, index in enumerate(used)}
+        chunk_pairs = [(position[parent1], position[parent2]) for parent1, parent2 in chunk]
+        seed = random.getrandbits(64)
+        futures.append(executor.submit(_breed_chunk, [genomes[i] for i in used], chunk_pairs, mutation_chance, seed))
+
+    for future in futures:
+        for genome in future.result():
+            generation.append(CompactSchedule.from_genome(genome, classes, conflict_index))
+
+    return generation
@@ -0,0 +1,117 @@
+from random import random, randint
+
+
+class RankSampler:
+    """
+    Chooses parents with probabilities based on their fitness rank, the best Schedule has the rank n and the worst one the rank 1,
+    and the weight of a Schedule is rank ** pressure (a bigger pressure favors the best Schedules more).
+    The sampler is built once per generation (one sort of the fitness scores) and after that every draw is O(1),
+    because it uses an alias table (Vose's method): every index gets a probability and an alias index,
+    a random index is picked and then either it or its alias is returned.
+    The indices refer to the list given to the constructor, which is not changed (sorted) in any way.
+    """
+    __slots__ = ('probability', 'alias', 'size')
+    def __init__(self, generation: list, pressure: float = 1.0):
+        """
+        :param generation: The Schedules to choose the parents from.
+        :param pressure: The exponent of the rank weights, 1 is linear ranking.
+        """
+        size = len(generation)
+        order = sorted(range(size), key=lambda i: generation[i].get_fitness_score())  # from the worst to the best
+        weights = [0.0] * size
+        for rank, index in enumerate(order, start=1):
+            weights[index] = rank ** pressure
+
+        # Building the alias table, the weights are scaled so that their average is 1
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        probability = [1.0] * size
+        alias = list(range(size))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # What is left has a probability of 1 (up to rounding errors)
+
+        self.probability = probability
+        self.alias = alias
+        self.size = size
+
+    def draw(self) -> int:
+        """Returns the index of one parent."""
+        index = int(random() * self.size)
+        if random() < self.probability[index]:
+            return index
+        return self.alias[index]
+
+    def draw_pair(self) -> tuple[int, int]:
+        """Returns the indices of two different parents (if there is more than one Schedule to choose from)."""
+        parent1 = self.draw()
+        parent2 = self.draw()
+        while parent2 == parent1 and self.size > 1:
+            parent2 = self.draw()
+        return parent1, parent2
+
+    def draw_pairs(self, count: int) -> list[tuple[int, int]]:
+        """Returns {count} pairs of parent indices."""
+        return [self.draw_pair() for _ in range(count)]
+
+
+class TournamentSampler:
+    """
+    Chooses parents with tournaments: {tournament_size} random Schedules are picked and the best of them is the parent.
+    Building it only copies the fitness scores and every draw is O(tournament_size).
+    The indices refer to the list given to the constructor, which is not changed.
+    """
+    __slots__ = ('fitness', 'tournament_size')
+    def __init__(self, generation: list, tournament_size: int = 3):
+        """
+        :param generation: The Schedules to choose the parents from.
+        :param tournament_size: How many Schedules take part in one tournament.
+        """
+        self.fitness = [schedule.get_fitness_score() for schedule in generation]
+        self.tournament_size = tournament_size
+
+    def draw(self) -> int:
+        """Returns the index of one parent, the winner of a tournament."""
+        last = len(self.fitness) - 1
+        winner = randint(0, last)
+        for _ in range(self.tournament_size - 1):
+            other = randint(0, last)
+            if self.fitness[other] > self.fitness[winner]:
+                winner = other
+        return winner
+
+    def draw_pair(self) -> tuple[int, int]:
+        """Returns the indices of two different parents (if there is more than one Schedule to choose from)."""
+        parent1 = self.draw()
+        parent2 = self.draw()
+        while parent2 == parent1 and len(self.fitness) > 1:
+            parent2 = self.draw()
+        return parent1, parent2
+
+    def draw_pairs(self, count: int) -> list[tuple[int, int]]:
+        """Returns {count} pairs of parent indices."""
+        return [self.draw_pair() for _ in range(count)]
+
+
+def make_parent_sampler(generation: list, method: str = "rank"):
+    """Builds the sampler for choosing parents from the generation, once per generation.
+
+    :param generation: The Schedules to choose the parents from.
+    :param method: "rank" (RankSampler) or "tournament" (TournamentSampler).
+
+    :return: An object with draw, draw_pair and draw_pairs methods."""
+    if method == "rank":
+        return RankSampler(generation)
+    if method == "tournament":
+        return TournamentSampler(generation)
+    raise ValueError(f"Unknown parent selection method: {method}")
@@ -0,0 +1,68 @@
+from structures.subject import Subject
+
+
+def nearest_start(free_starts: int, offset: int) -> int:
+    """Returns the set bit of the bitmask that is the closest to {offset} (the later one if two are as close), or -1 if there is none."""
+    if not free_starts:
+        return -1
+    later = free_starts >> offset
+    after = (later & -later).bit_length() - 1 if later else None  # distance to the first free start from offset on
+    earlier = free_starts & ((1 << offset) - 1)
+    before = offset - (earlier.bit_length() - 1) if earlier else None  # distance to the last free start before offset
+    if before is None or (after is not None and after <= before):
+        return offset + after
+    return offset - before
+
+
+class OverlapRepair:
+    """
+    A repair operator for children made by cross_over. When the position of a class from the preferred parent is taken,
+    cross_over forces the position from the other parent even if it overlaps, and such a child gets a penalty of 1000 for every overlapping slot.
+    The repair moves every class that was forced over another one (the one with the bigger index) to the nearest free position in the same block (day and room),
+    and if the block has no room, to the same time in a random other block with room. Classes that fit nowhere are left as they are.
+    It works for Schedule and CompactSchedule, and it counts how many classes it moved in how many children.
+    """
+    __slots__ = ('repairs', 'repaired_children')
+    def __init__(self):
+        self.repairs = 0  # classes moved
+        self.repaired_children = 0  # children that had at least one class moved
+
+    def __call__(self, schedule, classes: list[Subject]) -> int:
+        """Repairs the schedule in place, before its fitness is calculated.
+
+        :param schedule: A Schedule or CompactSchedule.
+        :param classes: The list of classes, needed for their durations.
+
+        :return: The number of classes that were moved."""
+        block_size = schedule.block_size
+        moved = 0
+        # cross_over places the classes by their index and forces a class over the ones placed before it, so the classes are checked
+        # from the last one: of two overlapping classes the one with the bigger index is moved and the other one then has no overlap
+        for class_idx in range(schedule.get_class_count() - 1, -1, -1):
+            start = schedule.get_start(class_idx)
+            duration = classes[class_idx].duration
+            if start == -1 or not schedule.has_overlap(start, duration):
+                continue
+            block, offset = divmod(start, block_size)
+            schedule.remove_class(class_idx, duration)
+            new_offset = nearest_start(schedule.free_starts(block, duration), offset)
+            if new_offset == -1:
+                block = schedule.random_free_block(duration)
+                if block != -1:
+                    new_offset = nearest_start(schedule.free_starts(block, duration), offset)
+            if new_offset == -1:
+                schedule.place_class(class_idx, start, duration)  # there is no room anywhere, the overlap stays
+                continue
+            schedule.place_class(class_idx, block * block_size + new_offset, duration)
+            moved += 1
+        if moved:
+            self.repairs += moved
+            self.repaired_children += 1
+        return moved
+
+    def reset(self) -> tuple[int, int]:
+        """Returns the counts (classes moved, children repaired) since the last reset and sets them to 0."""
+        counts = self.repairs, self.repaired_children
+        self.repairs = 0
+        self.repaired_children = 0
+        return counts
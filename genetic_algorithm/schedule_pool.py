@@ -0,0 +1,49 @@
+class SchedulePool:
+    """
+    Keeps the Schedules that selection threw away and gives them back (emptied with reset) as new children,
+    so a generation does not make population_size new Schedules with new lists and arrays that live for only one generation.
+    It works for Schedule and CompactSchedule, all Schedules in one pool have the same number of classes and rooms.
+    It also counts how many Schedules were made and how many were reused, to measure allocations per generation.
+    """
+    __slots__ = ('free', 'allocations', 'reuses')
+    def __init__(self):
+        self.free = []  # Schedules that can be used again
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, template):
+        """Returns an empty Schedule of the same type and size as {template}, a reused one if the pool has any."""
+        if self.free:
+            schedule = self.free.pop()
+            schedule.reset()
+            self.reuses += 1
+            return schedule
+        self.allocations += 1
+        return template.new_empty()
+
+    def acquire_copy(self, parent):
+        """Returns a Schedule that is the same as {parent} (copy_from), a reused one if the pool has any."""
+        if self.free:
+            schedule = self.free.pop()
+            self.reuses += 1
+        else:
+            schedule = parent.new_empty()
+            self.allocations += 1
+        schedule.copy_from(parent)
+        return schedule
+
+    def release(self, schedules) -> None:
+        """Gives Schedules that are not used anymore back to the pool, nothing else may keep a reference to them."""
+        self.free.extend(schedules)
+
+    def release_discarded(self, before: list, after: list) -> None:
+        """Gives back every Schedule of {before} that is not in {after}, used after the selection."""
+        kept = {id(schedule) for schedule in after}
+        self.free.extend(schedule for schedule in before if id(schedule) not in kept)
+
+    def reset_counts(self) -> tuple[int, int]:
+        """Returns (allocations, reuses) since the last call and sets them to 0."""
+        counts = self.allocations, self.reuses
+        self.allocations = 0
+        self.reuses = 0
+        return counts
@@ -0,0 +1,335 @@
+from array import array
+from random import random, randint
+
+from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+from genetic_algorithm.fitness_cache import FitnessCache, evaluate_with_cache
+from genetic_algorithm.conflicts import ConflictIndex, ConflictState, index_of
+from exporting.exporters import ExportItem, write_html
+
+
+class SparseSchedule:
+    """
+    A version of Schedule for big instances (many rooms, days or short slots) that keeps nothing for the free time.
+    Schedule has a list for every slot and CompactSchedule a counter for every slot, so 200 rooms * 6 days * 144 five minute slots
+    are 172800 lists or counters in every individual, even if most of them are empty. Here only the occupied intervals are kept:
+    - starts and ends: for every class its first slot and the slot right after it (-1 if the class is not placed),
+    - block_classes: a dictionary {block: array of the classes in the block} that only has the blocks with at least one class.
+    The memory of an individual grows with the number of classes and not with the size of the grid.
+    Everything the algorithm needs from a block (which slots are taken, which have an overlap, where a class fits)
+    is calculated from the intervals of the block as bitmasks, like the free_masks of CompactSchedule.
+    The fitness is calculated the same way as in Schedule (with the group and lecturer conflicts if there is a ConflictIndex),
+    but only over the blocks that have classes.
+    It has the same methods as Schedule that the algorithm uses, so it works with cross_over, the repair and the heuristics
+    (not with batch_fitness, parallel breeding or the local search, which need the occupancy of CompactSchedule).
+    """
+    __slots__ = ('starts', 'ends', 'block_classes', 'fitness_score', 'num_blocks', 'block_size', 'grid', 'conflicts')
+    def __init__(self, class_count: int, room_count: int, grid: TimeGrid = DEFAULT_GRID, conflict_index: ConflictIndex = None):
+        """
+        Initializes an empty SparseSchedule with the given number of classes and rooms.
+
+        :param class_count: The number of classes in the schedule.
+        :param room_count: The number of rooms in the schedule.
+        :param grid: The time grid (days, slot length, start and end of the day).
+        :param conflict_index: The group and lecturer conflicts of the classes, None means they are not checked."""
+        self.starts = array('i', [-1]) * class_count
+        self.ends = array('i', [-1]) * class_count
+        self.block_classes = {}  # only the blocks that have classes
+        self.fitness_score = -1
+        self.grid = grid
+        self.num_blocks = grid.num_blocks(room_count)
+        self.block_size = grid.block_size
+        self.conflicts = ConflictState(conflict_index, room_count, self.block_size) if conflict_index is not None else None
+
+    @property
+    def mapping(self):
+        """The mapping of class indices to their first slots, built as a dictionary like in Schedule."""
+        return dict(enumerate(self.starts))
+
+    def get_mapping(self):
+        """Returns the mapping of classes to their indices."""
+        return self.mapping
+
+    def get_fitness_score(self):
+        """Returns the fitness score of the schedule."""
+        return self.fitness_score
+
+    def set_fitness_score(self, score: int) -> None:
+        """Sets the fitness score of the schedule."""
+        self.fitness_score = score
+
+    def genome_key(self):
+        """Returns the start slots of all classes as bytes, the key for the FitnessCache."""
+        return self.starts.tobytes()
+
+    def get_start(self, class_idx: int) -> int:
+        """Returns the first slot of the class, or -1 if the class is not placed."""
+        return self.starts[class_idx]
+
+    def get_class_count(self):
+        """Returns the number of classes the schedule was made for."""
+        return len(self.starts)
+
+    def get_room_count(self):
+        """Returns the number of rooms the schedule was made for."""
+        return self.grid.room_count(self.num_blocks)
+
+    def new_empty(self):
+        """Returns a new empty SparseSchedule with the same number of classes, rooms and grid, used for creating children."""
+        return SparseSchedule(len(self.starts), self.get_room_count(), self.grid, index_of(self))
+
+    def reset(self) -> None:
+        """Empties the schedule in place (all classes unplaced, no fitness), so it can be used again for a new child (SchedulePool)."""
+        class_count = len(self.starts)
+        self.starts[:] = array('i', [-1]) * class_count
+        self.ends[:] = self.starts
+        self.block_classes.clear()
+        self.fitness_score = -1
+        if self.conflicts is not None:
+            self.conflicts.clear()
+
+    def copy_from(self, other) -> None:
+        """Makes this schedule the same as {other} (with the same number of classes and rooms)."""
+        self.starts[:] = other.starts
+        self.ends[:] = other.ends
+        self.block_classes = {block: array('i', classes) for block, classes in other.block_classes.items()}
+        self.fitness_score = other.fitness_score
+        if self.conflicts is not None:
+            self.conflicts.copy_from(other.conflicts)
+
+    def reuse_fitness_terms(self, parent1, parent2) -> None:
+        """SparseSchedule calculates its fitness from scratch (it is already cheap), so there is nothing to take from the parents."""
+        pass
+
+    def to_genome(self):
+        """Returns the schedule as a small tuple (room count, starts as bytes, fitness score, time grid), like CompactSchedule.to_genome."""
+        return self.get_room_count(), self.starts.tobytes(), self.fitness_score, self.grid
+
+    @classmethod
+    def from_genome(cls, genome, classes: list[Subject], conflict_index: ConflictIndex = None):
+        """Builds a SparseSchedule from a genome made by to_genome.
+
+        :param genome: A tuple (room count, starts as bytes, fitness score, time grid).
+        :param classes: The list of classes, needed for their durations.
+        :param conflict_index: The group and lecturer conflicts to check, if any.
+        """
+        room_count, starts, fitness_score, grid = genome
+        schedule = cls(len(classes), room_count, grid, conflict_index)
+        for class_idx, start in enumerate(array('i', starts)):
+            if start != -1:
+                schedule.place_class(class_idx, start, classes[class_idx].duration)
+        schedule.fitness_score = fitness_score
+        return schedule
+
+    def block_masks(self, block: int) -> tuple[int, int]:
+        """Returns two bitmasks of the block: the taken slots and the slots with more than one class (bit k is slot k of the block)."""
+        block_start = block * self.block_size
+        starts, ends = self.starts, self.ends
+        taken = 0
+        overlapped = 0
+        for class_idx in self.block_classes.get(block, ()):
+            start = starts[class_idx]
+            slots = ((1 << (ends[class_idx] - start)) - 1) << (start - block_start)
+            overlapped |= taken & slots
+            taken |= slots
+        return taken, overlapped
+
+    def is_free(self, start: int, duration: int) -> bool:
+        """Checks if {duration} consecutive slots starting from {start} are all empty (a class never goes over the end of its block)."""
+        block, offset = divmod(start, self.block_size)
+        if block not in self.block_classes:
+            return True
+        return not self.block_masks(block)[0] & (((1 << duration) - 1) << offset)
+
+    def has_overlap(self, start: int, duration: int) -> bool:
+        """Checks if any of the {duration} slots starting from {start} has more than one class."""
+        block, offset = divmod(start, self.block_size)
+        return bool(self.block_masks(block)[1] & (((1 << duration) - 1) << offset))
+
+    def free_starts(self, block: int, duration: int) -> int:
+        """Returns a bitmask of all positions in the block where a class of {duration} slots can start without an overlap,
+        the same as CompactSchedule.free_starts. 0 means that the class does not fit anywhere in the block."""
+        full = (1 << self.block_size) - 1
+        starts = full if block not in self.block_classes else ~self.block_masks(block)[0] & full
+        length = 1
+        # After each step bit k says that {length} slots from k are free, the length doubles until it reaches the duration
+        while length < duration and starts:
+            step = min(length, duration - length)
+            starts &= starts >> step
+            length += step
+        return starts
+
+    def random_free_start(self, block: int, duration: int) -> int:
+        """Returns a random slot (global index) where a class of {duration} slots fits in the block without an overlap, or -1 if there is none."""
+        starts = self.free_starts(block, duration)
+        if not starts:
+            return -1
+        for _ in range(randint(0, starts.bit_count() - 1)):
+            starts &= starts - 1  # remove the lowest set bit
+        return block * self.block_size + (starts & -starts).bit_length() - 1
+
+    def random_free_block(self, duration: int) -> int:
+        """Returns a random block that has room for a class of {duration} slots, or -1 if no block has it."""
+        blocks = [block for block in range(self.num_blocks) if self.free_starts(block, duration)]
+        if not blocks:
+            return -1
+        return blocks[randint(0, len(blocks) - 1)]
+
+    def place_anywhere(self, duration: int) -> int:
+        """Returns a free position in a random block that has room for the class,
+        or a random position in a random block if there is no room anywhere (an overlap that the fitness will punish)."""
+        block = self.random_free_block(duration)
+        if block != -1:
+            return self.random_free_start(block, duration)
+        block = randint(0, self.num_blocks - 1)
+        block_start = block * self.block_size
+        return randint(block_start, block_start + self.block_size - duration)
+
+    def place_class(self, class_idx: int, start: int, duration: int) -> None:
+        """Puts the class in {duration} slots starting from {start} and remembers its start."""
+        self.starts[class_idx] = start
+        self.ends[class_idx] = start + duration
+        block = start // self.block_size
+        classes = self.block_classes.get(block)
+        if classes is None:
+            self.block_classes[block] = array('i', [class_idx])
+        else:
+            classes.append(class_idx)
+        if self.conflicts is not None:
+            self.conflicts.place(class_idx, start, duration)
+
+    def remove_class(self, class_idx: int, duration: int) -> None:
+        """Takes the class out of its slots, the class stays unplaced (-1) until it is placed again."""
+        start = self.starts[class_idx]
+        if start == -1:
+            return
+        block = start // self.block_size
+        classes = self.block_classes[block]
+        classes.remove(class_idx)
+        if not classes:
+            del self.block_classes[block]  # empty blocks are not kept
+        self.starts[class_idx] = -1
+        self.ends[class_idx] = -1
+        if self.conflicts is not None:
+            self.conflicts.remove(class_idx, start, duration)
+
+    def set_random_classes(self, class_number: int, classes: list[Subject]):
+        """
+        Used for randomizing an individual, used in creating the first generation, the same way as CompactSchedule.set_random_classes.
+
+        :param class_number: The number of classes to be scheduled.
+        :param classes: The list of classes to be scheduled.
+        """
+        for i in range(class_number):
+            duration = classes[i].duration
+            position = self.random_free_start(randint(0, self.num_blocks - 1), duration)
+            if position == -1:
+                position = self.place_anywhere(duration)
+            self.place_class(i, position, duration)
+
+        self.calculate_fitness(classes)
+
+    def calculate_fitness(self, all_class: list[Subject]) -> None:
+        """
+        Calculates the fitness score of a schedule with the rules of Schedule.calculate_fitness (validity penalty and the spread of classes).
+        Empty blocks add nothing to the spread and a free slot never adds a penalty, so only the blocks that have classes are looked at.
+
+        :param all_class: The list of classes to calculate the fitness score for (the durations are also kept in ends).
+        """
+        block_size = self.block_size
+        slot_minutes = self.grid.slot_minutes
+        masks = {block: self.block_masks(block) for block in self.block_classes}
+
+        # Second Part: Schedule Spread (Late Starts + Early Finishes)
+        total_score = 0
+        for taken, _ in masks.values():
+            prefix = (taken & -taken).bit_length() - 1  # free slots before the first class
+            suffix = block_size - taken.bit_length()  # free slots after the last class
+            total_score += (prefix * slot_minutes) * (suffix * slot_minutes)
+
+        def is_taken(slot):
+            block, offset = divmod(slot, block_size)
+            block_masks = masks.get(block)
+            return block_masks is not None and block_masks[0] >> offset & 1
+
+        # First Part: Schedule Validity
+        penalty = 1
+        if self.conflicts is not None:
+            penalty += self.conflicts.penalty()  # classes of the same group or lecturer at the same time
+        slot_count = self.num_blocks * block_size
+        for start, end in zip(self.starts, self.ends):
+            # Check before
+            if start <= 0 or not is_taken(start - 1):
+                continue
+            penalty += 5
+            # Check after
+            if end >= slot_count or not is_taken(end):
+                continue
+            penalty += 5
+            # Check slot overlap
+            block, offset = divmod(start, block_size)
+            overlapped = masks[block][1] >> offset & ((1 << (end - start)) - 1)
+            penalty += 1000 * overlapped.bit_count()
+
+        self.set_fitness_score(total_score / penalty)
+
+    def mutate(self, mutation_chance: float, all_classes: list[Subject], evaluate: bool = True, cache: FitnessCache = None):
+        """Funtion that handles the mutation of an individual, like CompactSchedule.mutate.
+
+        :param mutation_chance: The chance of mutation happening, a number between 0 and 1.
+        :param all_classes: The list of classes to be scheduled.
+        :param evaluate: If False the fitness score is not recalculated, used when the whole generation is evaluated at once.
+        :param cache: An optional FitnessCache, checked before the fitness is calculated.
+        """
+        mutation_happens = random()
+        if mutation_happens > mutation_chance:
+            if evaluate:
+                evaluate_with_cache(self, all_classes, cache)  # If we do not mutate, we still need to calculate the fitness score
+            return
+
+        class_count = len(self.starts)
+        class_num = randint(len(all_classes)//16, len(all_classes)//4)
+        # Will mutate {class_num} classes randomly, from 1/16 to 1/4 of all classes so it also randomizes the mutation weight
+        for _ in range(class_num):
+            class_index = randint(0, class_count - 1)
+            block = self.starts[class_index] // self.block_size
+            duration = all_classes[class_index].duration
+
+            self.remove_class(class_index, duration)
+
+            # A new free position in the same block, if the block is full the class goes to another block
+            new_position = self.random_free_start(block, duration)
+            if new_position == -1:
+                new_position = self.place_anywhere(duration)
+
+            self.place_class(class_index, new_position, duration)
+
+        if evaluate:
+            evaluate_with_cache(self, all_classes, cache)
+
+    def __repr__(self):
+        return f"SparseSchedule(starts={self.starts.tolist()}, fitness_score={self.fitness_score})"
+
+    def __str__(self):
+        return f"SparseSchedule: {self.starts.tolist()}, {self.fitness_score}"
+
+    def count_overlaps(self) -> int:
+        """Returns the number of slots that have more than one class."""
+        return sum(self.block_masks(block)[1].bit_count() for block in self.block_classes)
+
+    def no_overlap(self):
+        """Check if the schedule has no overlaps and print a message accordingly."""
+        if self.count_overlaps():
+            print("OVERLAP!!!!!!!! NOT GOOD!!!!")
+            return False
+
+        print("\n YAYYYYYY NO OVERLAP, VALID SCHEDULE!!!! \n   >>>>>>>>>>>>>>>")
+        return True
+
+    def write_schedule_to_html(self, classes: list[Subject], filename: str, generation: int = 0, mutation: list[float] = [0.5, 0.3, 0.2], keepPercent: float = 0.2):
+        """
+        Write the schedule to an HTML file, in the same format as Schedule.write_schedule_to_html (see exporting/exporters.py).
+        """
+        write_html([ExportItem.from_schedule(self, classes)], filename,
+                   subtitle=f"Generation: {generation}, Mutation: {mutation}, Keep Percent: {keepPercent}")
+        print(f"\n Schedule written to {filename}")
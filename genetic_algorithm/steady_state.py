@@ -0,0 +1,259 @@
+import heapq
+import random as random_module
+from random import randint
+from time import perf_counter
+
+from structures.subject import Subject
+from genetic_algorithm.fitness_cache import FitnessCache
+from genetic_algorithm.generation import generate_first_gen, breed, mutation_for_generation, print_generation
+from genetic_algorithm.repair import OverlapRepair
+from genetic_algorithm.schedule_pool import SchedulePool
+from genetic_algorithm.warm_start import warm_start_generation
+from genetic_algorithm.engine_config import EngineConfig, GENERATIONAL_OPTIONS, ISLAND_OPTIONS
+
+
+class IndexedPopulation:
+    """
+    The population of the steady-state engine. Every Schedule has a fixed place (0 to size - 1) in schedules, and heap is a binary
+    min-heap of the places ordered by their fitness, so the worst Schedule is always at heap[0]. When the worst one is replaced
+    by a better child only the way of that place down the heap has to be fixed, which is O(log size).
+    The best place is kept on the side: only the worst Schedule is ever replaced, so a new best can only come with a new Schedule.
+    Nothing is ever sorted. If reject_duplicates is set, a child that is the same as a Schedule in the population (genome_key)
+    is not taken in, otherwise the copies of the best Schedule slowly fill the whole population.
+    """
+    __slots__ = ('schedules', 'fitness', 'heap', 'best', 'keys')
+    def __init__(self, generation: list, reject_duplicates: bool = True):
+        """
+        :param generation: The first generation, Schedules with fitness scores.
+        :param reject_duplicates: If True, children that are already in the population are not taken in (offer).
+        """
+        self.schedules = list(generation)
+        self.fitness = [schedule.get_fitness_score() for schedule in self.schedules]
+        self.heap = list(range(len(self.schedules)))
+        self.heap.sort(key=self.fitness.__getitem__)  # a sorted list is already a heap, this is done only once
+        self.best = self.heap[-1]
+        self.keys = None
+        if reject_duplicates:
+            self.keys = {}  # genome key -> how many Schedules of the population have it
+            for schedule in self.schedules:
+                key = schedule.genome_key()
+                self.keys[key] = self.keys.get(key, 0) + 1
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def best_schedule(self):
+        """Returns the best Schedule of the population."""
+        return self.schedules[self.best]
+
+    def best_fitness(self):
+        return self.fitness[self.best]
+
+    def worst_fitness(self):
+        return self.fitness[self.heap[0]]
+
+    def offer(self, child):
+        """The replacement step: the child takes the place of the worst Schedule if it is better than it (and not a duplicate).
+
+        :param child: A new Schedule with a fitness score.
+
+        :return: The Schedule that is not in the population anymore - the old worst one, or the child itself if it was not taken in."""
+        score = child.get_fitness_score()
+        if not score > self.fitness[self.heap[0]]:
+            return child
+        key = None
+        if self.keys is not None:
+            key = child.genome_key()
+            if key in self.keys:
+                return child
+        place = self.heap[0]
+        replaced = self.schedules[place]
+        if key is not None:
+            old_key = replaced.genome_key()
+            if self.keys[old_key] == 1:
+                del self.keys[old_key]
+            else:
+                self.keys[old_key] -= 1
+            self.keys[key] = 1
+        self.schedules[place] = child
+        self.fitness[place] = score
+        self._sift_down(0)  # the new fitness is bigger than before, so the place can only go down the heap
+        if score > self.fitness[self.best] or place == self.best:
+            self.best = place
+        return replaced
+
+    def tournament(self, size: int) -> int:
+        """Returns the place of the best of {size} random Schedules (tournament selection, O(size))."""
+        last = len(self.schedules) - 1
+        winner = randint(0, last)
+        for _ in range(size - 1):
+            other = randint(0, last)
+            if self.fitness[other] > self.fitness[winner]:
+                winner = other
+        return winner
+
+    def draw_pair(self, tournament_size: int) -> tuple[int, int]:
+        """Returns the places of two different parents (if the population has more than one Schedule)."""
+        parent1 = self.tournament(tournament_size)
+        parent2 = self.tournament(tournament_size)
+        while parent2 == parent1 and len(self.schedules) > 1:
+            parent2 = self.tournament(tournament_size)
+        return parent1, parent2
+
+    def best_first(self, count: int) -> list:
+        """Returns all Schedules with the {count} best ones first (from the best), and the others after them in no order.
+        Used where a generation list is expected (ConvergenceController, Instrumentation), it costs O(size * log count)."""
+        top = heapq.nlargest(count, range(len(self.schedules)), key=self.fitness.__getitem__)
+        chosen = set(top)
+        return [self.schedules[place] for place in top] + [schedule for place, schedule in enumerate(self.schedules) if place not in chosen]
+
+    def _sift_down(self, i: int) -> None:
+        """Moves the place at heap[i] down until both its children in the heap have a bigger (or the same) fitness."""
+        heap, fitness = self.heap, self.fitness
+        size = len(heap)
+        place = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and fitness[heap[child + 1]] < fitness[heap[child]]:
+                child += 1
+            if not fitness[heap[child]] < fitness[place]:
+                break
+            heap[i] = heap[child]
+            i = child
+        heap[i] = place
+
+
+def steady_state_life_cycle(max_generations, optimal_fitness, stopping_criteria, classes: list[Subject], population_size, mutation_chance,
+                            rooms, output_file, config: EngineConfig = None):
+    """The genetic algorithm as a steady-state engine, instead of the generational loop of life_cycle.
+    life_cycle makes population_size children every generation, sorts the doubled population in the selection and throws half of it away.
+    Here every step makes only {pairs_per_step} pairs of children (the same cross_over and mutate as life_cycle), and each child takes the
+    place of the worst Schedule of the population if it is better (IndexedPopulation.offer). The parents are chosen with tournaments,
+    so nothing is sorted: a step costs O(log population_size) besides the crossover and the fitness.
+    A "generation" is population_size children, so max_generations, the mutation phases (mutation_for_generation), the printing,
+    the Instrumentation records and the ConvergenceController work the same way as in life_cycle.
+    batch_fitness, parallel breeding, the local search and the checkpoints are not available here, they work on whole generations.
+
+    :param max_generations: The maximum number of generations (population_size children each).
+    :param optimal_fitness: The fitness score of the "ideal" Schedule.
+    :param stopping_criteria: The minimum difference between the best fitness and the optimal fitness.
+    :param classes: List of Subject objects representing the classes to be scheduled.
+    :param population_size: The number of Schedules in the population.
+    :param mutation_chance: A list of three mutation chances for different stages of the algorithm.
+    :param rooms: List of rooms available for scheduling.
+    :param output_file: The path of the HTML file the best schedule is written to.
+    :param config: The options of the run (EngineConfig), None means EngineConfig() with every option off.
+
+    :return: The best Schedule of the population."""
+    if config is None:
+        config = EngineConfig()
+    config.reject_options("steady-state", GENERATIONAL_OPTIONS + ISLAND_OPTIONS)
+    instrumentation = config.instrumentation
+    if config.seed is not None:
+        random_module.seed(config.seed)
+    if any(subject.duration > config.grid.block_size for subject in classes):
+        raise ValueError(f"A class is longer than a day of {config.grid}, were the classes loaded with another grid?")
+    if config.pairs_per_step < 1 or config.tournament_size < 1:
+        raise ValueError("pairs_per_step and tournament_size have to be at least 1")
+
+    fitness_cache = FitnessCache(config.fitness_cache_size) if config.fitness_cache_size > 0 else None
+    repair = OverlapRepair() if config.repair_overlaps else None
+    pool = SchedulePool() if config.pool_buffers else None
+    total_repairs = 0
+    steps_per_generation = max(1, population_size // (2 * config.pairs_per_step))
+
+    if config.initial_schedule is not None:
+        first_gen = warm_start_generation(classes, population_size, len(rooms), config.initial_schedule, config.schedule_class, config.grid,
+                                          config.conflict_index, config.warm_start_perturbation)
+    else:
+        first_gen = generate_first_gen(classes, population_size, len(rooms), config.schedule_class, config.heuristic_init, config.grid,
+                                       config.conflict_index)
+    population = IndexedPopulation(first_gen, config.reject_duplicates)
+    generation_index = 1
+    max_fitness = 0
+    replacements = 0
+
+    run_start = perf_counter()
+    if config.convergence is not None:
+        config.convergence.start()  # the time budget and the history start with the main loop
+    stop_reason = "max_generations"
+    while not (generation_index == max_generations or (optimal_fitness - max_fitness) < stopping_criteria):
+        if config.time_limit is not None and perf_counter() - run_start > config.time_limit:
+            stop_reason = "time_limit"
+            break
+        if config.verbose:
+            print_generation(population.schedules, generation_index)
+        max_fitness = population.best_fitness()
+        mutation = mutation_for_generation(generation_index, max_generations, mutation_chance)
+        if config.convergence is not None:
+            mutation = config.convergence.mutation_chance(mutation)
+
+        children_made = 0
+        for _ in range(steps_per_generation):
+            if instrumentation is not None:
+                start = perf_counter()
+            # The parents of all pairs of the step are taken before any child goes in, a child that replaces a parent
+            # in its place must not become the parent of a later pair instead of the tournament winner
+            parents = [(population.schedules[parent1], population.schedules[parent2])
+                       for parent1, parent2 in (population.draw_pair(config.tournament_size) for _ in range(config.pairs_per_step))]
+            if instrumentation is not None:
+                instrumentation.add_time("parent_selection", perf_counter() - start)
+            left_out = []
+            for parent1, parent2 in parents:
+                children = breed(parent1, parent2, classes, mutation, True, fitness_cache, instrumentation, repair, pool)
+                children_made += len(children)
+                if instrumentation is not None:
+                    start = perf_counter()
+                for child in children:
+                    left = population.offer(child)
+                    if left is not child:
+                        replacements += 1
+                    left_out.append(left)
+                if instrumentation is not None:
+                    instrumentation.add_time("survivor_selection", perf_counter() - start)
+            if pool is not None:
+                pool.release(left_out)  # only after the step, a replaced Schedule can still be a parent of a later pair
+
+        if repair is not None:
+            moved, repaired_children = repair.reset()
+            total_repairs += moved
+            if instrumentation is not None:
+                instrumentation.add_repairs(moved, repaired_children)
+        if instrumentation is not None:
+            if pool is not None:
+                instrumentation.add_allocations(*pool.reset_counts())
+            else:
+                instrumentation.add_allocations(children_made, 0)
+            instrumentation.end_generation(generation_index, population.best_first(1), mutation)
+
+        generation_index += 1
+        if config.convergence is not None:
+            config.convergence.update(population.best_first(config.convergence.diversity_sample))
+            if config.convergence.should_stop():
+                stop_reason = config.convergence.stop_reason
+                break
+
+    if stop_reason == "max_generations" and (optimal_fitness - max_fitness) < stopping_criteria:
+        stop_reason = "optimal_fitness"
+
+    best = population.best_schedule()
+    print("\n\nBEST SCHEDULE:")
+    print("Fitness score:", best.get_fitness_score())
+    print(f"Stopped after {generation_index} generations: {stop_reason}")
+    print(f"Steady state: {replacements} children took the place of a worse Schedule")
+    if fitness_cache is not None:
+        print(f"Fitness cache: {fitness_cache.hits} hits, {fitness_cache.misses} misses ({fitness_cache.hit_rate():.1%})")
+    if repair is not None:
+        print(f"Overlap repair: {total_repairs} classes moved")
+    if best.conflicts is not None:
+        print(f"Group and lecturer conflicts: {len(best.conflicts.overlapping_pairs())} pairs of classes at the same time")
+        if best.conflicts.index.reference is not None:
+            print(f"Warm start: {best.conflicts.moved} classes moved from the previous schedule")
+    best.no_overlap()
+
+    best.write_schedule_to_html(classes, output_file, generation=generation_index, mutation=mutation_chance, keepPercent="steady state")
+    if instrumentation is not None:
+        instrumentation.end_run(generation_index, best, stop_reason)
+    return best
@@ -0,0 +1,135 @@
+import csv
+import json
+import os
+from random import randint
+
+from const import DAYS
+from structures.subject import Subject
+from structures.time_grid import TimeGrid, DEFAULT_GRID, parse_clock
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.conflicts import ConflictIndex
+from genetic_algorithm.initialization import fallback_start, duration_order
+
+
+def read_previous_schedule(file_path: str) -> list[dict]:
+    """Reads a schedule written by the exporters (main.py --export) as a list of {"name", "day", "room", "start", ...},
+    one for every placed class. From a .json file (write_json, or schedules.json of a batch) and a .csv file (write_csv)
+    the first schedule of the file is taken.
+
+    :param file_path: The path of the exported schedule."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in (".json", ".csv"):
+        raise ValueError(f"A previous schedule has to be a .json or .csv export, not {file_path}")
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        if extension == ".json":
+            data = json.load(file)
+            schedules = data.get("schedules") if isinstance(data, dict) else None
+            if not schedules:
+                raise ValueError(f"{file_path} has no schedules")
+            return schedules[0]["classes"]
+        rows = list(csv.DictReader(file))
+    first = rows[0]["schedule"] if rows else None
+    return [row for row in rows if row["schedule"] == first]
+
+
+def reference_starts(entries: list[dict], classes: list[Subject], rooms: dict, grid: TimeGrid = DEFAULT_GRID):
+    """Matches the classes of a previous schedule to the new list of classes by their names and returns the start slot every
+    new class had before. If a name is in the schedule more than once, the entries are matched in order.
+    A class keeps its start only if its day, room and time are still in the grid and the class (maybe with a new duration)
+    still fits in the day. All other classes (and the new ones) get -1 and are placed by the algorithm.
+
+    :param entries: The classes of the previous schedule (read_previous_schedule).
+    :param classes: The new list of classes.
+    :param rooms: The rooms of the new instance ({index: name}), matched by name too.
+    :param grid: The time grid of the new run.
+
+    :return: (starts, kept, unused) - the reference start of every class, how many classes have one
+    and how many entries of the previous schedule were not matched to any class (the removed classes)."""
+    room_index = {name: index for index, name in rooms.items()}
+    previous = {}
+    for entry in entries:
+        previous.setdefault(entry["name"], []).append(entry)
+
+    starts = [-1] * len(classes)
+    kept = 0
+    for class_idx, subject in enumerate(classes):
+        matches = previous.get(subject.name)
+        if not matches:
+            continue  # a new class
+        entry = matches.pop(0)
+        day = DAYS.index(entry["day"]) if entry["day"] in DAYS else -1
+        room = room_index.get(entry["room"], -1)
+        offset, rest = divmod(parse_clock(entry["start"]) - grid.day_start, grid.slot_minutes)
+        if not 0 <= day < grid.days or room == -1 or rest or offset < 0 or offset + subject.duration > grid.block_size:
+            continue  # the place does not exist anymore or the class got too long for it
+        starts[class_idx] = (day * len(rooms) + room) * grid.block_size + offset
+        kept += 1
+    unused = sum(len(matches) for matches in previous.values())
+    return starts, kept, unused
+
+
+def random_start(schedule, block: int, duration: int) -> int:
+    """A random free start for a class of {duration} slots in the block, or in another block (fallback_start) if the block is full."""
+    starts = schedule.free_starts(block, duration)
+    if not starts:
+        return fallback_start(schedule, duration)
+    for _ in range(randint(0, starts.bit_count() - 1)):
+        starts &= starts - 1  # remove the lowest set bit
+    return block * schedule.block_size + (starts & -starts).bit_length() - 1
+
+
+def warm_start_individual(schedule_class, classes: list[Subject], room_number: int, reference: list[int], grid: TimeGrid = DEFAULT_GRID,
+                          conflict_index: ConflictIndex = None):
+    """Builds the previous schedule again: every class with a reference start is put there if the slots are still free,
+    then the other classes (the new ones and the ones that would overlap, for example after a class before them got longer)
+    are put in free positions with breaks, from the longest one."""
+    schedule = schedule_class(len(classes), room_number, grid, conflict_index)
+    placed = [False] * len(classes)
+    for class_idx, start in enumerate(reference):
+        if start != -1 and schedule.is_free(start, classes[class_idx].duration):
+            schedule.place_class(class_idx, start, classes[class_idx].duration)
+            placed[class_idx] = True
+    for class_idx in duration_order(classes, randomized=False):
+        if not placed[class_idx]:
+            duration = classes[class_idx].duration
+            schedule.place_class(class_idx, fallback_start(schedule, duration), duration)
+    return schedule
+
+
+def perturb(schedule, classes: list[Subject], fraction: float) -> None:
+    """Moves from 1 to {fraction} of all classes to random free positions in their blocks, a much smaller change than mutate
+    so the individuals of a warm start stay close to the previous schedule."""
+    for _ in range(randint(1, max(1, int(len(classes) * fraction)))):
+        class_idx = randint(0, len(classes) - 1)
+        duration = classes[class_idx].duration
+        block = schedule.get_start(class_idx) // schedule.block_size
+        schedule.remove_class(class_idx, duration)
+        schedule.place_class(class_idx, random_start(schedule, block, duration), duration)
+
+
+def warm_start_generation(classes: list[Subject], population_size: int, room_number: int, reference: list[int], schedule_class=Schedule,
+                          grid: TimeGrid = DEFAULT_GRID, conflict_index: ConflictIndex = None, perturbation: float = 0.1) -> list:
+    """Makes the first generation of a re-scheduling run instead of generate_first_gen: the previous schedule (warm_start_individual)
+    and {population_size} - 1 copies of it with a few classes moved (perturb), so the run starts next to the old solution.
+
+    :param classes: List of Subject objects representing the classes to be scheduled.
+    :param population_size: The number of individuals in the population.
+    :param room_number: The number of rooms available for scheduling.
+    :param reference: The start slot of every class in the previous schedule, -1 for the classes to place (reference_starts).
+    :param schedule_class: Schedule (default), CompactSchedule or SparseSchedule.
+    :param grid: The time grid of the Schedules.
+    :param conflict_index: The conflicts (and the reference for the disruption penalty) the Schedules check, or None.
+    :param perturbation: The biggest part of the classes moved in one copy.
+
+    :return: The first generation, sorted from the best Schedule."""
+    base = warm_start_individual(schedule_class, classes, room_number, reference, grid, conflict_index)
+    base.calculate_fitness(classes)
+    generation = [base]
+    for _ in range(population_size - 1):
+        individual = base.new_empty()
+        individual.copy_from(base)
+        perturb(individual, classes, perturbation)
+        individual.calculate_fitness(classes)
+        generation.append(individual)
+    generation.sort(reverse=True, key=lambda Schedule: Schedule.get_fitness_score())
+    return generation
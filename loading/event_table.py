@@ -0,0 +1,77 @@
+import sys
+from array import array
+
+from structures.subject import Subject
+from const import SLOT_MINUTES
+
+
+class EventTable:
+    """
+    The events of an instance kept as two parallel arrays instead of one object per event:
+    names (a list of interned strings, so the same name is stored only once) and durations (in slots of the time grid, unsigned 16 bit).
+    The student groups (a tuple of interned names) and the lecturer (None if not given) of every event are kept in two more lists.
+    It is filled by the loaders one event at a time and can be turned into the list of Subject objects the algorithm works with.
+    """
+    __slots__ = ('names', 'durations', 'groups', 'lecturers', 'slot_minutes')
+    def __init__(self, slot_minutes: int = SLOT_MINUTES):
+        """:param slot_minutes: The slot length of the time grid the durations are counted in."""
+        self.names = []
+        self.durations = array('H')
+        self.groups = []
+        self.lecturers = []
+        self.slot_minutes = slot_minutes
+
+    def add(self, name: str, duration_minutes: int, groups=(), lecturer: str = None) -> None:
+        """Adds one event, the duration is given in minutes like in the input files."""
+        self.names.append(sys.intern(name))
+        self.durations.append(duration_minutes // self.slot_minutes)
+        self.groups.append(tuple(sys.intern(group) for group in groups))
+        self.lecturers.append(sys.intern(lecturer) if lecturer else None)
+
+    def clear_groups(self) -> None:
+        """Forgets the student groups and lecturers of all events, used when the conflicts between them are not checked."""
+        self.groups = [()] * len(self.names)
+        self.lecturers = [None] * len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> Subject:
+        return Subject(self.names[index], self.durations[index] * self.slot_minutes, self.slot_minutes, self.groups[index], self.lecturers[index])
+
+    def to_subjects(self) -> list[Subject]:
+        """Returns the events as a list of Subject objects, in the same order."""
+        slot_minutes = self.slot_minutes
+        return [Subject(name, duration * slot_minutes, slot_minutes, groups, lecturer)
+                for name, duration, groups, lecturer in zip(self.names, self.durations, self.groups, self.lecturers)]
+
+    def infer_groups(self) -> int:
+        """Gives student groups to the events that have none, from the names used in data_timetable.txt:
+        "<subject> - Vezbe <k>" is attended by group k of the subject and "<subject> - Predavanje" (the lecture) by all groups of the subject,
+        so a lecture can not be at the same time as any exercise of its subject. Other names are left without groups.
+
+        :return: The number of events that got groups."""
+        exercise_groups = {}  # subject -> its exercise group names
+        parsed = []
+        for name in self.names:
+            subject, separator, kind = name.rpartition(" - ")
+            kind = kind.strip()
+            parsed.append((subject, kind) if separator else (None, None))
+            if separator and kind.startswith("Vezbe"):
+                exercise_groups.setdefault(subject, []).append(f"{subject} / {kind[len('Vezbe'):].strip() or '1'}")
+        changed = 0
+        for index, (subject, kind) in enumerate(parsed):
+            if self.groups[index] or subject is None:
+                continue
+            if kind.startswith("Vezbe"):
+                groups = (f"{subject} / {kind[len('Vezbe'):].strip() or '1'}",)
+            elif kind == "Predavanje":
+                groups = tuple(exercise_groups.get(subject, ())) or (f"{subject} / 1",)
+            else:
+                continue
+            self.groups[index] = tuple(sys.intern(group) for group in groups)
+            changed += 1
+        return changed
+
+    def __repr__(self):
+        return f"EventTable(events={len(self.names)})"
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import os
+
+from loading.event_table import EventTable
+from structures.time_grid import TimeGrid, DEFAULT_GRID
+
+
+def check_duration(duration: int, source: str, line_number: int, grid: TimeGrid = DEFAULT_GRID) -> int:
+    """Checks that a duration (in minutes) fits the slots of the time grid and one day, returns it or raises ValueError."""
+    if duration <= 0 or duration % grid.slot_minutes:
+        raise ValueError(f"{source}:{line_number}: duration {duration} is not a positive multiple of {grid.slot_minutes} minutes")
+    day_minutes = grid.day_end - grid.day_start
+    if duration > day_minutes:
+        raise ValueError(f"{source}:{line_number}: duration {duration} is longer than a day ({day_minutes} minutes)")
+    return duration
+
+
+def parse_duration(text: str, source: str, line_number: int, grid: TimeGrid = DEFAULT_GRID) -> int:
+    """Reads a duration in minutes from the text and checks it."""
+    try:
+        duration = int(text)
+    except ValueError:
+        raise ValueError(f"{source}:{line_number}: duration {text.strip()!r} is not a whole number") from None
+    return check_duration(duration, source, line_number, grid)
+
+
+def split_groups(text: str) -> tuple:
+    """Reads a list of student groups separated by ";", for example "SV1; SV2"."""
+    return tuple(group.strip() for group in text.split(';') if group.strip())
+
+
+def parse_attributes(fields: list[str], source: str, line_number: int) -> tuple:
+    """Reads the optional "groups=A;B" and "lecturer=Name" fields of an event line.
+
+    :return: groups (tuple), lecturer (None if not given)"""
+    groups, lecturer = (), None
+    for field in fields:
+        key, _, value = field.partition('=')
+        key = key.strip().lower()
+        if key == "groups":
+            groups = split_groups(value)
+        elif key == "lecturer":
+            lecturer = value.strip() or None
+        else:
+            raise ValueError(f"{source}:{line_number}: unknown event attribute {key!r}, expected groups= or lecturer=")
+    return groups, lecturer
+
+
+def parse_rooms_line(line: str, source: str, line_number: int = 1) -> dict:
+    """Reads the "rooms: A, B, C" line into a dictionary {index: room name}."""
+    label, separator, names = line.partition(':')
+    if not separator or label.strip().lower() != "rooms":
+        raise ValueError(f"{source}:{line_number}: expected a line 'rooms: <room>, <room>, ...'")
+    rooms = {}
+    for name in names.split(','):
+        name = name.strip()
+        if name:
+            rooms[len(rooms)] = name
+    if not rooms:
+        raise ValueError(f"{source}:{line_number}: no rooms are given")
+    return rooms
+
+
+def read_text(lines, source: str = "<text>", grid: TimeGrid = DEFAULT_GRID):
+    """Reads the format of data_timetable.txt from any iterable of lines (an open file is read as a stream):
+    the first line lists the rooms, an optional "events(name, duration):" header follows and then one "name, duration" per line.
+    An event can end with the optional fields "groups=A;B" and "lecturer=Name", for example "Algebra - Vezbe 1, 120, groups=SV1, lecturer=Petrovic".
+
+    :return: rooms, EventTable"""
+    events = EventTable(grid.slot_minutes)
+    rooms = None
+    header_possible = False  # only the line right after the rooms can be the header
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if rooms is None:
+            rooms = parse_rooms_line(line, source, line_number)
+            header_possible = True
+            continue
+        if header_possible:
+            header_possible = False
+            if line.startswith("events") and line.endswith(":"):
+                continue  # the header line, an event called "events ..." is read like any other
+        # The name can have commas in it, the duration is after the last comma that is not an attribute (key=value)
+        name, separator, duration = line.rpartition(',')
+        attributes = []
+        while separator and '=' in duration:
+            attributes.append(duration)
+            name, separator, duration = name.rpartition(',')
+        if not separator or not name.strip():
+            raise ValueError(f"{source}:{line_number}: expected 'name, duration'")
+        groups, lecturer = parse_attributes(attributes, source, line_number)
+        events.add(name.strip(), parse_duration(duration, source, line_number, grid), groups, lecturer)
+    if rooms is None:
+        raise ValueError(f"{source}: the file is empty")
+    return rooms, events
+
+
+def read_csv(lines, source: str = "<csv>", grid: TimeGrid = DEFAULT_GRID):
+    """Reads a CSV instance: the first line is the same "rooms: A, B, C" line as in the text format,
+    then a CSV table with a header that has the columns "name" and "duration", and optionally "groups" (separated by ";") and "lecturer"
+    (other columns are ignored).
+
+    :return: rooms, EventTable"""
+    lines = iter(lines)
+    rooms = parse_rooms_line(next(lines, ""), source)
+    reader = csv.reader(lines)
+    header = [column.strip().lower() for column in next(reader, [])]
+    if "name" not in header or "duration" not in header:
+        raise ValueError(f"{source}:2: the CSV header needs the columns 'name' and 'duration'")
+    name_column = header.index("name")
+    duration_column = header.index("duration")
+    groups_column = header.index("groups") if "groups" in header else None
+    lecturer_column = header.index("lecturer") if "lecturer" in header else None
+    events = EventTable(grid.slot_minutes)
+    for row in reader:
+        if not row:
+            continue
+        line_number = reader.line_num + 1  # the rooms line is not counted by the reader
+        if len(row) <= max(name_column, duration_column):
+            raise ValueError(f"{source}:{line_number}: expected {len(header)} columns")
+        groups = split_groups(row[groups_column]) if groups_column is not None and groups_column < len(row) else ()
+        lecturer = row[lecturer_column].strip() or None if lecturer_column is not None and lecturer_column < len(row) else None
+        events.add(row[name_column].strip(), parse_duration(row[duration_column], source, line_number, grid), groups, lecturer)
+    return rooms, events
+
+
+def read_jsonl(lines, source: str = "<jsonl>", grid: TimeGrid = DEFAULT_GRID):
+    """Reads a JSON Lines instance: the first object is {"rooms": ["A", "B", ...]} and every next one is {"name": ..., "duration": ...},
+    with the optional keys "groups" (a list, or a string separated by ";") and "lecturer".
+
+    :return: rooms, EventTable"""
+    events = EventTable(grid.slot_minutes)
+    rooms = None
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"{source}:{line_number}: invalid JSON ({error.msg})") from None
+        if rooms is None:
+            if not isinstance(record, dict) or not record.get("rooms"):
+                raise ValueError(f"{source}:{line_number}: the first line has to be {{\"rooms\": [...]}}")
+            rooms = {i: str(name) for i, name in enumerate(record["rooms"])}
+            continue
+        try:
+            name, duration = record["name"], record["duration"]
+        except (KeyError, TypeError):
+            raise ValueError(f"{source}:{line_number}: expected an object with 'name' and 'duration'") from None
+        if isinstance(duration, bool) or not isinstance(duration, int):  # true and false are ints in Python
+            raise ValueError(f"{source}:{line_number}: duration {duration!r} is not a whole number")
+        groups = record.get("groups") or ()
+        groups = split_groups(groups) if isinstance(groups, str) else tuple(str(group) for group in groups)
+        lecturer = record.get("lecturer")
+        events.add(str(name), check_duration(duration, source, line_number, grid), groups, str(lecturer) if lecturer else None)
+    if rooms is None:
+        raise ValueError(f"{source}: the file is empty")
+    return rooms, events
+
+
+READERS = {
+    ".txt": read_text,
+    ".csv": read_csv,
+    ".jsonl": read_jsonl,
+}
+
+
+def load_instance(file_path: str, file_format: str = None, grid: TimeGrid = DEFAULT_GRID):
+    """Loads an instance from a file, reading it line by line. The format is taken from the file extension
+    (.txt, .csv or .jsonl) unless it is given. Every duration is checked, and a ValueError says which line is wrong.
+
+    :param file_path: The path of the instance file.
+    :param file_format: "txt", "csv" or "jsonl", if the extension does not say it.
+    :param grid: The time grid, the durations have to fit its slots and are kept in them.
+
+    :return: rooms (dictionary {index: room name}), EventTable"""
+    extension = "." + file_format.lstrip(".") if file_format else os.path.splitext(file_path)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Unknown instance format {extension!r}, expected one of {', '.join(READERS)}")
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        return reader(file, file_path, grid)
+
+
+def load_instance_from_string(text: str, file_format: str = "txt", grid: TimeGrid = DEFAULT_GRID):
+    """The same as load_instance, but the instance is given as a string."""
+    return READERS["." + file_format.lstrip(".")](io.StringIO(text), "<string>", grid)
@@ -1,19 +1,102 @@
+import argparse
+
 from reading_data import load_data, load_data_from_string
 from genetic_algorithm.generation import life_cycle
-from const import MAX_GENERATIONS, MUTATION_CHANCE, POPULATION_SIZE, KEEP_PERCENT, INPUT_FILE_PATH, OUTPUT_FILE_PATH, OPTIMAL_FITNESS
+from genetic_algorithm.steady_state import steady_state_life_cycle
+from genetic_algorithm.islands import island_life_cycle
+from batch_solving import solve_batch
+from exporting.exporters import ExportItem, export_schedules
+from genetic_algorithm.convergence import ConvergenceController
+from genetic_algorithm.engine_config import EngineConfig
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.sparse_individual import SparseSchedule
+from structures.time_grid import TimeGrid
+from genetic_algorithm.conflicts import conflict_index_for
+from genetic_algorithm.warm_start import read_previous_schedule, reference_starts
+from const import MAX_GENERATIONS, MUTATION_CHANCE, POPULATION_SIZE, KEEP_PERCENT, INPUT_FILE_PATH, OUTPUT_FILE_PATH, OPTIMAL_FITNESS, CHECKPOINT_EVERY
+from const import DAYS_NUM, SLOT_MINUTES, DAY_START, DAY_END, DISRUPTION_PENALTY, WARM_START_PATIENCE
+
+REPRESENTATIONS = {"compact": CompactSchedule, "list": Schedule, "sparse": SparseSchedule}
 
 def main():
+    parser = argparse.ArgumentParser(description="Genetic algorithm for making a college schedule.")
+    parser.add_argument("--checkpoint", default=None, help="save the population to this file every --checkpoint-every generations")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help=f"generations between checkpoints (default: {CHECKPOINT_EVERY})")
+    parser.add_argument("--resume-from", default=None, help="continue a run from a checkpoint file")
+    parser.add_argument("--batch", default=None, help="solve all instances in a directory (or listed in a manifest file) at the same time")
+    parser.add_argument("--output-dir", default="schedules/batch", help="where the batch results are written (default: schedules/batch)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for the batch (default: number of CPUs)")
+    parser.add_argument("--time-limit", type=float, default=None, help="time budget of the run (or of one batch instance) in seconds")
+    parser.add_argument("--export", action="append", default=[], help="also write the best schedule to this file, the format is taken from "
+                        "the extension: .html, .json, .csv or .ics (can be given more than once)")
+    parser.add_argument("--patience", type=int, default=None, help="stop after this many generations without a better schedule, "
+                        "and raise the mutation chance while the population stagnates")
+    parser.add_argument("--days", type=int, default=DAYS_NUM, help=f"working days in the week (default: {DAYS_NUM})")
+    parser.add_argument("--slot-minutes", type=int, default=SLOT_MINUTES, help=f"length of one time slot in minutes (default: {SLOT_MINUTES})")
+    parser.add_argument("--day-start", default=DAY_START, help=f"when the day starts, H:MM (default: {DAY_START})")
+    parser.add_argument("--day-end", default=DAY_END, help=f"when the day ends, H:MM (default: {DAY_END})")
+    parser.add_argument("--representation", choices=REPRESENTATIONS, default="list", help="how the individuals are stored: "
+                        "list (a list per slot, default), compact (arrays, much faster) or sparse (only the occupied intervals, for big grids)")
+    parser.add_argument("--groups", action="store_true", help="also check that the classes of one student group or lecturer are not "
+                        "at the same time in different rooms (groups missing in the instance are guessed from the class names)")
+    parser.add_argument("--engine", choices=("generational", "steady-state", "islands"), default="generational", help="generational (a whole "
+                        "new generation of children every time, default), steady-state (a few children at a time replace the worst schedules) "
+                        "or islands (separate populations in their own processes that exchange their best schedules)")
+    parser.add_argument("--islands", type=int, default=4, help="number of islands (processes) of --engine islands (default: 4)")
+    parser.add_argument("--migration-interval", type=int, default=50, help="generations between two migrations of --engine islands (default: 50)")
+    parser.add_argument("--warm-start", default=None, help="start from a previous schedule (a .json or .csv file written with --export) "
+                        "instead of random schedules, for re-scheduling after a few classes changed")
+    parser.add_argument("--disruption-penalty", type=int, default=DISRUPTION_PENALTY, help="penalty for every class that is moved "
+                        f"from its place in the --warm-start schedule, 0 lets them move freely (default: {DISRUPTION_PENALTY})")
+    args = parser.parse_args()
+    grid = TimeGrid(args.days, args.slot_minutes, args.day_start, args.day_end)
+
+    if args.engine != "generational" and (args.checkpoint or args.resume_from):
+        parser.error(f"the {args.engine} engine does not support checkpoints")
+    if args.engine == "islands" and (args.warm_start or args.patience or args.time_limit):
+        parser.error("the islands engine does not support --warm-start, --patience and --time-limit")
+
+    if args.batch is not None:
+        solve_batch(args.batch, args.output_dir, workers=args.workers, time_limit=args.time_limit, groups=args.groups)
+        return
+
     # Loads data from the string instead of a file
     # Uncomment the next line to load from a file and comment the line below disable loading from a string
 
-    # rooms, events = load_data(INPUT_FILE_PATH)
-    rooms, events = load_data_from_string()
+    # rooms, events = load_data(INPUT_FILE_PATH, grid, groups=args.groups)
+    rooms, events = load_data_from_string(grid, groups=args.groups)
 
 
-    life_cycle(max_generations=MAX_GENERATIONS, optimal_fitness=OPTIMAL_FITNESS, stopping_criteria=0.1, classes=events, 
-               population_size=POPULATION_SIZE, selection_parameter=KEEP_PERCENT, mutation_chance=MUTATION_CHANCE,rooms=rooms, 
-               output_file=OUTPUT_FILE_PATH)
+    reference = None
+    if args.warm_start is not None:
+        reference, kept, unused = reference_starts(read_previous_schedule(args.warm_start), events, rooms, grid)
+        print(f"Warm start from {args.warm_start}: {kept} classes keep their place, {len(events) - kept} are placed again, "
+              f"{unused} classes of the previous schedule are not in the instance anymore")
+    patience = args.patience or (WARM_START_PATIENCE if reference is not None else None)
+    convergence = ConvergenceController(patience=patience) if patience else None
+    conflict_index = conflict_index_for(events, reference if args.disruption_penalty else None, args.disruption_penalty)
+    config = EngineConfig(schedule_class=REPRESENTATIONS[args.representation], grid=grid, conflict_index=conflict_index,
+                          time_limit=args.time_limit, convergence=convergence, initial_schedule=reference, checkpoint_path=args.checkpoint,
+                          checkpoint_every=args.checkpoint_every, resume_from=args.resume_from)
+    if args.engine == "islands":
+        config.islands = args.islands
+        config.migration_interval = args.migration_interval
+        best = island_life_cycle(max_generations=MAX_GENERATIONS, optimal_fitness=OPTIMAL_FITNESS, stopping_criteria=0.1, classes=events,
+                                 population_size=POPULATION_SIZE, selection_parameter=KEEP_PERCENT, mutation_chance=MUTATION_CHANCE, rooms=rooms,
+                                 output_file=OUTPUT_FILE_PATH, config=config)
+    elif args.engine == "steady-state":
+        best = steady_state_life_cycle(max_generations=MAX_GENERATIONS, optimal_fitness=OPTIMAL_FITNESS, stopping_criteria=0.1, classes=events,
+                                       population_size=POPULATION_SIZE, mutation_chance=MUTATION_CHANCE, rooms=rooms,
+                                       output_file=OUTPUT_FILE_PATH, config=config)
+    else:
+        best = life_cycle(max_generations=MAX_GENERATIONS, optimal_fitness=OPTIMAL_FITNESS, stopping_criteria=0.1, classes=events, 
+                          population_size=POPULATION_SIZE, selection_parameter=KEEP_PERCENT, mutation_chance=MUTATION_CHANCE,rooms=rooms, 
+                          output_file=OUTPUT_FILE_PATH, config=config)
+    for export_path in args.export:
+        export_schedules([ExportItem.from_schedule(best, events, rooms)], export_path)
+        print(f"Schedule exported to {export_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,4 +1,5 @@
-from structures.subject import Subject
+from loading.loaders import load_instance, load_instance_from_string
+from structures.time_grid import DEFAULT_GRID
 
 data_timetable_txt = """rooms: A, B, C, D, E
 events(name, duration):
@@ -63,44 +64,23 @@ Uvod u softversko inzenjerstvo - Vezbe 3, 60
 Internet mreze - Vezbe 3, 180
 Matematicka analiza - Vezbe 3, 60"""
 
-# Loading data from a string, added to prevent issues with file paths in different environments
-def load_data_from_string():
-    lines = data_timetable_txt.strip().split('\n')
-
-    rooms = {}
-    line = lines[0].strip().split(':')
-    room_list = line[1].split(',')
-    for i in range(len(room_list)):
-        rooms[i] = room_list[i].strip()
-
-    n = len(lines) - 2
-    events = [None for _ in range(n)]
-    for i in range(n):
-        event = lines[i + 2].strip().split(',')
-        s = Subject(event[0], int(event[1]))
-        events[i] = s
-    
-    return rooms, events
+# The groups and lecturers are only kept with groups=True (main.py --groups), then the events without explicit groups
+# get them from their names (a lecture and the exercises of the same subject share the students).
+# Without them conflict_index_for finds nothing to check, so by default the fitness is the same as without groups.
+# main.py, batch_solving.py, service.py and sweep.py all load their instances with these two functions.
+def prepare_events(events, groups=False):
+    if groups:
+        events.infer_groups()
+    else:
+        events.clear_groups()
+    return events.to_subjects()
 
-# Loading data from a file
-def load_data(file_path):
-    with open(file_path, 'r') as file:
-        lines= file.readlines()
-
-        rooms={}
-        line= lines[0].strip().split(':')
-        room=line[1].split(',')
-        for i in range(len(room)):
-            rooms[i]= room[i].strip()
-
-        n=len(lines[2:])
-        events= [None for _ in range(n)]
-        for i in range(n):
-            event=lines[i+2].strip().split(',')
-            s = Subject(event[0], int(event[1]))
-            events[i] = s
-        
-        return rooms, events
-    
+# Loading data from a string, added to prevent issues with file paths in different environments
+def load_data_from_string(grid=DEFAULT_GRID, groups=False, text=data_timetable_txt, file_format="txt"):
+    rooms, events = load_instance_from_string(text, file_format, grid=grid)
+    return rooms, prepare_events(events, groups)
 
-        
\ No newline at end of file
+# Loading data from a file, the format is chosen by the extension (.txt, .csv or .jsonl) unless it is given, see loading/loaders.py
+def load_data(file_path, grid=DEFAULT_GRID, groups=False, file_format=None):
+    rooms, events = load_instance(file_path, file_format, grid=grid)
+    return rooms, prepare_events(events, groups)
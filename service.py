@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from reading_data import load_data, load_data_from_string
+from exporting.exporters import ExportItem, schedule_entries
+from genetic_algorithm.generation import life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+from genetic_algorithm.instrumentation import Instrumentation
+from genetic_algorithm.conflicts import conflict_index_for
+from const import MAX_GENERATIONS, MUTATION_CHANCE, POPULATION_SIZE, KEEP_PERCENT, OPTIMAL_FITNESS
+
+
+def is_number(value) -> bool:
+    """True for an int or a float from JSON, but not for true and false (a bool is an int in Python)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker (from the progress callback) to stop life_cycle when the job was cancelled."""
+
+
+def run_job(job_id: int, rooms: dict, events: list, output_file: str, settings: dict, time_limit, progress_queue, cancelled):
+    """Runs in a worker process of the pool: solves one job with life_cycle.
+    Every {settings["progress_every"]} generations the generation and the best fitness are put in progress_queue,
+    and after every generation the run is stopped if the job id is in cancelled (a shared dictionary).
+
+    :return: A dictionary with the status, a summary of the run and the start slot of every class."""
+    def progress(record):
+        if record["event"] == "generation":
+            progress_queue.put((job_id, {"event": "progress", "generation": record["generation"],
+                                         "best_fitness": record["fitness"]["max"], "elapsed": round(record["elapsed"], 3)}))
+
+    def check_cancelled(generation_index):
+        if job_id in cancelled:
+            raise JobCancelled()
+
+    end_records = []
+    instrumentation = Instrumentation([progress, lambda record: end_records.append(record) if record["event"] == "end" else None],
+                                      every=settings["progress_every"], generation_hooks=[check_cancelled])
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            best = life_cycle(max_generations=settings["max_generations"], optimal_fitness=settings["optimal_fitness"], stopping_criteria=0.1,
+                              classes=events, population_size=settings["population_size"], selection_parameter=settings["keep_percent"],
+                              mutation_chance=settings["mutation_chance"], rooms=rooms, output_file=output_file,
+                              config=EngineConfig(instrumentation=instrumentation, verbose=False, time_limit=time_limit,
+                                                  conflict_index=conflict_index_for(events)))
+    except JobCancelled:
+        return {"status": "cancelled"}
+    end = end_records[-1]
+    return {
+        "status": "done",
+        "summary": {
+            "fitness": best.get_fitness_score(),
+            "valid": best.count_overlaps() == 0 and not end["best_conflicts"],
+            "conflicts": end["best_conflicts"],
+            "generations": end["generation"],
+            "seconds": round(end["elapsed"], 3),
+            "stop_reason": end["stop_reason"],
+        },
+        "starts": [best.get_start(i) for i in range(len(events))],
+    }
+
+
+class Job:
+    """One timetable job of the service and everything the service knows about it."""
+    __slots__ = ('id', 'name', 'rooms', 'events', 'settings', 'time_limit', 'status', 'progress', 'result', 'error', 'output_file', 'watchers')
+    def __init__(self, job_id: int, name: str, rooms: dict, events: list, settings: dict, time_limit, output_file: str):
+        self.id = job_id
+        self.name = name
+        self.rooms = rooms
+        self.events = events
+        self.settings = settings
+        self.time_limit = time_limit
+        self.status = "queued"  # queued, running, done, cancelled or failed
+        self.progress = None  # the last progress record
+        self.result = None
+        self.error = None
+        self.output_file = output_file
+        self.watchers = []  # asyncio queues of the clients that watch this job
+
+    def state(self) -> dict:
+        state = {"job": self.id, "name": self.name, "status": self.status, "events": len(self.events), "rooms": len(self.rooms)}
+        if self.progress is not None:
+            state["progress"] = self.progress
+        if self.result is not None:
+            state["summary"] = self.result["summary"]
+        if self.error is not None:
+            state["error"] = self.error
+        return state
+
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "failed")
+
+
+class SchedulingService:
+    """
+    A long-lived scheduling server: clients send jobs (timetable instances) over a TCP or Unix socket, the jobs wait in a queue
+    and at most {workers} of them run at the same time on a pool of worker processes that stay alive between jobs,
+    so a job does not pay for starting Python and importing the project.
+
+    The protocol is JSON Lines - every request and every response is one JSON object on one line. A request has an "op":
+    - {"op": "submit", "instance": "<file contents>", "format": "txt", "name": ..., "settings": {...}, "time_limit": ..., "groups": false}
+      (or "path" instead of "instance" for a file in the data directory of the server, "groups": true also checks the student group
+      and lecturer conflicts like main.py --groups) -> {"job": id, "status": "queued"}
+    - {"op": "status", "job": id} -> the state of the job
+    - {"op": "list"} -> {"jobs": [the state of every job]}
+    - {"op": "watch", "job": id} -> the state, then one {"event": "progress", ...} line every few generations
+      and the final state when the job finishes
+    - {"op": "cancel", "job": id} -> the state of the job, a running job stops after its current generation
+    - {"op": "result", "job": id, "format": "json" or "html"} -> the summary and the list of placed classes, or the HTML schedule
+    A connection can send any number of requests. Errors are answered with {"error": "..."}.
+    """
+    def __init__(self, workers: int = 2, results_dir: str = "schedules/service", settings: dict = None, data_dir: str = None):
+        """
+        :param workers: The number of worker processes, which is also how many jobs run at the same time.
+        :param results_dir: Where the HTML schedules of the jobs are written.
+        :param settings: The default parameters of the algorithm (a job can change them), the defaults are taken from const.py.
+        :param data_dir: The directory "path" submits are read from, a path outside of it is refused.
+        None means "path" submits are not allowed, the instance has to be sent in the request.
+        """
+        self.workers = workers
+        self.results_dir = results_dir
+        self.data_dir = os.path.realpath(data_dir) if data_dir is not None else None
+        self.settings = {
+            "max_generations": MAX_GENERATIONS,
+            "optimal_fitness": OPTIMAL_FITNESS,
+            "population_size": POPULATION_SIZE,
+            "keep_percent": KEEP_PERCENT,
+            "mutation_chance": MUTATION_CHANCE,
+            "progress_every": 10,
+            **(settings or {}),
+        }
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.queue = None
+        self.executor = None
+        self.manager = None
+        self.progress_queue = None
+        self.cancelled = None
+        self.loop = None
+        self.runners = []
+        self.progress_thread = None
+
+    async def start(self) -> None:
+        """Starts the worker processes, the job runners and the thread that forwards progress from the workers."""
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        # Progress and cancellation are shared with the worker processes through a manager, since pool tasks can not get plain queues
+        self.manager = multiprocessing.Manager()
+        self.progress_queue = self.manager.Queue()
+        self.cancelled = self.manager.dict()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.runners = [asyncio.create_task(self.run_jobs()) for _ in range(self.workers)]
+        self.progress_thread = threading.Thread(target=self.forward_progress, daemon=True)
+        self.progress_thread.start()
+
+    async def stop(self) -> None:
+        """Cancels the runners and stops the worker processes, the jobs that are still running are cancelled."""
+        for job in self.jobs.values():
+            if not job.finished():
+                self.cancelled[job.id] = True
+        for runner in self.runners:
+            runner.cancel()
+        await asyncio.gather(*self.runners, return_exceptions=True)
+        self.progress_queue.put(None)  # stops forward_progress
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.manager.shutdown()
+
+    def forward_progress(self) -> None:
+        """Runs in a thread: takes the progress records the workers put in the shared queue and hands them to the event loop."""
+        while True:
+            item = self.progress_queue.get()
+            if item is None:
+                return
+            self.loop.call_soon_threadsafe(self.on_progress, *item)
+
+    def on_progress(self, job_id: int, record: dict) -> None:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished():
+            return
+        job.progress = record
+        for watcher in job.watchers:
+            watcher.put_nowait(record)
+
+    def finish(self, job: Job, status: str) -> None:
+        """Marks the job as finished and sends its final state to the clients watching it."""
+        job.status = status
+        state = job.state()
+        for watcher in job.watchers:
+            watcher.put_nowait(state)
+        job.watchers.clear()
+
+    async def run_jobs(self) -> None:
+        """One runner: takes jobs from the queue and runs them in the pool, one at a time."""
+        while True:
+            job = await self.queue.get()
+            if job.status != "queued":  # cancelled while it was waiting
+                continue
+            job.status = "running"
+            try:
+                result = await self.loop.run_in_executor(self.executor, run_job, job.id, job.rooms, job.events, job.output_file,
+                                                         job.settings, job.time_limit, self.progress_queue, self.cancelled)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:  # a broken job should not stop the service
+                job.error = repr(error)
+                self.finish(job, "failed")
+                continue
+            finally:
+                self.cancelled.pop(job.id, None)  # the job is not running any more, so its cancel flag is not needed
+            if result["status"] == "cancelled":
+                self.finish(job, "cancelled")
+            else:
+                job.result = result
+                self.finish(job, "done")
+
+    def submit(self, request: dict) -> Job:
+        """Reads the instance of a submit request and puts a new job in the queue, a wrong request or instance raises ValueError."""
+        self.check_submit(request)
+        groups = request.get("groups", False)
+        if "instance" in request:
+            rooms, events = load_data_from_string(groups=groups, text=request["instance"], file_format=request.get("format", "txt"))
+        elif "path" in request:
+            rooms, events = load_data(self.data_path(request["path"]), groups=groups, file_format=request.get("format"))
+        else:
+            raise ValueError("a submit request needs 'instance' or 'path'")
+        unknown = set(request.get("settings", {})) - set(self.settings)
+        if unknown:
+            raise ValueError(f"unknown settings: {', '.join(sorted(unknown))}")
+        job_id = next(self.job_ids)
+        job = Job(job_id, request.get("name", f"job-{job_id}"), rooms, events, {**self.settings, **request.get("settings", {})},
+                  request.get("time_limit"), os.path.join(self.results_dir, f"job-{job_id}.html"))
+        self.jobs[job_id] = job
+        self.queue.put_nowait(job)
+        return job
+
+    def check_submit(self, request: dict) -> None:
+        """Checks the types of the fields of a submit request before anything is read, a wrong type raises ValueError."""
+        for key in ("instance", "path", "format", "name"):
+            if key in request and not isinstance(request[key], str):
+                raise ValueError(f"'{key}' has to be a string")
+        if not isinstance(request.get("groups", False), bool):
+            raise ValueError("'groups' has to be true or false")
+        time_limit = request.get("time_limit")
+        if time_limit is not None and (isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) or time_limit <= 0):
+            raise ValueError("'time_limit' has to be a positive number of seconds")
+        settings = request.get("settings", {})
+        if not isinstance(settings, dict):
+            raise ValueError("'settings' has to be an object")
+        for key, value in settings.items():
+            if key not in self.settings:
+                continue  # reported together with the other unknown settings
+            default = self.settings[key]
+            if isinstance(default, list):
+                if not isinstance(value, list) or len(value) != len(default) or not all(is_number(x) for x in value):
+                    raise ValueError(f"setting '{key}' has to be a list of {len(default)} numbers")
+            elif isinstance(default, int) and not isinstance(default, bool):
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError(f"setting '{key}' has to be a whole number")
+            elif not is_number(value):
+                raise ValueError(f"setting '{key}' has to be a number")
+
+    def data_path(self, path: str) -> str:
+        """Returns the real path of a file of a "path" submit, relative to the data directory, and refuses paths that lead out of it."""
+        if self.data_dir is None:
+            raise ValueError("this server does not read instance files, send the instance in the request (or start it with --data-dir)")
+        full_path = os.path.realpath(os.path.join(self.data_dir, path))
+        if os.path.commonpath([self.data_dir, full_path]) != self.data_dir:
+            raise ValueError(f"{path} is not in the data directory of the server")
+        return full_path
+
+    def cancel(self, job: Job) -> None:
+        if job.status == "queued":
+            self.finish(job, "cancelled")  # the runner skips it
+        elif job.status == "running":
+            self.cancelled[job.id] = True
+
+    def result(self, job: Job, result_format: str) -> dict:
+        if job.status != "done":
+            raise ValueError(f"job {job.id} is {job.status}, there is no result")
+        if result_format == "html":
+            with open(job.output_file, 'r', encoding='utf-8') as file:
+                return {"job": job.id, "html": file.read()}
+        if result_format == "json":
+            item = ExportItem(job.name, job.events, job.result["starts"], job.result["summary"]["fitness"], len(job.rooms), job.rooms)
+            return {"job": job.id, "summary": job.result["summary"], "classes": schedule_entries(item)}
+        raise ValueError(f"unknown result format: {result_format}")
+
+    def find_job(self, request: dict) -> Job:
+        job_id = request.get("job")
+        if isinstance(job_id, bool) or not isinstance(job_id, int):
+            raise ValueError(f"'job' has to be the number of a job, not {json.dumps(job_id)}")
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"unknown job: {request.get('job')}")
+        return job
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one connection until the client closes it."""
+        async def send(message: dict):
+            writer.write((json.dumps(message) + "\n").encode('utf-8'))
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request has to be a JSON object")
+                    op = request.get("op")
+                    if op == "submit":
+                        job = self.submit(request)
+                        await send({"job": job.id, "status": job.status})
+                    elif op == "status":
+                        await send(self.find_job(request).state())
+                    elif op == "list":
+                        await send({"jobs": [job.state() for job in self.jobs.values()]})
+                    elif op == "cancel":
+                        job = self.find_job(request)
+                        self.cancel(job)
+                        await send(job.state())
+                    elif op == "result":
+                        await send(self.result(self.find_job(request), request.get("format", "json")))
+                    elif op == "watch":
+                        await self.watch(self.find_job(request), send)
+                    else:
+                        raise ValueError(f"unknown op: {op}")
+                except (ValueError, TypeError, OSError) as error:  # a wrong request should not close the connection
+                    await send({"error": str(error)})
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # the client went away or the server is shutting down
+        finally:
+            writer.close()
+
+    async def watch(self, job: Job, send) -> None:
+        """Sends the state of the job and then its progress, until it finishes."""
+        await send(job.state())
+        if job.finished():
+            return
+        watcher = asyncio.Queue()
+        job.watchers.append(watcher)
+        try:
+            while True:
+                record = await watcher.get()
+                await send(record)
+                if "status" in record:  # the final state
+                    return
+        finally:
+            if watcher in job.watchers:
+                job.watchers.remove(watcher)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None, workers: int = 2, results_dir: str = "schedules/service",
+                data_dir: str = None):
+    """Starts the service and serves clients until the task is cancelled (Ctrl+C)."""
+    service = SchedulingService(workers, results_dir, data_dir=data_dir)
+    await service.start()
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(service.handle_client, path=unix_socket)
+        print(f"Scheduling service listening on {unix_socket} with {workers} workers")
+    else:
+        server = await asyncio.start_server(service.handle_client, host, port)
+        print(f"Scheduling service listening on {host}:{port} with {workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+async def send_request(request: dict, host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None):
+    """A small client for scripts: sends one request and yields the responses (many for "watch", one for the others)."""
+    if unix_socket is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((json.dumps(request) + "\n").encode('utf-8'))
+        await writer.drain()
+        while line := await reader.readline():
+            response = json.loads(line)
+            yield response
+            if request.get("op") != "watch" or "status" in response and response["status"] in ("done", "cancelled", "failed") \
+                    or "error" in response:
+                return
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduling service: runs timetable jobs sent over a socket (JSON Lines).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes, the number of jobs that run at the same time (default: 2)")
+    parser.add_argument("--results-dir", default="schedules/service", help="where the HTML schedules are written (default: schedules/service)")
+    parser.add_argument("--data-dir", default=None, help="allow \"path\" submits of instance files in this directory (default: not allowed)")
+    args = parser.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args.host, args.port, args.unix_socket, args.workers, args.results_dir, args.data_dir))
+
+
+if __name__ == "__main__":
+    main()
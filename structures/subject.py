@@ -1,10 +1,18 @@
+from const import SLOT_MINUTES
+
+
 class Subject:
-    """Represents a class of a subject with a name and duration that can be easily accessed in the list."""
+    """Represents a class of a subject with a name and duration that can be easily accessed in the list.
+    The duration is given in minutes and kept in slots of the time grid ({slot_minutes} minutes long).
+    groups are the student groups that attend the class and lecturer is who teaches it, two classes that share a group
+    or the lecturer can not be at the same time (see genetic_algorithm/conflicts.py)."""
 
-    __slots__ = ('name', 'duration')
-    def __init__(self, name: str, duration: int):
+    __slots__ = ('name', 'duration', 'groups', 'lecturer')
+    def __init__(self, name: str, duration: int, slot_minutes: int = SLOT_MINUTES, groups: tuple = (), lecturer: str = None):
         self.name = name
-        self.duration = duration // 15
+        self.duration = duration // slot_minutes
+        self.groups = tuple(groups)
+        self.lecturer = lecturer
 
         
 
@@ -16,8 +24,16 @@ class Subject:
         """Returns the duration of the subject."""
         return self.duration
 
+    def get_groups(self):
+        """Returns the student groups of the subject."""
+        return self.groups
+
+    def get_lecturer(self):
+        """Returns the lecturer of the subject, None if it is not known."""
+        return self.lecturer
+
     def __repr__(self):
-        return f"Subject(name={self.name}, duration={self.duration})"
+        return f"Subject(name={self.name}, duration={self.duration}, groups={self.groups}, lecturer={self.lecturer})"
 
     def __str__(self):
         return f"Subject: {self.name}, Duration: {self.duration}"
@@ -26,10 +42,12 @@ class Subject:
         if not isinstance(other, Subject):
             return NotImplemented
         return (self.name == other.name and 
-                self.duration == other.duration)
+                self.duration == other.duration and
+                self.groups == other.groups and
+                self.lecturer == other.lecturer)
     
     def __hash__(self):
-        return hash((self.name, self.duration))
+        return hash((self.name, self.duration, self.groups, self.lecturer))
 
     def __ne__(self, other):
         if not isinstance(other, Subject):
@@ -0,0 +1,101 @@
+from const import DAYS, DAYS_NUM, SLOT_MINUTES, DAY_START, DAY_END
+
+
+def parse_clock(text: str) -> int:
+    """Reads a time of day "H:MM" (or "HH:MM") and returns it in minutes from midnight."""
+    hours, separator, minutes = text.strip().partition(':')
+    try:
+        value = int(hours) * 60 + (int(minutes) if separator else 0)
+    except ValueError:
+        raise ValueError(f"{text!r} is not a time of day (expected H:MM)") from None
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"{text!r} is not a time of day (expected H:MM)")
+    return value
+
+
+class TimeGrid:
+    """
+    The time grid all schedules are made on: {days} working days, every day from {day_start} to {day_end} (minutes from midnight)
+    split into slots of {slot_minutes} minutes. One day in one room is a block of block_size slots, and the slots of a schedule
+    are ordered block by block: first all rooms of the first day, then all rooms of the second day, and so on.
+    Schedules, the loaders and the exporters all take the grid from here, the default one (DEFAULT_GRID) is
+    5 days from 7:00 to 19:00 in 15 minute slots, so block_size is 48.
+    """
+    __slots__ = ('days', 'slot_minutes', 'day_start', 'day_end', 'block_size')
+    def __init__(self, days: int = DAYS_NUM, slot_minutes: int = SLOT_MINUTES, day_start=DAY_START, day_end=DAY_END):
+        """
+        :param days: The number of working days, at most len(DAYS).
+        :param slot_minutes: The length of one slot in minutes.
+        :param day_start: When the day starts, minutes from midnight or a "H:MM" string.
+        :param day_end: When the day ends, minutes from midnight or a "H:MM" string.
+        """
+        if isinstance(day_start, str):
+            day_start = parse_clock(day_start)
+        if isinstance(day_end, str):
+            day_end = parse_clock(day_end)
+        if not 1 <= days <= len(DAYS):
+            raise ValueError(f"The number of days has to be from 1 to {len(DAYS)}, not {days}")
+        if slot_minutes <= 0:
+            raise ValueError(f"The slot length has to be positive, not {slot_minutes}")
+        if day_end <= day_start or (day_end - day_start) % slot_minutes:
+            raise ValueError(f"The day from {day_start} to {day_end} minutes can not be split into {slot_minutes} minute slots")
+        self.days = days
+        self.slot_minutes = slot_minutes
+        self.day_start = day_start
+        self.day_end = day_end
+        self.block_size = (day_end - day_start) // slot_minutes  # slots in one day of one room
+
+    def num_blocks(self, room_count: int) -> int:
+        """The number of blocks (combinations of a day and a room)."""
+        return self.days * room_count
+
+    def slot_count(self, room_count: int) -> int:
+        """The number of slots of a whole schedule."""
+        return self.days * room_count * self.block_size
+
+    def room_count(self, num_blocks: int) -> int:
+        """The number of rooms of a schedule with {num_blocks} blocks."""
+        return num_blocks // self.days
+
+    def to_slots(self, minutes: int) -> int:
+        """Converts a duration in minutes to slots, the duration has to be a multiple of the slot length."""
+        slots, rest = divmod(minutes, self.slot_minutes)
+        if rest:
+            raise ValueError(f"{minutes} minutes is not a multiple of the {self.slot_minutes} minute slot")
+        return slots
+
+    def locate(self, start: int, room_count: int) -> tuple[int, int, int]:
+        """Returns (day, room, slot of the day) of a slot of the schedule."""
+        block, offset = divmod(start, self.block_size)
+        day, room = divmod(block, room_count)
+        return day, room, offset
+
+    def minutes_of(self, offset: int) -> int:
+        """The time (minutes from midnight) when slot {offset} of a day starts."""
+        return self.day_start + offset * self.slot_minutes
+
+    def clock(self, offset: int) -> str:
+        """The time when slot {offset} of a day starts, as HH:MM."""
+        minutes = self.minutes_of(offset)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def as_tuple(self) -> tuple[int, int, int, int]:
+        return self.days, self.slot_minutes, self.day_start, self.day_end
+
+    def __eq__(self, other):
+        if not isinstance(other, TimeGrid):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __reduce__(self):
+        return TimeGrid, self.as_tuple()
+
+    def __repr__(self):
+        return (f"TimeGrid(days={self.days}, slot_minutes={self.slot_minutes}, "
+                f"day_start={self.clock(0)!r}, day_end={self.clock(self.block_size)!r})")
+
+
+DEFAULT_GRID = TimeGrid()
@@ -0,0 +1,255 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from reading_data import load_data
+from benchmarks.instance_generator import INSTANCE_SIZES, generate_instance
+from genetic_algorithm.generation import life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+from genetic_algorithm.instrumentation import Instrumentation
+from genetic_algorithm.conflicts import conflict_index_for
+from const import INPUT_FILE_PATH, OPTIMAL_FITNESS
+
+
+# The values tried for every parameter of const.py, the current defaults (100, [0.4, 0.3, 0.2], 0.2) are among them
+SEARCH_SPACE = {
+    "population_size": [50, 100, 200],
+    "mutation_chance": [[0.4, 0.3, 0.2], [0.6, 0.4, 0.2], [0.3, 0.2, 0.1], [0.5, 0.5, 0.5]],
+    "keep_percent": [0.1, 0.2, 0.3],
+}
+
+
+def grid_configs(space: dict = None) -> list[dict]:
+    """Returns every combination of the values in the search space (grid search)."""
+    space = space or SEARCH_SPACE
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(count: int, seed: int = 0, space: dict = None) -> list[dict]:
+    """Returns {count} different random combinations of the values in the search space (random search)."""
+    configs = grid_configs(space)
+    return random.Random(seed).sample(configs, min(count, len(configs)))
+
+
+def config_key(config: dict) -> str:
+    """The configuration as a JSON string, how it is kept in the results store."""
+    return json.dumps(config, sort_keys=True)
+
+
+def run_trial(rooms: dict, events: list, config: dict, seed: int, max_generations: int, target: float, time_limit: float = None) -> dict:
+    """Runs in a worker process: one life_cycle run of one configuration with one seed.
+    life_cycle is given the target as its optimal fitness, so the run stops as soon as it reaches it and the time of the run
+    is the time to the target. The console output and the HTML schedule are thrown away.
+
+    :return: A dictionary with the final fitness, the generations and seconds used and the time to the target (None if not reached)."""
+    end_records = []
+    instrumentation = Instrumentation([lambda record: end_records.append(record) if record["event"] == "end" else None],
+                                      every=max_generations + 1)  # only the end record is needed
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        best = life_cycle(max_generations=max_generations, optimal_fitness=target, stopping_criteria=0.1, classes=events,
+                          population_size=config["population_size"], selection_parameter=config["keep_percent"],
+                          mutation_chance=config["mutation_chance"], rooms=rooms, output_file=os.path.join(directory, "schedule.html"),
+                          config=EngineConfig(seed=seed, instrumentation=instrumentation, verbose=False, time_limit=time_limit,
+                                              conflict_index=conflict_index_for(events)))
+    end = end_records[-1]
+    seconds = round(end["elapsed"], 3)
+    return {
+        "final_fitness": best.get_fitness_score(),
+        "generations": end["generation"],
+        "seconds": seconds,
+        "time_to_target": seconds if end["stop_reason"] == "optimal_fitness" else None,
+        "stop_reason": end["stop_reason"],
+        "valid": best.count_overlaps() == 0 and not end["best_conflicts"],
+    }
+
+
+class ResultsStore:
+    """
+    A local SQLite file with one row for every trial (instance, configuration, seed and rung of a sweep).
+    Finished trials are found again with find, so a sweep that was stopped can be started again with the same name
+    and only the missing trials are run. The rankings are made with SQL over the stored trials.
+    """
+    __slots__ = ('connection',)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trials (
+            sweep TEXT NOT NULL,
+            instance TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            rooms INTEGER NOT NULL,
+            config TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            rung INTEGER NOT NULL,
+            max_generations INTEGER NOT NULL,
+            final_fitness REAL NOT NULL,
+            generations INTEGER NOT NULL,
+            seconds REAL NOT NULL,
+            time_to_target REAL,
+            stop_reason TEXT NOT NULL,
+            valid INTEGER NOT NULL,
+            finished TEXT NOT NULL,
+            PRIMARY KEY (sweep, instance, config, seed, rung)
+        )"""
+    def __init__(self, path: str):
+        """:param path: The SQLite file, it is created if it does not exist."""
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(self.SCHEMA)
+        self.connection.commit()
+
+    def find(self, sweep: str, instance: str, config: str, seed: int, rung: int, max_generations: int):
+        """Returns the result of a finished trial (as run_trial returns it), or None if it was not run with this budget."""
+        row = self.connection.execute(
+            "SELECT final_fitness, generations, seconds, time_to_target, stop_reason, valid FROM trials "
+            "WHERE sweep = ? AND instance = ? AND config = ? AND seed = ? AND rung = ? AND max_generations = ?",
+            (sweep, instance, config, seed, rung, max_generations)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("final_fitness", "generations", "seconds", "time_to_target", "stop_reason", "valid"), row))
+
+    def add(self, sweep: str, instance: str, events: int, rooms: int, config: str, seed: int, rung: int, max_generations: int,
+            result: dict) -> None:
+        """Saves the result of a trial, a trial that was already saved is replaced."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sweep, instance, events, rooms, config, seed, rung, max_generations, result["final_fitness"], result["generations"],
+             result["seconds"], result["time_to_target"], result["stop_reason"], int(result["valid"]), time.strftime("%Y-%m-%dT%H:%M:%S")))
+        self.connection.commit()
+
+    def ranking(self, sweep: str, instance: str, rung: int) -> list[dict]:
+        """Returns the configurations of one rung of an instance from the best: first by the part of the seeds that reached the target,
+        then by the mean time to the target (of those that reached it) and then by the mean final fitness."""
+        rows = self.connection.execute(
+            "SELECT config, COUNT(*), AVG(time_to_target IS NOT NULL), AVG(time_to_target), AVG(final_fitness), AVG(generations), "
+            "AVG(valid), events, rooms FROM trials WHERE sweep = ? AND instance = ? AND rung = ? GROUP BY config",
+            (sweep, instance, rung)).fetchall()
+        ranking = [{"config": config, "trials": trials, "hit_rate": hit_rate, "mean_time_to_target": mean_time, "mean_fitness": mean_fitness,
+                    "mean_generations": mean_generations, "valid_rate": valid_rate, "events": events, "rooms": rooms}
+                   for config, trials, hit_rate, mean_time, mean_fitness, mean_generations, valid_rate, events, rooms in rows]
+        ranking.sort(key=lambda row: (-row["hit_rate"],
+                                      row["mean_time_to_target"] if row["mean_time_to_target"] is not None else float("inf"),
+                                      -row["mean_fitness"]))
+        return ranking
+
+    def best_per_size(self, sweep: str) -> list[dict]:
+        """For every instance of the sweep, the best configuration of the last rung the instance got to,
+        sorted by the instance size (events, rooms) - the fastest converging settings for every size."""
+        rows = self.connection.execute("SELECT instance, MAX(rung) FROM trials WHERE sweep = ? GROUP BY instance", (sweep,)).fetchall()
+        best = []
+        for instance, rung in rows:
+            top = self.ranking(sweep, instance, rung)[0]
+            best.append({"instance": instance, "rung": rung, **top})
+        best.sort(key=lambda row: (row["events"], row["rooms"], row["instance"]))
+        return best
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def load_instances(paths: list[str], sizes: list[str], seed: int = 0, groups: bool = False) -> dict:
+    """Reads the instance files and generates instances of the given sizes (benchmarks/instance_generator.py).
+    With groups=True the student group and lecturer conflicts of the files are checked too (reading_data.load_data).
+
+    :return: A dictionary {name: (rooms, events)}."""
+    instances = {}
+    for path in paths:
+        instances[os.path.splitext(os.path.basename(path))[0]] = load_data(path, groups=groups)
+    for size in sizes:
+        event_count, room_count = INSTANCE_SIZES[size]
+        instances[size] = generate_instance(event_count, room_count, seed=seed)
+    return instances
+
+
+def run_sweep(instances: dict, configs: list[dict], store: ResultsStore, sweep: str, seeds: int = 3, min_generations: int = 100,
+              rungs: int = 3, eta: int = 3, target: float = OPTIMAL_FITNESS, time_limit: float = None, workers: int = None) -> list[dict]:
+    """Runs a sweep with successive halving: in rung 0 every configuration gets {min_generations} generations on every seed,
+    then only the best 1/{eta} of the configurations of every instance go on to the next rung, which has {eta} times more generations.
+    All trials of a rung (of all instances) run at the same time on a pool of worker processes, and every finished trial
+    is saved in the store right away. Trials that are already in the store are not run again.
+
+    :param instances: A dictionary {name: (rooms, events)}, see load_instances.
+    :param configs: The configurations to try, see grid_configs and random_configs.
+    :param store: The ResultsStore for the trials.
+    :param sweep: The name of the sweep in the store.
+    :param seeds: The number of seeds (0 to seeds - 1) every configuration is run with.
+    :param min_generations: The maximum number of generations of a trial in rung 0.
+    :param rungs: The number of rungs, the last one has min_generations * eta ** (rungs - 1) generations.
+    :param eta: How many times fewer configurations (and more generations) every rung has.
+    :param target: The fitness score that counts as reached, a trial stops when it gets to it.
+    :param time_limit: The time budget of one trial in seconds, None means no limit.
+    :param workers: The number of worker processes (default: number of CPUs).
+
+    :return: The best configuration for every instance, from the smallest instance (ResultsStore.best_per_size)."""
+    keys = {config_key(config): config for config in configs}
+    survivors = {name: list(keys) for name in instances}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rung in range(rungs):
+            budget = min_generations * eta ** rung
+            futures = {}
+            for name, (rooms, events) in instances.items():
+                for key in survivors[name]:
+                    for seed in range(seeds):
+                        if store.find(sweep, name, key, seed, rung, budget) is not None:
+                            continue
+                        futures[executor.submit(run_trial, rooms, events, keys[key], seed, budget, target, time_limit)] = name, key, seed
+            print(f"Rung {rung}: {sum(len(names) for names in survivors.values())} configurations, {budget} generations, {len(futures)} trials to run")
+            for future in as_completed(futures):
+                name, key, seed = futures[future]
+                rooms, events = instances[name]
+                store.add(sweep, name, len(events), len(rooms), key, seed, rung, budget, future.result())
+
+            for name in instances:
+                ranking = [row for row in store.ranking(sweep, name, rung) if row["config"] in survivors[name]]
+                if rung < rungs - 1:
+                    survivors[name] = [row["config"] for row in ranking[:max(1, len(ranking) // eta)]]
+                top = ranking[0]
+                print(f"  {name}: best {top['config']} - reached the target in {top['hit_rate']:.0%} of the seeds, "
+                      f"mean fitness {top['mean_fitness']:.1f}")
+    return store.best_per_size(sweep)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep of POPULATION_SIZE, MUTATION_CHANCE and KEEP_PERCENT over many seeds, "
+                                                 "with successive halving and the results in a SQLite file.")
+    parser.add_argument("--instances", nargs="*", default=[INPUT_FILE_PATH], help=f"instance files to tune on (default: {INPUT_FILE_PATH})")
+    parser.add_argument("--sizes", nargs="*", default=[], choices=sorted(INSTANCE_SIZES), help="also tune on generated instances of these sizes")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid", help="all combinations (grid) or --samples random ones")
+    parser.add_argument("--samples", type=int, default=10, help="configurations of the random search (default: 10)")
+    parser.add_argument("--seeds", type=int, default=3, help="seeds every configuration is run with (default: 3)")
+    parser.add_argument("--min-generations", type=int, default=100, help="generations of a trial in the first rung (default: 100)")
+    parser.add_argument("--rungs", type=int, default=3, help="rungs of the successive halving (default: 3)")
+    parser.add_argument("--eta", type=int, default=3, help="every rung keeps 1/eta of the configurations (default: 3)")
+    parser.add_argument("--target", type=float, default=OPTIMAL_FITNESS, help=f"fitness that counts as reached (default: {OPTIMAL_FITNESS})")
+    parser.add_argument("--time-limit", type=float, default=None, help="time budget of one trial in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--groups", action="store_true", help="also check the student group and lecturer conflicts (like main.py --groups)")
+    parser.add_argument("--database", default="sweeps.sqlite", help="SQLite file of the results (default: sweeps.sqlite)")
+    parser.add_argument("--name", default=None, help="name of the sweep in the database, the same name continues a stopped sweep "
+                        "(default: the current time)")
+    args = parser.parse_args()
+
+    configs = grid_configs() if args.search == "grid" else random_configs(args.samples)
+    sweep = args.name or time.strftime("%Y%m%d-%H%M%S")
+    store = ResultsStore(args.database)
+    try:
+        best = run_sweep(load_instances(args.instances, args.sizes, groups=args.groups), configs, store, sweep, args.seeds, args.min_generations, args.rungs,
+                         args.eta, args.target, args.time_limit, args.workers)
+    finally:
+        store.close()
+
+    print(f"\nFastest converging settings of sweep {sweep} ({args.database}):")
+    for row in best:
+        time_to_target = f"{row['mean_time_to_target']:.2f} s" if row["mean_time_to_target"] is not None else "not reached"
+        print(f"{row['instance']} ({row['events']} events, {row['rooms']} rooms): {row['config']} - target in {row['hit_rate']:.0%} "
+              f"of the seeds, mean time to target {time_to_target}, mean fitness {row['mean_fitness']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import io
+import contextlib
+import random
+
+import pytest
+
+from reading_data import load_data_from_string
+from structures.time_grid import TimeGrid
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.generation import generate_first_gen, life_cycle
+from genetic_algorithm.checkpoint import save_checkpoint, load_checkpoint
+from genetic_algorithm.engine_config import EngineConfig
+
+
+@pytest.fixture
+def instance():
+    rooms, events = load_data_from_string()
+    return rooms, events
+
+
+@pytest.mark.parametrize("schedule_class", [Schedule, CompactSchedule])
+def test_round_trip(instance, tmp_path, schedule_class):
+    rooms, events = instance
+    random.seed(5)
+    generation = generate_first_gen(events, 10, len(rooms), schedule_class)
+    random.gauss(0, 1)  # leaves a cached gauss value in the state
+    path = str(tmp_path / "run.ckpt")
+    save_checkpoint(path, generation, 7)
+    expected = [random.random() for _ in range(5)] + [random.gauss(0, 1)]
+
+    random.seed(99)
+    loaded, generation_index = load_checkpoint(path, events, len(rooms), schedule_class)
+    assert generation_index == 7
+    assert [random.random() for _ in range(5)] + [random.gauss(0, 1)] == expected
+    assert len(loaded) == len(generation)
+    for original, copy in zip(generation, loaded):
+        assert type(copy) is schedule_class
+        assert copy.get_fitness_score() == original.get_fitness_score()
+        assert [copy.get_start(i) for i in range(len(events))] == [original.get_start(i) for i in range(len(events))]
+
+
+def test_other_representation(instance, tmp_path):
+    # A checkpoint keeps only the starts, so a Schedule population can be loaded as CompactSchedules
+    rooms, events = instance
+    random.seed(6)
+    generation = generate_first_gen(events, 4, len(rooms), Schedule)
+    path = str(tmp_path / "run.ckpt")
+    save_checkpoint(path, generation, 2)
+    loaded, _ = load_checkpoint(path, events, len(rooms), CompactSchedule)
+    for original, copy in zip(generation, loaded):
+        copy.calculate_fitness(events)
+        assert copy.get_fitness_score() == original.get_fitness_score()
+
+
+def test_mismatched_instance(instance, tmp_path):
+    rooms, events = instance
+    random.seed(7)
+    path = str(tmp_path / "run.ckpt")
+    save_checkpoint(path, generate_first_gen(events, 3, len(rooms)), 1)
+    with pytest.raises(ValueError, match="rooms"):
+        load_checkpoint(path, events, len(rooms) + 1, Schedule)
+    with pytest.raises(ValueError, match="classes"):
+        load_checkpoint(path, events[:-1], len(rooms), Schedule)
+    with pytest.raises(ValueError, match="the run uses"):
+        load_checkpoint(path, events, len(rooms), Schedule, TimeGrid(6, 15, "7:00", "19:00"))
+
+    other = tmp_path / "other.ckpt"
+    other.write_bytes(b"not a checkpoint" * 4)
+    with pytest.raises(ValueError, match="not a checkpoint"):
+        load_checkpoint(str(other), events, len(rooms), Schedule)
+
+
+def test_resumed_run_is_the_same(instance, tmp_path):
+    rooms, events = instance
+    path = str(tmp_path / "run.ckpt")
+    output = str(tmp_path / "schedule.html")
+    with contextlib.redirect_stdout(io.StringIO()):
+        uninterrupted = life_cycle(12, 1300000, 0.1, events, 20, 0.2, [0.4, 0.3, 0.2], rooms, output,
+                                   config=EngineConfig(seed=2, checkpoint_path=path, checkpoint_every=5))
+        # The last checkpoint is from generation 10, the resumed run makes the last two generations again
+        resumed = life_cycle(12, 1300000, 0.1, events, 20, 0.2, [0.4, 0.3, 0.2], rooms, output, config=EngineConfig(resume_from=path))
+    assert resumed.get_fitness_score() == uninterrupted.get_fitness_score()
+    assert [resumed.get_start(i) for i in range(len(events))] == [uninterrupted.get_start(i) for i in range(len(events))]
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from structures.subject import Subject
+from reading_data import load_data, load_data_from_string
+from genetic_algorithm.conflicts import ConflictIndex, conflict_index_for
+from genetic_algorithm.individual import Schedule, cross_over
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.sparse_individual import SparseSchedule
+from genetic_algorithm.generation import generate_first_gen
+
+
+@pytest.fixture
+def instance():
+    rooms, events = load_data_from_string(groups=True)
+    return rooms, events, conflict_index_for(events)
+
+
+def brute_force_pairs(schedule, events, index, room_count):
+    """Compares every pair of classes: {(class, other class): overlapping slots} of the pairs in conflict on the same day in different rooms."""
+    block_size = schedule.block_size
+    pairs = {}
+    for a in range(len(events)):
+        for b in range(a + 1, len(events)):
+            shared = set(events[a].groups) & set(events[b].groups)
+            same_lecturer = events[a].lecturer is not None and events[a].lecturer == events[b].lecturer
+            if not shared and not same_lecturer:
+                continue
+            start_a, start_b = schedule.get_start(a), schedule.get_start(b)
+            if start_a < 0 or start_b < 0:
+                continue
+            block_a, offset_a = divmod(start_a, block_size)
+            block_b, offset_b = divmod(start_b, block_size)
+            if block_a // room_count != block_b // room_count or block_a == block_b:
+                continue  # another day, or the same room where it is an overlap
+            overlap = min(offset_a + events[a].duration, offset_b + events[b].duration) - max(offset_a, offset_b)
+            if overlap > 0:
+                pairs[(a, b)] = overlap
+    return pairs
+
+
+def test_neighbours_match_groups_and_lecturers(instance):
+    rooms, events, index = instance
+    for a in range(len(events)):
+        expected = [b for b in range(len(events)) if b != a and (set(events[a].groups) & set(events[b].groups)
+                                                                   or (events[a].lecturer and events[a].lecturer == events[b].lecturer))]
+        assert list(index.neighbours[a]) == expected
+    assert index.edge_count() == sum(len(linked) for linked in index.neighbours) // 2
+
+
+@pytest.mark.parametrize("schedule_class", [Schedule, CompactSchedule, SparseSchedule])
+def test_kept_total_matches_brute_force(instance, schedule_class):
+    rooms, events, index = instance
+    random.seed(5)
+    generation = generate_first_gen(events, 10, len(rooms), schedule_class, conflict_index=index)
+    schedules = list(generation)
+    for i in range(0, len(generation), 2):
+        for child in cross_over(generation[i], generation[i + 1], events, 0.9):
+            child.mutate(1.0, events)
+            schedules.append(child)
+    assert any(schedule.conflicts.total for schedule in schedules)
+    for schedule in schedules:
+        pairs = brute_force_pairs(schedule, events, index, len(rooms))
+        assert schedule.conflicts.overlapping_pairs() == pairs
+        assert schedule.conflicts.total == sum(pairs.values())
+
+
+def test_same_room_is_only_an_overlap():
+    events = [Subject("Algebra - Vezbe 1", 90, groups=("SV1",)), Subject("Fizika - Vezbe 1", 60, groups=("SV1",))]
+    index = ConflictIndex(events)
+    schedule = Schedule(len(events), 2, conflict_index=index)
+    block_size = schedule.block_size
+    schedule.place_class(0, 0, events[0].duration)
+    schedule.place_class(1, 2, events[1].duration)
+    assert schedule.conflicts.total == 0 and schedule.count_overlaps() > 0
+    schedule.remove_class(1, events[1].duration)
+    schedule.place_class(1, block_size + 2, events[1].duration)  # the same day in the other room
+    assert schedule.conflicts.total == 4 and schedule.count_overlaps() == 0
+    schedule.remove_class(1, events[1].duration)
+    schedule.place_class(1, 2 * block_size + 2, events[1].duration)  # the next day
+    assert schedule.conflicts.total == 0
+
+
+def test_penalty_is_added_to_the_fitness(instance):
+    rooms, events, index = instance
+    random.seed(6)
+    schedule = generate_first_gen(events, 1, len(rooms), Schedule, conflict_index=index)[0]
+    plain = CompactSchedule.from_genome(schedule.to_genome(), events)
+    plain.calculate_fitness(events)
+    checked = CompactSchedule.from_genome(schedule.to_genome(), events, index)
+    checked.calculate_fitness(events)
+    assert checked.conflicts.total > 0
+    # fitness = spread / penalty, the conflicts only add to the penalty
+    assert checked.get_fitness_score() == plain.spread_total / (plain.penalty_total + checked.conflicts.total * index.penalty)
+    assert schedule.get_fitness_score() == checked.get_fitness_score()
+
+
+def test_groups_are_opt_in(tmp_path):
+    text = "rooms: A, B\nAlgebra - Vezbe 1, 90, groups=SV1, lecturer=Petrovic\nAlgebra - Vezbe 2, 90\n"
+    rooms, events = load_data_from_string(text=text)
+    assert all(subject.groups == () and subject.lecturer is None for subject in events)
+    assert conflict_index_for(events) is None
+    rooms, events = load_data_from_string(text=text, groups=True)
+    assert events[0].groups == ("SV1",) and events[0].lecturer == "Petrovic"
+    assert events[1].groups == ("Algebra / 2",)  # guessed from the name
+
+    path = tmp_path / "instance.txt"
+    path.write_text(text, encoding="utf-8")
+    assert [subject.groups for subject in load_data(str(path), groups=True)[1]] == [subject.groups for subject in events]
@@ -0,0 +1,33 @@
+import io
+import contextlib
+
+from reading_data import load_data_from_string
+from genetic_algorithm.convergence import ConvergenceController
+from genetic_algorithm.generation import life_cycle
+from genetic_algorithm.steady_state import steady_state_life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+
+
+def test_start_resets_the_run():
+    controller = ConvergenceController(patience=2, time_limit=60)
+    controller.best_history.append(5.0)
+    controller.stale_generations = 3
+    controller.stop_reason = "stagnation"
+    controller.start_time -= 1000
+    controller.start()
+    assert not controller.best_history and controller.best_fitness is None
+    assert not controller.should_stop()
+
+
+def test_time_budget_counts_from_the_run(tmp_path):
+    # A controller made long before the run (or used in another run) must not stop the run at once
+    rooms, events = load_data_from_string()
+    for engine in (life_cycle, steady_state_life_cycle):
+        controller = ConvergenceController(patience=0, time_limit=60)
+        controller.start_time -= 1000
+        controller.stale_generations = 500
+        args = (4, 1300000, 0.1, events, 20, 0.2, [0.4, 0.3, 0.2]) if engine is life_cycle else (4, 1300000, 0.1, events, 20, [0.4, 0.3, 0.2])
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine(*args, rooms, str(tmp_path / "schedule.html"), config=EngineConfig(convergence=controller, seed=1))
+        assert controller.stop_reason is None
+        assert controller.best_fitness is not None and len(controller.best_history) == 3
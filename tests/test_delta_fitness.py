@@ -0,0 +1,88 @@
+import io
+import contextlib
+import random
+
+import pytest
+
+from reading_data import load_data_from_string
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.generation import breed, life_cycle
+from genetic_algorithm.engine_config import EngineConfig
+
+
+@pytest.fixture
+def instance():
+    rooms, events = load_data_from_string()
+    return rooms, events
+
+
+def full_fitness(schedule, events):
+    """The fitness of the same placement calculated from scratch, by a new CompactSchedule and by the original Schedule."""
+    compact = CompactSchedule.from_genome(schedule.to_genome(), events)
+    compact.calculate_fitness(events)
+    original = Schedule.from_genome(schedule.to_genome(), events)
+    original.calculate_fitness(events)
+    return compact.get_fitness_score(), original.get_fitness_score()
+
+
+@pytest.mark.parametrize("schedule_class", [CompactSchedule, Schedule])
+def test_mutations_match_full_recompute(instance, schedule_class):
+    rooms, events = instance
+    random.seed(3)
+    schedule = schedule_class(len(events), len(rooms))
+    schedule.set_random_classes(len(events), events)
+    schedule.calculate_fitness(events)
+    for _ in range(50):
+        schedule.mutate(1.0, events)
+        compact, original = full_fitness(schedule, events)
+        assert schedule.get_fitness_score() == compact == original
+
+
+@pytest.mark.parametrize("schedule_class", [CompactSchedule, Schedule])
+def test_children_match_full_recompute(instance, schedule_class):
+    rooms, events = instance
+    random.seed(4)
+    parents = []
+    for _ in range(2):
+        parent = schedule_class(len(events), len(rooms))
+        parent.set_random_classes(len(events), events)
+        parent.calculate_fitness(events)
+        parents.append(parent)
+    for _ in range(20):
+        children = breed(parents[0], parents[1], events, 0.5)
+        for child in children:
+            compact, original = full_fitness(child, events)
+            assert child.get_fitness_score() == compact == original
+        parents = children
+
+
+@pytest.mark.parametrize("schedule_class", [CompactSchedule, Schedule])
+def test_debug_mode_run(instance, monkeypatch, tmp_path, schedule_class):
+    # In debug mode every delta update is checked against the full calculation and raises AssertionError if they differ
+    rooms, events = instance
+    monkeypatch.setattr(schedule_class, "debug_fitness", True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = life_cycle(5, 1300000, 0.1, events, 20, 0.2, [0.4, 0.3, 0.2], rooms, str(tmp_path / "schedule.html"),
+                          config=EngineConfig(schedule_class=schedule_class, seed=1))
+    assert best.get_fitness_score() == full_fitness(best, events)[0]
+
+
+def test_schedule_edge_neighbours(instance):
+    # A class at the end of a block sees the first slot of the next block, so moving a class there changes its penalty
+    rooms, events = instance
+    schedule = Schedule(len(events), len(rooms))
+    block_size = schedule.block_size
+    for class_idx in range(len(events)):
+        schedule.place_class(class_idx, (class_idx % schedule.num_blocks) * block_size + 2 * block_size // 3, events[class_idx].duration)
+    schedule.remove_class(0, events[0].duration)
+    schedule.place_class(0, block_size - events[0].duration, events[0].duration)
+    schedule.calculate_fitness(events)
+    duration = events[1].duration
+    schedule.remove_class(1, duration)
+    schedule.place_class(1, block_size, duration)  # right after class 0, at the start of block 1
+    schedule.calculate_fitness(events)
+    assert schedule.get_fitness_score() == full_fitness(schedule, events)[1]
+    schedule.remove_class(1, duration)  # unplaced classes do not count
+    schedule.calculate_fitness(events)
+    assert schedule.get_fitness_score() == full_fitness(schedule, events)[1]
@@ -0,0 +1,95 @@
+import csv
+import json
+import random
+from datetime import date
+
+import pytest
+
+from const import DAYS
+from structures.subject import Subject
+from reading_data import load_data_from_string
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+from exporting.exporters import ExportItem, day_cells, export_schedules, ical_line, write_ical
+
+
+@pytest.fixture
+def item():
+    classes = [Subject("Algebra, Vezbe 1", 90), Subject("Fizika", 60), Subject("Hemija", 30), Subject("Nije rasporedjen", 30)]
+    # Default grid: 48 slots a day from 7:00, two rooms, so block = day * 2 + room
+    starts = [48 + 4, 4 * 48, 4 * 48 + 2, -1]  # day 0 room B 8:00, day 2 room A 7:00 and 7:30 (overlap), one not placed
+    return ExportItem("Raspored", classes, starts, 123.5, 2, {0: "A", 1: "B"})
+
+
+def test_json(item, tmp_path):
+    path = tmp_path / "schedule.json"
+    export_schedules([item], str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == {"schedules": [{"title": "Raspored", "fitness": 123.5, "classes": [
+        {"name": "Algebra, Vezbe 1", "day": DAYS[0], "room": "B", "start": "08:00", "end": "09:30"},
+        {"name": "Fizika", "day": DAYS[2], "room": "A", "start": "07:00", "end": "08:00"},
+        {"name": "Hemija", "day": DAYS[2], "room": "A", "start": "07:30", "end": "08:00"},
+    ]}]}
+
+
+def test_csv(item, tmp_path):
+    path = tmp_path / "schedule.csv"
+    export_schedules([item, item], str(path))
+    with open(path, encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["schedule", "name", "day", "room", "start", "end"]
+    assert rows[1] == ["Raspored", "Algebra, Vezbe 1", DAYS[0], "B", "08:00", "09:30"]
+    assert len(rows) == 1 + 2 * 3
+
+
+def test_html_cells(item, tmp_path):
+    cells = day_cells(item)
+    assert cells[0] == {(1, 4): (6, [0])}
+    assert cells[2] == {(0, 0): (4, [1, 2])}  # the overlapping classes are joined into one cell
+    path = tmp_path / "schedule.html"
+    export_schedules([item], str(path))
+    html = path.read_text(encoding="utf-8")
+    assert html.count("<table>") == 5
+    assert "<td class='class' rowspan='6'>Algebra, Vezbe 1</td>" in html
+    assert "<td class='overlap' rowspan='4'>Fizika, Hemija</td>" in html
+    assert "Nije rasporedjen" not in html
+
+
+def test_ical(item, tmp_path):
+    path = tmp_path / "schedule.ics"
+    with pytest.raises(ValueError, match="Unknown export format"):
+        export_schedules([item], str(tmp_path / "schedule.pdf"))
+    write_ical([item], str(path), week_start=date(2024, 3, 4), weeks=10)
+    text = path.read_bytes().decode("utf-8")
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
+    assert text.count("BEGIN:VEVENT") == 3
+    assert "DTSTART:20240304T080000\r\nDTEND:20240304T093000\r\n" in text
+    assert "SUMMARY:Algebra\\, Vezbe 1\r\n" in text
+    assert "DTSTART:20240306T073000\r\n" in text
+    assert "RRULE:FREQ=WEEKLY;COUNT=10\r\n" in text
+    assert all(len(line.encode("utf-8")) <= 75 for line in text.split("\r\n"))
+
+
+@pytest.mark.parametrize("summary", ["SUMMARY:" + "x" * 200, "SUMMARY:" + "Vežbe " * 40, "SUMMARY:" + "ž" * 100])
+def test_long_ical_lines_are_folded(summary):
+    folded = ical_line(summary)
+    lines = folded.split("\r\n")[:-1]
+    assert all(len(line.encode("utf-8")) <= 75 for line in lines)
+    assert all(line.startswith(" ") for line in lines[1:])
+    assert "".join(line[1:] if i else line for i, line in enumerate(lines)) == summary
+
+
+def test_representations_export_the_same(tmp_path):
+    rooms, events = load_data_from_string()
+    random.seed(8)
+    schedule = Schedule(len(events), len(rooms))
+    schedule.set_random_classes(len(events), events)
+    schedule.calculate_fitness(events)
+    compact = CompactSchedule.from_genome(schedule.to_genome(), events)
+    outputs = []
+    for individual in (schedule, compact):
+        path = tmp_path / f"{type(individual).__name__}.json"
+        export_schedules([ExportItem.from_schedule(individual, events, rooms)], str(path))
+        outputs.append(json.loads(path.read_text(encoding="utf-8")))
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0]["schedules"][0]["classes"]) == len(events)
@@ -0,0 +1,53 @@
+import random
+
+from reading_data import load_data_from_string
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+
+
+def masks_from_slots(schedule):
+    """The free slot index built from scratch out of the class_list of a Schedule."""
+    masks = []
+    for block in range(schedule.num_blocks):
+        block_start = block * schedule.block_size
+        mask = 0
+        for offset in range(schedule.block_size):
+            if not schedule.class_list[block_start + offset]:
+                mask |= 1 << offset
+        masks.append(mask)
+    return masks
+
+
+def test_schedule_index_follows_the_slots():
+    rooms, events = load_data_from_string()
+    random.seed(5)
+    schedule = Schedule(len(events), len(rooms))
+    schedule.set_random_classes(len(events), events)
+    assert schedule.free_masks == masks_from_slots(schedule)
+    for _ in range(30):
+        schedule.mutate(1.0, events)
+        assert schedule.free_masks == masks_from_slots(schedule)
+    schedule.reset()
+    assert schedule.free_masks == masks_from_slots(schedule)
+
+
+def test_full_block_is_reported():
+    rooms, events = load_data_from_string()
+    schedule = Schedule(len(events), len(rooms))
+    schedule.place_class(0, 0, schedule.block_size)
+    assert schedule.free_starts(0, 1) == 0
+    assert schedule.random_free_start(0, 1) == -1
+    assert schedule.place_anywhere(1) >= schedule.block_size
+
+
+def test_representations_place_the_same_way():
+    rooms, events = load_data_from_string()
+    starts = []
+    for schedule_class in (Schedule, CompactSchedule):
+        random.seed(6)
+        schedule = schedule_class(len(events), len(rooms))
+        schedule.set_random_classes(len(events), events)
+        for _ in range(10):
+            schedule.mutate(1.0, events)
+        starts.append([schedule.get_start(i) for i in range(len(events))])
+    assert starts[0] == starts[1]
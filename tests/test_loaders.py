@@ -0,0 +1,82 @@
+import pytest
+
+from structures.time_grid import TimeGrid
+from loading.loaders import load_instance, load_instance_from_string
+
+
+TEXT = """rooms: A, B
+events(name, duration):
+Algebra, Vezbe 1, 90, groups=SV1;SV2, lecturer=Petrovic
+Fizika - Predavanje, 120
+"""
+CSV = """rooms: A, B
+name,duration,groups,lecturer
+"Algebra, Vezbe 1",90,SV1;SV2,Petrovic
+Fizika - Predavanje,120,,
+"""
+JSONL = """{"rooms": ["A", "B"]}
+{"name": "Algebra, Vezbe 1", "duration": 90, "groups": ["SV1", "SV2"], "lecturer": "Petrovic"}
+{"name": "Fizika - Predavanje", "duration": 120}
+"""
+
+
+@pytest.mark.parametrize("text, file_format", [(TEXT, "txt"), (CSV, "csv"), (JSONL, "jsonl")])
+def test_formats_give_the_same_instance(text, file_format):
+    rooms, events = load_instance_from_string(text, file_format)
+    assert rooms == {0: "A", 1: "B"}
+    subjects = events.to_subjects()
+    assert [(subject.name, subject.duration, subject.groups, subject.lecturer) for subject in subjects] == [
+        ("Algebra, Vezbe 1", 6, ("SV1", "SV2"), "Petrovic"),
+        ("Fizika - Predavanje", 8, (), None),
+    ]
+
+
+def test_file_format_from_extension(tmp_path):
+    path = tmp_path / "instance.csv"
+    path.write_text(CSV, encoding="utf-8")
+    rooms, events = load_instance(str(path))
+    assert len(rooms) == 2 and len(events) == 2
+    with pytest.raises(ValueError, match="Unknown instance format"):
+        load_instance(str(tmp_path / "instance.xml"))
+
+
+@pytest.mark.parametrize("text, file_format, message", [
+    ("", "txt", "<string>: the file is empty"),
+    ("events: A, B\nAlgebra, 90\n", "txt", "<string>:1: expected a line 'rooms: "),
+    ("rooms:\nAlgebra, 90\n", "txt", "<string>:1: no rooms are given"),
+    ("rooms: A\nAlgebra 90\n", "txt", "<string>:2: expected 'name, duration'"),
+    ("rooms: A\nAlgebra, ninety\n", "txt", "<string>:2: duration 'ninety' is not a whole number"),
+    ("rooms: A\nAlgebra, 20\n", "txt", "<string>:2: duration 20 is not a positive multiple of 15 minutes"),
+    ("rooms: A\nAlgebra, 0\n", "txt", "<string>:2: duration 0 is not a positive multiple"),
+    ("rooms: A\nAlgebra, 900\n", "txt", "<string>:2: duration 900 is longer than a day"),
+    ("rooms: A\nAlgebra, 90, room=A\n", "txt", "<string>:2: unknown event attribute 'room'"),
+    ("rooms: A\nname,length\nAlgebra,90\n", "csv", "<string>:2: the CSV header needs the columns 'name' and 'duration'"),
+    ("rooms: A\nname,duration\nAlgebra\n", "csv", "<string>:3: expected 2 columns"),
+    ("rooms: A\nname,duration\nAlgebra,95\n", "csv", "<string>:3: duration 95"),
+    ('{"rooms": []}\n', "jsonl", "<string>:1: the first line has to be"),
+    ('{"rooms": ["A"]}\n{"name": "Algebra"\n', "jsonl", "<string>:2: invalid JSON"),
+    ('{"rooms": ["A"]}\n{"name": "Algebra"}\n', "jsonl", "<string>:2: expected an object with 'name' and 'duration'"),
+    ('{"rooms": ["A"]}\n{"name": "Algebra", "duration": "90"}\n', "jsonl", "<string>:2: duration '90' is not a whole number"),
+    ('{"rooms": ["A"]}\n{"name": "Algebra", "duration": true}\n', "jsonl", "<string>:2: duration True is not a whole number"),
+])
+def test_invalid_instances(text, file_format, message):
+    with pytest.raises(ValueError) as error:
+        load_instance_from_string(text, file_format)
+    assert str(error.value).startswith(message)
+
+
+def test_durations_follow_the_grid():
+    grid = TimeGrid(5, 10, "8:00", "12:00")
+    rooms, events = load_instance_from_string("rooms: A\nAlgebra, 50\n", grid=grid)
+    assert events.to_subjects()[0].duration == 5
+    with pytest.raises(ValueError, match="longer than a day"):
+        load_instance_from_string("rooms: A\nAlgebra, 250\n", grid=grid)
+
+
+
+def test_only_the_first_line_can_be_the_header():
+    text = "rooms: A\nevents(name, duration):\nevents management, 90\nEvents management, 60\n"
+    rooms, events = load_instance_from_string(text)
+    assert [(subject.name, subject.duration) for subject in events.to_subjects()] == [("events management", 6), ("Events management", 4)]
+    rooms, events = load_instance_from_string("rooms: A\nevents management, 90\n")
+    assert len(events) == 1
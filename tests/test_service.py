@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+
+from service import SchedulingService
+
+
+class FakeWriter:
+    """Collects what handle_client writes, instead of a socket."""
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data: bytes):
+        self.lines.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def answers(requests: list) -> list:
+    """Sends the requests to handle_client of a service that was not started (no workers) and returns its answers."""
+    async def run():
+        reader = asyncio.StreamReader()
+        for request in requests:
+            reader.feed_data((request if isinstance(request, str) else json.dumps(request)).encode('utf-8') + b"\n")
+        reader.feed_eof()
+        writer = FakeWriter()
+        await SchedulingService(workers=1).handle_client(reader, writer)
+        return writer.lines
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("request_", [
+    {"op": "status", "job": [1]},
+    {"op": "status", "job": "1"},
+    {"op": "cancel", "job": True},
+    {"op": "submit", "instance": "rooms: A, B\nevents:\nX, 60", "settings": ["population_size", 10]},
+    {"op": "submit", "instance": "rooms: A, B\nevents:\nX, 60", "time_limit": "10"},
+    {"op": "submit", "instance": "rooms: A, B\nevents:\nX, 60", "settings": {"population_size": 10.5}},
+    {"op": "submit", "instance": "rooms: A, B\nevents:\nX, 60", "settings": {"mutation_chance": 0.3}},
+    {"op": "submit", "instance": ["rooms: A"]},
+    "[1, 2]",
+])
+def test_wrong_types_are_answered_with_an_error(request_):
+    # the connection stays open, so the list after the wrong request is answered too
+    first, second = answers([request_, {"op": "list"}])
+    assert set(first) == {"error"}
+    assert second == {"jobs": []}
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from reading_data import load_data_from_string
+from sweep import SEARCH_SPACE, ResultsStore, config_key, grid_configs, random_configs, run_sweep
+
+
+def result(fitness, time_to_target=None):
+    return {"final_fitness": fitness, "generations": 10, "seconds": 1.0, "time_to_target": time_to_target,
+            "stop_reason": "optimal_fitness" if time_to_target is not None else "max_generations", "valid": True}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "sweep.db"))
+    yield store
+    store.close()
+
+
+def test_configs():
+    configs = grid_configs()
+    assert len(configs) == 3 * 4 * 3
+    assert len({config_key(config) for config in configs}) == len(configs)
+    assert all(config[name] in SEARCH_SPACE[name] for config in configs for name in SEARCH_SPACE)
+    sample = random_configs(5, seed=1)
+    assert sample == random_configs(5, seed=1) and len({config_key(config) for config in sample}) == 5
+    assert len(random_configs(1000)) == len(configs)
+    assert config_key({"b": 1, "a": [2]}) == json.dumps({"a": [2], "b": 1})
+
+
+def test_store_find_and_replace(store):
+    store.add("s", "inst", 60, 5, "{}", 0, 0, 100, result(10.0))
+    assert store.find("s", "inst", "{}", 0, 0, 100)["final_fitness"] == 10.0
+    assert store.find("s", "inst", "{}", 0, 0, 200) is None  # another budget is another trial
+    assert store.find("s", "inst", "{}", 1, 0, 100) is None
+    store.add("s", "inst", 60, 5, "{}", 0, 0, 100, result(20.0, 1.5))
+    found = store.find("s", "inst", "{}", 0, 0, 100)
+    assert found["final_fitness"] == 20.0 and found["time_to_target"] == 1.5 and found["valid"] == 1
+
+
+def test_ranking_order(store):
+    # hit rate first, then the mean time to the target, then the mean fitness
+    for seed, (fitness, time_to_target) in enumerate([(5.0, 2.0), (4.0, None)]):
+        store.add("s", "inst", 60, 5, "half_hits", seed, 0, 10, result(fitness, time_to_target))
+    for seed, (fitness, time_to_target) in enumerate([(1.0, 9.0), (1.0, 7.0)]):
+        store.add("s", "inst", 60, 5, "slow_hits", seed, 0, 10, result(fitness, time_to_target))
+    for seed, (fitness, time_to_target) in enumerate([(1.0, 3.0), (1.0, 1.0)]):
+        store.add("s", "inst", 60, 5, "fast_hits", seed, 0, 10, result(fitness, time_to_target))
+    for seed in range(2):
+        store.add("s", "inst", 60, 5, "good_misses", seed, 0, 10, result(50.0))
+        store.add("s", "inst", 60, 5, "bad_misses", seed, 0, 10, result(40.0))
+    ranking = store.ranking("s", "inst", 0)
+    assert [row["config"] for row in ranking] == ["fast_hits", "slow_hits", "half_hits", "good_misses", "bad_misses"]
+    assert ranking[0]["hit_rate"] == 1.0 and ranking[0]["mean_time_to_target"] == 2.0 and ranking[0]["trials"] == 2
+    assert ranking[2]["hit_rate"] == 0.5
+
+
+def test_best_per_size_uses_the_last_rung(store):
+    store.add("s", "big", 500, 20, "a", 0, 0, 10, result(9.0))
+    store.add("s", "big", 500, 20, "b", 0, 0, 10, result(1.0))
+    store.add("s", "big", 500, 20, "b", 0, 1, 30, result(2.0))
+    store.add("s", "small", 60, 5, "a", 0, 0, 10, result(3.0))
+    store.add("other", "small", 60, 5, "b", 0, 0, 10, result(99.0))
+    best = store.best_per_size("s")
+    assert [(row["instance"], row["rung"], row["config"]) for row in best] == [("small", 0, "a"), ("big", 1, "b")]
+
+
+def test_successive_halving(store, capsys):
+    instances = {"data_timetable": load_data_from_string()}
+    configs = grid_configs({"population_size": [10, 12, 14], "mutation_chance": [[0.4, 0.3, 0.2]], "keep_percent": [0.2]})
+    best = run_sweep(instances, configs, store, "halving", seeds=2, min_generations=2, rungs=2, eta=3, workers=2)
+
+    rung0 = store.ranking("halving", "data_timetable", 0)
+    rung1 = store.ranking("halving", "data_timetable", 1)
+    assert len(rung0) == 3 and all(row["trials"] == 2 for row in rung0)
+    assert [row["config"] for row in rung1] == [rung0[0]["config"]]  # only the best third goes on
+    assert rung1[0]["mean_generations"] == 6  # eta times more generations
+    assert best[0]["rung"] == 1 and best[0]["config"] == rung0[0]["config"]
+    assert "6 trials to run" in capsys.readouterr().out
+
+    # Started again with the same name, every trial is found in the store
+    run_sweep(instances, configs, store, "halving", seeds=2, min_generations=2, rungs=2, eta=3, workers=2)
+    output = capsys.readouterr().out
+    assert "Rung 0: 3 configurations, 2 generations, 0 trials to run" in output
+    assert "Rung 1: 1 configurations, 6 generations, 0 trials to run" in output
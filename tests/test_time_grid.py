@@ -0,0 +1,85 @@
+import pickle
+import random
+
+import pytest
+
+from const import DAYS
+from structures.time_grid import TimeGrid, DEFAULT_GRID, parse_clock
+from reading_data import load_data_from_string
+from genetic_algorithm.individual import Schedule
+from genetic_algorithm.compact_individual import CompactSchedule
+from genetic_algorithm.sparse_individual import SparseSchedule
+
+
+def test_default_grid():
+    assert DEFAULT_GRID.as_tuple() == (5, 15, 7 * 60, 19 * 60)
+    assert DEFAULT_GRID.block_size == 48
+    assert DEFAULT_GRID.num_blocks(5) == 25
+    assert DEFAULT_GRID.slot_count(5) == 25 * 48
+    assert DEFAULT_GRID.room_count(25) == 5
+
+
+@pytest.mark.parametrize("text, minutes", [("7:00", 420), ("07:30", 450), ("19", 1140), (" 0:05 ", 5), ("24:00", 1440)])
+def test_parse_clock(text, minutes):
+    assert parse_clock(text) == minutes
+
+
+@pytest.mark.parametrize("text", ["7h", "7:xx", "25:00", ""])
+def test_parse_clock_errors(text):
+    with pytest.raises(ValueError, match="is not a time of day"):
+        parse_clock(text)
+
+
+@pytest.mark.parametrize("arguments, message", [
+    ((0, 15, "7:00", "19:00"), "number of days"),
+    ((len(DAYS) + 1, 15, "7:00", "19:00"), "number of days"),
+    ((5, 0, "7:00", "19:00"), "slot length"),
+    ((5, 15, "19:00", "7:00"), "can not be split"),
+    ((5, 25, "7:00", "19:00"), "can not be split"),
+])
+def test_invalid_grids(arguments, message):
+    with pytest.raises(ValueError, match=message):
+        TimeGrid(*arguments)
+
+
+def test_slot_arithmetic():
+    grid = TimeGrid(3, 20, "8:00", "12:00")
+    assert grid.block_size == 12
+    assert grid.slot_count(4) == 3 * 4 * 12
+    room_count = 4
+    # slot = (day * rooms + room) * block_size + offset, and locate gives the parts back
+    for day in range(grid.days):
+        for room in range(room_count):
+            for offset in range(grid.block_size):
+                assert grid.locate((day * room_count + room) * grid.block_size + offset, room_count) == (day, room, offset)
+    assert grid.minutes_of(0) == 8 * 60 and grid.minutes_of(3) == 9 * 60
+    assert grid.clock(0) == "08:00" and grid.clock(grid.block_size) == "12:00"
+    assert grid.to_slots(60) == 3
+    with pytest.raises(ValueError, match="not a multiple"):
+        grid.to_slots(50)
+
+
+def test_equality_and_pickling():
+    grid = TimeGrid(6, 30, "8:00", "20:00")
+    assert grid == TimeGrid(6, 30, 480, 1200)
+    assert grid != DEFAULT_GRID
+    assert len({grid, TimeGrid(6, 30, "8:00", "20:00"), DEFAULT_GRID}) == 2
+    assert pickle.loads(pickle.dumps(grid)) == grid
+    assert repr(grid) == "TimeGrid(days=6, slot_minutes=30, day_start='08:00', day_end='20:00')"
+
+
+def test_representations_on_another_grid():
+    # All representations have to calculate the same fitness on a grid that is not the default one
+    grid = TimeGrid(6, 30, "8:00", "20:00")
+    rooms, events = load_data_from_string(grid)
+    assert sum(subject.duration for subject in events) == sum(subject.duration for subject in load_data_from_string()[1]) // 2
+    random.seed(9)
+    schedule = Schedule(len(events), len(rooms), grid)
+    schedule.set_random_classes(len(events), events)
+    schedule.calculate_fitness(events)
+    assert len(schedule.class_list) == grid.slot_count(len(rooms))
+    for schedule_class in (CompactSchedule, SparseSchedule):
+        copy = schedule_class.from_genome(schedule.to_genome(), events)
+        assert copy.grid == grid
+        copy.calculate_fitness(events)
+        assert copy.get_fitness_score() == schedule.get_fitness_score()